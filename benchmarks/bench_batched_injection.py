@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Sink calls and wall time per multi-event operation: one-by-one vs batched.
+
+The one-by-one column replays the call sequence the server used before
+batching (separate key/mouse calls with fixed sleeps in between); the
+batched column uses the same batch events the server now hands to
+InputSink.inject(). Both run against a RecordingInputSink that really
+sleeps on pauses, so wall time includes them. The last column is the
+batched path while the foreground app is listed in [Input] slow_apps.
+
+Usage:
+    python benchmarks/bench_batched_injection.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from input_sink import RecordingInputSink, combo_events, click_events
+
+
+def legacy_key_combination(sink, keys):
+    # RemoteServer.handle_key_combination before batching
+    for key in keys:
+        sink.key_down(key)
+        sink.pause(0.05)
+    sink.pause(0.1)
+    for key in reversed(keys):
+        sink.key_up(key)
+        sink.pause(0.05)
+
+
+def legacy_click_pos(sink, x, y):
+    # MOUSE_CLICK_POS before batching
+    sink.move_to(x, y)
+    sink.pause(0.05)
+    sink.mouse_button('left', True)
+    sink.pause(0.05)
+    sink.mouse_button('left', False)
+
+
+def legacy_shifted_char(sink, keys):
+    # TYPE with a shifted character before batching
+    sink.key_down(keys[0])
+    sink.key_down(keys[1])
+    sink.pause(0.1)
+    sink.key_up(keys[1])
+    sink.key_up(keys[0])
+
+
+def legacy_shortcut(sink, keys):
+    # shortcuts_handler.send_shortcut before batching
+    for key in keys:
+        sink.key_down(key)
+    sink.pause(0.1)
+    for key in reversed(keys):
+        sink.key_up(key)
+
+
+OPERATIONS = {
+    'KEY ctrl+shift+esc': (lambda sink: legacy_key_combination(sink, ['ctrl', 'shift', 'esc']),
+                           combo_events(['ctrl', 'shift', 'esc'])),
+    'MOUSE_CLICK_POS': (lambda sink: legacy_click_pos(sink, 960, 540),
+                        click_events(960, 540)),
+    'TYPE !': (lambda sink: legacy_shifted_char(sink, ['shift', '1']),
+               combo_events(['shift', '1'])),
+    'shortcut ctrl+shift+t': (lambda sink: legacy_shortcut(sink, ['ctrl', 'shift', 't']),
+                              combo_events(['ctrl', 'shift', 't'])),
+}
+
+
+def run(operation, repeat):
+    sink = RecordingInputSink(sleep_pauses=True)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        operation(sink)
+    elapsed = (time.perf_counter() - start) / repeat
+    return len(sink.take_events()) / repeat, elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'operation':<24}{'one-by-one':>22}{'batched':>22}{'batched, slow app':>24}")
+    for name, (legacy, events) in OPERATIONS.items():
+        def batched(sink):
+            sink.inject(events)
+
+        def paced(sink):
+            sink.foreground = 'slowapp.exe'
+            sink.set_pacing(['slowapp.exe'], 0.05)
+            sink.inject(events)
+
+        cells = []
+        for operation in (legacy, batched, paced):
+            calls, elapsed = run(operation, args.repeat)
+            cells.append(f"{calls:4.0f} calls {elapsed * 1000:8.2f} ms")
+        print(f"{name:<24}{cells[0]:>22}{cells[1]:>22}{cells[2]:>24}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: parse + dispatch cost per input event, text vs binary.
+
+Both encodings go through CommandParser. The text path then does what
+RemoteServer._process_command does (split, walk the if/elif ladder, int/float
+conversion); the binary path does an opcode table lookup. Handlers are no-ops
+so only protocol overhead is measured.
+
+Usage:
+    python benchmarks/bench_binary_protocol.py [--events N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binary_protocol
+from command_parser import CommandParser
+
+# Order of the branches in RemoteServer._process_command
+LADDER = (
+    'CAPS', 'SET_DISCONNECT_TIMER', 'SHUTDOWN', 'MOUSE_MOVE', 'MOUSE_CLICK',
+    'MOUSE_CLICK_POS', 'KEY', 'TYPE', 'SCROLL', 'MOUSE_DOWN', 'MOUSE_UP',
+    'DISABLE_DISCONNECT_TIMER', 'SET_DISCONNECT_TIMER:', 'screen_share', 'PIN_CONFIG',
+    'screen_view', 'GAMEPAD_BUTTON', 'GAMEPAD_STICK', 'GAMEPAD_MOTION', 'GAMEPAD_GYRO',
+)
+
+MIXES = {
+    'mouse': [('MOUSE_MOVE', (3, -2))],
+    'gamepad': [('GAMEPAD_STICK', ('right', 0.53, -0.2)), ('GAMEPAD_GYRO', (0.041, -0.07))],
+}
+
+
+def noop(*args):
+    pass
+
+
+def text_stream(mix, count):
+    lines = []
+    for i in range(count):
+        name, values = mix[i % len(mix)]
+        lines.append(':'.join([name] + [str(v) for v in values]) + '\n')
+    return ''.join(lines).encode('utf-8')
+
+
+def binary_stream(mix, count):
+    frames = []
+    for i in range(count):
+        name, values = mix[i % len(mix)]
+        if name == 'MOUSE_MOVE':
+            frames.append(binary_protocol.encode(binary_protocol.OP_MOUSE_MOVE, *values))
+        elif name == 'GAMEPAD_STICK':
+            frames.append(binary_protocol.encode(
+                binary_protocol.OP_GAMEPAD_STICK, binary_protocol.STICKS.index(values[0]), *values[1:]))
+        elif name == 'GAMEPAD_GYRO':
+            frames.append(binary_protocol.encode(binary_protocol.OP_GAMEPAD_GYRO, *values))
+    return b''.join(frames)
+
+
+def dispatch_text(data):
+    cmd_type, *params = data.split(':')
+    for name in LADDER:
+        if cmd_type == name:
+            break
+    if cmd_type == 'MOUSE_MOVE':
+        noop(int(params[0]), int(params[1]))
+    elif cmd_type == 'GAMEPAD_STICK':
+        noop(params[0], float(params[1]), float(params[2]))
+    elif cmd_type == 'GAMEPAD_GYRO':
+        noop(float(params[0]), float(params[1]))
+
+
+BINARY_HANDLERS = {opcode: noop for opcode in binary_protocol.FRAME_STRUCTS}
+
+
+def dispatch_binary(event):
+    opcode, values = event
+    BINARY_HANDLERS[opcode](*values)
+
+
+def measure(payload, dispatch, count, read_size=4096):
+    parser = CommandParser()
+    view = memoryview(payload)
+    start = time.perf_counter()
+    handled = 0
+    for offset in range(0, len(payload), read_size):
+        for command in parser.feed(view[offset:offset + read_size]):
+            dispatch(command)
+            handled += 1
+    elapsed = time.perf_counter() - start
+    assert handled == count, (handled, count)
+    return elapsed, len(payload)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--events', type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    for mix_name, mix in MIXES.items():
+        print(f"[{mix_name}] {args.events} events")
+        for encoding, build, dispatch in (('text', text_stream, dispatch_text),
+                                          ('binary', binary_stream, dispatch_binary)):
+            payload = build(mix, args.events)
+            elapsed, size = measure(payload, dispatch, args.events)
+            print(f"  {encoding:<7} {elapsed / args.events * 1e9:8.0f} ns/event  "
+                  f"{size / args.events:5.1f} bytes/event")
+
+
+if __name__ == '__main__':
+    main()
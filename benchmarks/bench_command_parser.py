@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: legacy recv loop vs CommandParser.
+
+Replays a burst of pipelined MOUSE_MOVE commands as they would arrive on the
+control socket (several commands per read, commands split across reads) and
+reports how many commands each reader recovers and how fast.
+
+Usage:
+    python benchmarks/bench_command_parser.py [--commands N] [--chunk BYTES]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_parser import CommandParser
+
+
+class ReplaySocket:
+    """Minimal socket stand-in that hands out a byte stream in fixed-size reads"""
+
+    def __init__(self, payload, chunk_size):
+        self.payload = memoryview(payload)
+        self.chunk_size = chunk_size
+        self.offset = 0
+
+    def recv(self, size):
+        size = min(size, self.chunk_size)
+        chunk = bytes(self.payload[self.offset:self.offset + size])
+        self.offset += len(chunk)
+        return chunk
+
+    def recv_into(self, buffer):
+        size = min(len(buffer), self.chunk_size)
+        chunk = self.payload[self.offset:self.offset + size]
+        buffer[:len(chunk)] = chunk
+        self.offset += len(chunk)
+        return len(chunk)
+
+
+def build_stream(count):
+    lines = [f"MOUSE_MOVE:{(i % 7) - 3}:{(i % 5) - 2}\n" for i in range(count)]
+    return ''.join(lines).encode('utf-8')
+
+
+def legacy_loop(sock):
+    """The pre-parser loop from RemoteServer.handle_client"""
+    moves = 0
+    while True:
+        data = sock.recv(1024).decode('utf-8').strip()
+        if not data:
+            break
+        if ':' in data:
+            cmd_type, *params = data.split(':')
+        else:
+            cmd_type = data
+        if cmd_type == 'MOUSE_MOVE':
+            try:
+                int(params[0])
+                int(params[1])
+                moves += 1
+            except (ValueError, IndexError):
+                pass
+    return moves
+
+
+def parser_loop(sock):
+    moves = 0
+    parser = CommandParser()
+    while True:
+        commands = parser.receive(sock)
+        if commands is None:
+            break
+        for data in commands:
+            cmd_type, *params = data.split(':')
+            if cmd_type == 'MOUSE_MOVE':
+                int(params[0])
+                int(params[1])
+                moves += 1
+    return moves
+
+
+def run(name, loop, payload, chunk_size, expected):
+    sock = ReplaySocket(payload, chunk_size)
+    start = time.perf_counter()
+    moves = loop(sock)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} recovered {moves:>8}/{expected} commands "
+          f"in {elapsed * 1000:8.1f} ms  ({moves / elapsed:,.0f} commands/s)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--commands', type=int, default=200000)
+    arg_parser.add_argument('--chunk', type=int, default=1024,
+                            help='bytes returned per read (default: 1024, the old recv size)')
+    args = arg_parser.parse_args()
+
+    payload = build_stream(args.commands)
+    print(f"{args.commands} commands, {len(payload)} bytes, {args.chunk}-byte reads")
+    run('legacy', legacy_loop, payload, args.chunk, args.commands)
+    run('parser', parser_loop, payload, args.chunk, args.commands)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+End-to-end server-side input latency, runnable on a headless machine.
+
+Starts a real RemoteServer on 127.0.0.1 with services=False and a
+RecordingInputSink, authenticates over TCP and sends one command at a time.
+Latency is measured from just before the client's send() to the timestamp
+the sink recorded for the first injected event, so it covers the control
+transport, parsing, dispatch, handlers and the input scheduler tick.
+
+The server reads and writes config.ini under a temporary home directory, so
+the real ~/.anycommand settings are left alone.
+
+Usage:
+    python benchmarks/bench_input_path.py [--events N] [--motion-rate HZ]
+"""
+
+import argparse
+import configparser
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from input_sink import RecordingInputSink
+
+COMMANDS = {
+    'MOUSE_MOVE': 'MOUSE_MOVE:3:-2',
+    'MOUSE_CLICK': 'MOUSE_CLICK:left',
+    'KEY': 'KEY:a',
+    'TYPE': 'TYPE:x',
+    'SCROLL': 'SCROLL:up:1',
+    'GAMEPAD_BUTTON': 'GAMEPAD_BUTTON:a:press',
+}
+
+
+def write_config(home, motion_rate):
+    config_dir = os.path.join(home, '.anycommand')
+    os.makedirs(config_dir, exist_ok=True)
+    config = configparser.ConfigParser()
+    config['Input'] = {'motion_rate_hz': str(motion_rate), 'udp_port': '0'}
+    config['Metrics'] = {'port': '0'}
+    with open(os.path.join(config_dir, 'config.ini'), 'w') as f:
+        config.write(f)
+
+
+def start_server(sink):
+    from remote_server import RemoteServer
+
+    server = RemoteServer(host='127.0.0.1', port=0, input_sink=sink, services=False)
+    threading.Thread(target=server.start, daemon=True).start()
+    return server
+
+
+def connect(server):
+    client = socket.create_connection(server.server.getsockname())
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    assert client.recv(64) == b'AUTH_REQUIRED'
+    client.sendall(json.dumps({'pin': server.get_current_pin()}).encode() + b'\n')
+    assert client.recv(64) == b'AUTH_SUCCESS'
+    client.setblocking(False)
+    return client
+
+
+def drain(client):
+    try:
+        while client.recv(65536):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def measure(client, sink, command, events, timeout=1.0):
+    latencies = []
+    for _ in range(events):
+        sink.clear()
+        start = time.perf_counter()
+        client.sendall(command.encode() + b'\n')
+        deadline = start + timeout
+        while not sink.events:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"No input injected for {command}")
+            time.sleep(0)
+        latencies.append(sink.events[0].timestamp - start)
+        drain(client)
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--events', type=int, default=500, help='commands per command type')
+    arg_parser.add_argument('--motion-rate', default='240', help='[Input] motion_rate_hz for the run')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = os.environ['USERPROFILE'] = home
+        os.chdir(home)  # remote_server.log goes to the working directory
+        write_config(home, args.motion_rate)
+
+        sink = RecordingInputSink()
+        server = start_server(sink)
+        client = connect(server)
+
+        print(f"motion_rate_hz={args.motion_rate} "
+              f"events={args.events} per command")
+        for name, command in COMMANDS.items():
+            latencies = sorted(measure(client, sink, command, args.events))
+            print(f"  {name:<15} p50={statistics.median(latencies) * 1e6:7.0f}us "
+                  f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1e6:7.0f}us "
+                  f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1e6:7.0f}us")
+
+        client.close()
+        server.stop()
+        server.quit()
+
+
+if __name__ == '__main__':
+    main()
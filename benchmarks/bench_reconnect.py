@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Reconnect-to-first-input latency: full PIN handshake vs session resumption.
+
+Uses the same headless RemoteServer as bench_input_path.py. Each iteration
+drops the connection and reconnects, then waits until the first KEY command
+after the reconnect reaches the sink.
+
+    pin     AUTH_REQUIRED -> PIN JSON -> AUTH_SUCCESS, then the state the app
+            restores after connecting (CAPS, SET_DISCONNECT_TIMER,
+            gamepad_mode), each waiting for its reply, then the KEY.
+    resume  {"resume": token} is sent with the KEY pipelined behind it; the
+            server restores capabilities, gamepad mode and the disconnect
+            timer itself and replies RESUMED plus a new token.
+
+On loopback the difference is mostly server work; over Wi-Fi the pin path
+pays five network round trips before the first input and resume pays one.
+
+Usage:
+    python benchmarks/bench_reconnect.py [--reconnects N]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_input_path import write_config, start_server
+from input_sink import RecordingInputSink
+
+SETUP = [b'CAPS:NO_ACK_STREAM,RESUME\n', b'SET_DISCONNECT_TIMER:120\n', b'gamepad_mode:start\n']
+
+
+def read_until(sock, marker, buffer=b''):
+    while marker not in buffer:
+        data = sock.recv(4096)
+        if not data:
+            raise RuntimeError(f"Connection closed waiting for {marker!r}")
+        buffer += data
+    return buffer
+
+
+def read_token(sock, buffer=b''):
+    """Read up to the end of the RESUME_TOKEN line and return the token"""
+    buffer = read_until(sock, b'RESUME_TOKEN:', buffer)
+    line = read_until(sock, b'\n', buffer.split(b'RESUME_TOKEN:', 1)[1])
+    return line.split(b':', 1)[0].decode()
+
+
+def wait_for_input(sink, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not sink.events:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("No input injected")
+        time.sleep(0)
+    return sink.events[0].timestamp
+
+
+def open_connection(address):
+    sock = socket.create_connection(address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def reconnect_with_pin(address, pin, sink):
+    """Returns (latency, socket, resume token)"""
+    sink.clear()
+    start = time.perf_counter()
+    sock = open_connection(address)
+    read_until(sock, b'AUTH_REQUIRED')
+    sock.sendall(json.dumps({'pin': pin}).encode() + b'\n')
+    read_until(sock, b'AUTH_SUCCESS')
+    sock.sendall(SETUP[0])
+    token = read_token(sock)
+    for command in SETUP[1:]:
+        sock.sendall(command)
+        read_until(sock, b'OK\n')
+    sock.sendall(b'KEY:a\n')
+    return wait_for_input(sink) - start, sock, token
+
+
+def reconnect_with_token(address, token, sink):
+    """Returns (latency, socket, new resume token)"""
+    sink.clear()
+    start = time.perf_counter()
+    sock = open_connection(address)
+    sock.sendall(json.dumps({'resume': token}).encode() + b'\nKEY:a\n')
+    latency = wait_for_input(sink) - start
+    return latency, sock, read_token(sock)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--reconnects', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = os.environ['USERPROFILE'] = home
+        os.chdir(home)
+        write_config(home, 240, 'threaded')
+
+        sink = RecordingInputSink()
+        server = start_server(sink)
+        address = server.server.getsockname()
+        pin = server.get_current_pin()
+
+        results = {'pin': [], 'resume': []}
+        _, sock, token = reconnect_with_pin(address, pin, sink)
+        for _ in range(args.reconnects):
+            sock.close()
+            latency, sock, token = reconnect_with_pin(address, pin, sink)
+            results['pin'].append(latency)
+        for _ in range(args.reconnects):
+            sock.close()
+            latency, sock, token = reconnect_with_token(address, token, sink)
+            results['resume'].append(latency)
+        sock.close()
+
+        print(f"reconnects={args.reconnects}")
+        for name, latencies in results.items():
+            latencies.sort()
+            print(f"  {name:<7} p50={statistics.median(latencies) * 1e6:7.0f}us "
+                  f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1e6:7.0f}us")
+
+        server.stop()
+        server.quit()
+
+
+if __name__ == '__main__':
+    main()
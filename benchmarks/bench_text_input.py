@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Time to complete a text injection: Unicode key strokes vs clipboard paste.
+
+Runs TextInput with the 'keys' and 'paste' strategies on 1 KB and 100 KB
+of text and reports the wall time until every injection call has returned
+(for paste: saving and setting the clipboard plus Ctrl+V), and how many
+SendInput events each strategy needs.
+
+On Windows the native sink and the system clipboard are used, so the times
+are real. Elsewhere the recording sink stands in for SendInput (its times
+exclude the OS) and, without pyperclip, an in-process clipboard is used;
+the output says which.
+
+Usage:
+    python benchmarks/bench_text_input.py [--sizes BYTES ...] [--repeat N] [--sink native|recording]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from input_sink import RecordingInputSink, create_input_sink, text_key_units
+from key_sequencer import KeySequencer
+from text_input import TextInput
+from timer_wheel import TimerWheel
+
+SAMPLE = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Ünïcödé ✓ 🙂\n"
+
+
+class MemoryClipboard:
+    """Clipboard kept in this process, for machines without a system clipboard"""
+
+    def __init__(self):
+        self.text = ''
+
+    def get_text(self):
+        return self.text
+
+    def set_text(self, text):
+        self.text = text
+
+
+def system_clipboard():
+    try:
+        from clipboard_service import ClipboardService
+        clipboard = ClipboardService()
+        clipboard.set_text(clipboard.get_text())
+        return clipboard, 'system'
+    except Exception:
+        return MemoryClipboard(), 'in-process'
+
+
+def make_text(size):
+    """About size bytes of UTF-8 text"""
+    chunk = SAMPLE.encode('utf-8')
+    return (SAMPLE * (size // len(chunk) + 1)).encode('utf-8')[:size].decode('utf-8', 'ignore')
+
+
+def run(text_input, text, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text_input.type_text(text)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 100 * 1024])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--sink', choices=('native', 'recording'),
+                            default='native' if sys.platform == 'win32' else 'recording')
+    args = arg_parser.parse_args()
+
+    sink = create_input_sink(args.sink) if args.sink == 'native' else RecordingInputSink()
+    clipboard, clipboard_kind = system_clipboard()
+    wheel = TimerWheel()
+    wheel.start()
+    sequencer = KeySequencer(sink, wheel)
+    keys = TextInput(sequencer, wheel, clipboard, strategy='keys')
+    paste = TextInput(sequencer, wheel, clipboard, strategy='paste', restore_delay=0.05)
+
+    print(f"sink={args.sink} clipboard={clipboard_kind} repeat={args.repeat}")
+    print(f"{'bytes':>8}{'keys':>14}{'SendInput events':>18}{'paste':>12}{'SendInput events':>18}")
+    for size in args.sizes:
+        text = make_text(size)
+        typed = run(keys, text, args.repeat)
+        pasted = run(paste, text, args.repeat)
+        time.sleep(0.1)  # Let the last clipboard restore run
+        print(f"{size:>8}{typed * 1000:>11.2f} ms{len(text_key_units(text)) * 2:>18}"
+              f"{pasted * 1000:>9.2f} ms{4:>18}")
+
+    wheel.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Full-frame JPEG vs tile delta encoding (tile_delta.py) on synthetic desktops.
+
+Renders a 1728x972 "office" frame (0.9 scale of 1080p: window chrome, lines
+of text) and animates it three ways:
+
+    caret      a text caret blinking
+    typing     characters appearing on one line
+    scrolling  the text area shifting up by one line every frame
+
+For each it encodes --frames frames the way the MJPEG stream does
+(optimize + progressive) and with TileDeltaEncoder, and prints CPU time per
+frame and bytes per frame. Keyframes are included at the encoder's default
+interval, assuming 20 FPS.
+
+Needs numpy and Pillow.
+
+Usage:
+    python benchmarks/bench_tile_delta.py [--frames N] [--quality Q]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+import tile_delta
+from tile_delta import TileDeltaEncoder
+
+WIDTH, HEIGHT = 1728, 972
+LINE_HEIGHT = 18
+FPS = 20
+
+
+def desktop(scroll=0, typed=0, caret=False):
+    image = Image.new('RGB', (WIDTH, HEIGHT), (32, 96, 160))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((80, 60, 1500, 900), fill=(250, 250, 250), outline=(90, 90, 90))
+    draw.rectangle((80, 60, 1500, 90), fill=(225, 225, 230))
+    draw.text((95, 68), "Document - Editor", fill=(20, 20, 20))
+    draw.rectangle((0, HEIGHT - 40, WIDTH, HEIGHT), fill=(30, 30, 35))
+    for line in range(44):
+        y = 110 + line * LINE_HEIGHT
+        number = line + scroll
+        draw.text((100, y), f"{number:4d}  The quick brown fox jumps over the lazy dog, line {number}.",
+                  fill=(40, 40, 40))
+    if typed:
+        draw.text((100, 110 + 44 * LINE_HEIGHT), "Typed: " + ("abcdefghij" * (typed // 10 + 1))[:typed],
+                  fill=(0, 0, 0))
+    if caret:
+        x = 160 + typed * 6
+        draw.line((x, 110 + 44 * LINE_HEIGHT, x, 124 + 44 * LINE_HEIGHT), fill=(0, 0, 0), width=2)
+    return image
+
+
+def scenario_frames(name, count):
+    for index in range(count):
+        if name == 'caret':
+            yield desktop(caret=(index // 10) % 2 == 0)
+        elif name == 'typing':
+            yield desktop(typed=index % 120, caret=True)
+        else:
+            yield desktop(scroll=index)
+
+
+def full_jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--frames', type=int, default=200)
+    arg_parser.add_argument('--quality', type=int, default=75)
+    args = arg_parser.parse_args()
+
+    print(f"{WIDTH}x{HEIGHT}, {args.frames} frames, quality {args.quality}, tiles {tile_delta.TILE_SIZE}px")
+    print(f"  {'scenario':<10} {'full ms/frame':>14} {'full KB/frame':>14} {'tiles ms/frame':>15} "
+          f"{'tiles KB/frame':>15} {'keyframes':>10}")
+    for name in ('caret', 'typing', 'scrolling'):
+        frames = list(scenario_frames(name, args.frames))
+
+        start = time.process_time()
+        full_bytes = sum(len(full_jpeg(frame, args.quality)) for frame in frames)
+        full_cpu = time.process_time() - start
+
+        # Simulated clock so keyframes come at the real interval for FPS frames per second
+        clock = [0.0]
+        encoder = TileDeltaEncoder(quality=args.quality, clock=lambda: clock[0])
+        start = time.process_time()
+        tile_bytes = 0
+        for frame in frames:
+            result = encoder.encode(frame)
+            if result is not None:
+                tile_bytes += len(result[1])
+            clock[0] += 1.0 / FPS
+        tile_cpu = time.process_time() - start
+
+        count = len(frames)
+        print(f"  {name:<10} {full_cpu / count * 1000:14.2f} {full_bytes / count / 1024:14.1f} "
+              f"{tile_cpu / count * 1000:15.2f} {tile_bytes / count / 1024:15.1f} "
+              f"{encoder.get_stats()['keyframes']:10d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Time to inject a block of text: one TYPE per character vs one TYPE_TEXT.
+
+Starts the same headless RemoteServer as bench_input_path.py (RecordingInputSink,
+temporary home directory) and measures from the first send() until the sink
+has recorded the whole text. TYPE pipelines one command per character;
+TYPE_TEXT sends the text as a single @<length>: framed command, 100 KB
+pastes included. The last columns show how many SendInput calls
+NativeInputSink would make for it.
+
+Usage:
+    python benchmarks/bench_type_text.py [--chars N ...] [--repeat N]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_input_path import write_config, start_server, connect, drain
+from input_sink import RecordingInputSink, MAX_INPUTS_PER_CALL, text_key_units
+
+SAMPLE = "The quick brown fox jumps over the lazy dog. Ünïcödé ✓ 日本語 🙂\n"
+
+
+def make_text(chars):
+    return (SAMPLE * (chars // len(SAMPLE) + 1))[:chars]
+
+
+def wait_for(sink, count, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while len(sink.events) < count:
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Only {len(sink.events)} of {count} injections recorded")
+        time.sleep(0)
+    return sink.events[count - 1].timestamp
+
+
+def per_character(client, sink, text):
+    # Newlines can't be sent as TYPE, so they count as Enter like the app does
+    commands = ''.join('KEY:enter\n' if char == '\n' else f"TYPE:{char}\n" for char in text)
+    sink.clear()
+    start = time.perf_counter()
+    client.sendall(commands.encode())
+    end = wait_for(sink, len(text))
+    drain(client)
+    return end - start
+
+
+def one_command(client, sink, text):
+    payload = f"TYPE_TEXT:{text}".encode()
+    sink.clear()
+    start = time.perf_counter()
+    client.sendall(f"@{len(payload)}:".encode() + payload)
+    end = wait_for(sink, 1)
+    drain(client)
+    return end - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--chars', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = os.environ['USERPROFILE'] = home
+        os.chdir(home)
+        write_config(home, 240, 'threaded')
+
+        sink = RecordingInputSink()
+        server = start_server(sink)
+        client = connect(server)
+
+        print(f"{'chars':>7}{'TYPE x N':>14}{'TYPE_TEXT':>14}{'key strokes':>14}{'SendInput calls':>18}")
+        for chars in args.chars:
+            text = make_text(chars)
+            slow = statistics.median(per_character(client, sink, text) for _ in range(args.repeat))
+            fast = statistics.median(one_command(client, sink, text) for _ in range(args.repeat))
+            strokes = len(text_key_units(text))
+            calls = math.ceil(strokes * 2 / MAX_INPUTS_PER_CALL)
+            print(f"{chars:>7}{slow * 1000:>11.2f} ms{fast * 1000:>11.2f} ms{strokes:>14}{calls:>18}")
+
+        client.close()
+        server.stop()
+        server.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Multi-client load generator for the control port.
+
+Starts a headless RemoteServer (services=False) with a RecordingInputSink,
+connects N simulated clients over TCP with the real PIN handshake and has
+each one send a command mix open-loop at fixed rates for --duration
+seconds. Reports throughput and command-to-injection latency per command
+type, and writes the results as JSON for comparison across versions.
+
+A mix is COMMAND=rate_per_client_per_second, e.g. the default
+    MOUSE_MOVE=500,KEY=5,SCROLL=10,TYPE_TEXT=2
+
+Commands are tagged so each injected event can be matched to the command
+that caused it:
+    KEY        each client presses its own key (a-z, 0-9: 36 clients max)
+    SCROLL     each client scrolls by its own intensity
+    TYPE_TEXT  every command types unique text
+These latencies are exact. MOUSE_MOVE is coalesced into one cursor update
+per scheduler tick, so its latency is estimated as the time from the send
+to the first cursor update after it (a lower bound). Other commands
+(MOUSE_CLICK, GAMEPAD_BUTTON, ...) are sent but only counted.
+
+Usage:
+    python benchmarks/load_generator.py [--clients N] [--duration S] [--mix SPEC]
+        [--motion-rate HZ] [--no-ack-stream]
+        [--output results.json]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_input_path import write_config, start_server
+from input_sink import RecordingInputSink, KEY, TEXT
+
+DEFAULT_MIX = 'MOUSE_MOVE=500,KEY=5,SCROLL=10,TYPE_TEXT=2'
+KEY_POOL = 'abcdefghijklmnopqrstuvwxyz0123456789'
+SCROLL_STEP = 60  # Wheel delta per intensity step (RemoteServer.handle_scroll)
+
+# command -> line template; {client}, {seq}, {key} and {intensity} are filled in per command
+TEMPLATES = {
+    'MOUSE_MOVE': 'MOUSE_MOVE:3:-2',
+    'KEY': 'KEY:{key}',
+    'SCROLL': 'SCROLL:up:{intensity}',
+    'TYPE_TEXT': 'TYPE_TEXT:t{client}n{seq}',
+    'MOUSE_CLICK': 'MOUSE_CLICK:left',
+    'GAMEPAD_BUTTON': 'GAMEPAD_BUTTON:a:press',
+    'PING': 'PING',
+}
+EXACT = ('KEY', 'SCROLL', 'TYPE_TEXT')
+ESTIMATED = ('MOUSE_MOVE',)
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        name = name.strip().upper()
+        if name not in TEMPLATES:
+            raise SystemExit(f"Unknown command {name!r}; choose from {', '.join(TEMPLATES)}")
+        mix[name] = float(rate)
+    return mix
+
+
+class SimulatedClient:
+    """One device: authenticates, then sends its mix open-loop and drains replies"""
+
+    def __init__(self, index, address, pin, mix, no_ack_stream):
+        self.index = index
+        self.mix = mix
+        self.sends = {name: [] for name in mix}  # command -> perf_counter send times
+        self.texts = []                          # (text, send time) of TYPE_TEXT commands
+        self.max_lag = 0.0                       # Worst time a send was behind schedule
+        self.received = 0
+        self.sock = socket.create_connection(address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        expect(self.sock, b'AUTH_REQUIRED')
+        self.sock.sendall(json.dumps({'pin': pin}).encode() + b'\n')
+        expect(self.sock, b'AUTH_SUCCESS')
+        if no_ack_stream:
+            self.sock.sendall(b'CAPS:NO_ACK_STREAM\n')
+        self.reader = threading.Thread(target=self._drain, daemon=True)
+        self.reader.start()
+
+    def command(self, name, seq):
+        return TEMPLATES[name].format(client=self.index, seq=seq, key=KEY_POOL[self.index],
+                                      intensity=self.index + 1).encode() + b'\n'
+
+    def run(self, start, duration):
+        interval = {name: 1.0 / rate for name, rate in self.mix.items()}
+        due = {name: start + interval[name] * (self.index + 1) / (len(self.mix) + 1) for name in self.mix}
+        seq = 0
+        end = start + duration
+        while True:
+            name = min(due, key=due.get)
+            when = due[name]
+            if when >= end:
+                break
+            now = time.perf_counter()
+            if when > now:
+                time.sleep(when - now)
+            else:
+                self.max_lag = max(self.max_lag, now - when)
+            line = self.command(name, seq)
+            sent = time.perf_counter()
+            self.sends[name].append(sent)
+            if name == 'TYPE_TEXT':
+                self.texts.append((line[len('TYPE_TEXT:'):-1].decode(), sent))
+            self.sock.sendall(line)
+            due[name] = when + interval[name]
+            seq += 1
+
+    def _drain(self):
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                self.received += len(data)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+def expect(sock, reply):
+    data = sock.recv(len(reply))
+    if data != reply:
+        raise RuntimeError(f"Expected {reply!r}, got {data!r}")
+
+
+def injected_tags(sink):
+    """{(command, tag): [injection times]} for every tagged input the sink recorded"""
+    tags = {}
+
+    def add(key, timestamp):
+        tags.setdefault(key, []).append(timestamp)
+
+    with sink.lock:
+        events = list(sink.events)
+    for event in events:
+        if event.action == 'scroll':
+            add(('SCROLL', abs(event.args[0]) // SCROLL_STEP), event.timestamp)
+        elif event.action in ('move_to', 'move_relative'):
+            add(('MOUSE_MOVE', None), event.timestamp)
+        elif event.action == 'batch':
+            for item in event.args:
+                if item[0] == KEY and item[2]:
+                    add(('KEY', item[1]), event.timestamp)
+                elif item[0] == TEXT:
+                    add(('TYPE_TEXT', item[1]), event.timestamp)
+        elif event.action in ('key_down', 'key_press'):
+            add(('KEY', event.args[0]), event.timestamp)
+        elif event.action == 'type_text':
+            add(('TYPE_TEXT', event.args[0]), event.timestamp)
+    return tags, len(events)
+
+
+def latencies(clients, tags):
+    """command -> latencies in seconds, matched per client"""
+    result = {name: [] for name in EXACT + ESTIMATED}
+    moves = sorted(tags.get(('MOUSE_MOVE', None), []))
+    for client in clients:
+        for name, sends in client.sends.items():
+            if name in ('KEY', 'SCROLL'):
+                # A client's tagged commands are injected in the order it sent them
+                tag = KEY_POOL[client.index] if name == 'KEY' else client.index + 1
+                result[name] += [injected - sent for sent, injected in zip(sends, tags.get((name, tag), []))]
+            elif name == 'TYPE_TEXT':
+                for text, sent in client.texts:
+                    injected = tags.get(('TYPE_TEXT', text))
+                    if injected:
+                        result[name].append(injected[0] - sent)
+            elif name == 'MOUSE_MOVE':
+                for sent in sends:
+                    index = bisect.bisect_left(moves, sent)
+                    if index < len(moves):
+                        result[name].append(moves[index] - sent)
+    return result
+
+
+def summarize(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(fraction):
+        return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1e6, 1)
+
+    return {'count': len(values), 'p50_us': pick(0.50), 'p95_us': pick(0.95), 'p99_us': pick(0.99),
+            'max_us': round(values[-1] * 1e6, 1)}
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--clients', type=int, default=2)
+    arg_parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    arg_parser.add_argument('--mix', default=DEFAULT_MIX, help='COMMAND=rate per client per second, comma separated')
+    arg_parser.add_argument('--motion-rate', default='240', help='[Input] motion_rate_hz for the run')
+    arg_parser.add_argument('--no-ack-stream', action='store_true', help='negotiate CAPS:NO_ACK_STREAM')
+    arg_parser.add_argument('--output', default='load_results.json', help='JSON results file')
+    args = arg_parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if 'KEY' in mix and args.clients > len(KEY_POOL):
+        raise SystemExit(f"KEY tagging supports at most {len(KEY_POOL)} clients")
+    output = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ['HOME'] = os.environ['USERPROFILE'] = home
+        os.chdir(home)  # remote_server.log goes to the working directory
+        write_config(home, args.motion_rate)
+
+        sink = RecordingInputSink()
+        server = start_server(sink)
+        address = server.server.getsockname()
+        clients = [SimulatedClient(index, address, server.get_current_pin(), mix, args.no_ack_stream)
+                   for index in range(args.clients)]
+
+        start = time.perf_counter() + 0.1
+        threads = [threading.Thread(target=client.run, args=(start, args.duration)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        time.sleep(0.5)  # Let queued input reach the sink
+
+        tags, injections = injected_tags(sink)
+        measured = latencies(clients, tags)
+        for client in clients:
+            client.close()
+        server.stop()
+        server.quit()
+
+    sent = {name: sum(len(client.sends[name]) for client in clients) for name in mix}
+    total_sent = sum(sent.values())
+    results = {
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'clients': args.clients,
+            'duration_seconds': args.duration,
+            'mix': mix,
+            'motion_rate_hz': args.motion_rate,
+            'no_ack_stream': args.no_ack_stream,
+        },
+        'throughput': {
+            'commands_sent': total_sent,
+            'commands_per_second': round(total_sent / elapsed, 1),
+            'injections': injections,
+            'injections_per_second': round(injections / elapsed, 1),
+        },
+        'commands': {
+            name: {
+                'sent': sent[name],
+                'per_second': round(sent[name] / elapsed, 1),
+                'latency': 'exact' if name in EXACT else 'estimate' if name in ESTIMATED else None,
+                'latency_us': summarize(measured.get(name, [])),
+            } for name in mix
+        },
+        'clients': [{'client': client.index, 'sent': sum(map(len, client.sends.values())),
+                     'max_schedule_lag_ms': round(client.max_lag * 1000, 2)} for client in clients],
+    }
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    throughput = results['throughput']
+    print(f"clients={args.clients} duration={args.duration}s "
+          f"motion_rate_hz={args.motion_rate}")
+    print(f"  sent {throughput['commands_per_second']:.0f} commands/s, "
+          f"injected {throughput['injections_per_second']:.0f} events/s")
+    for name, stats in results['commands'].items():
+        latency = stats['latency_us']
+        if latency:
+            note = ' (estimate)' if stats['latency'] == 'estimate' else ''
+            print(f"  {name:<15} {stats['per_second']:8.1f}/s p50={latency['p50_us']:7.0f}us "
+                  f"p95={latency['p95_us']:7.0f}us p99={latency['p99_us']:7.0f}us{note}")
+        else:
+            print(f"  {name:<15} {stats['per_second']:8.1f}/s")
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
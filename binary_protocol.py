@@ -0,0 +1,87 @@
+"""
+Compact binary framing for high-rate input events on the control channel.
+
+A client that negotiated CAPS:BINARY may mix fixed-size binary frames with
+the regular text commands. Every binary frame is
+
+    0xFF <opcode:u8> <payload>
+
+where the payload layout is fixed per opcode (little-endian). 0xFF never
+occurs in UTF-8 text, so a frame can always be told apart from a text
+command at a command boundary.
+"""
+
+import struct
+
+FRAME_MARKER = 0xFF
+
+# Opcodes
+OP_MOUSE_MOVE = 0x01      # dx:i16, dy:i16
+OP_SCROLL = 0x02          # direction:i8 (+1 up, -1 down), intensity:u8
+OP_MOUSE_BUTTON = 0x03    # button:u8, action:u8
+OP_GAMEPAD_STICK = 0x04   # stick:u8, x:f32, y:f32
+OP_GAMEPAD_GYRO = 0x05    # rot_x:f32, rot_y:f32
+OP_GAMEPAD_MOTION = 0x06  # tilt_x:f32, tilt_y:f32
+OP_GAMEPAD_BUTTON = 0x07  # button:u8, action:u8
+OP_KEY = 0x08             # virtual_key:u16, action:u8
+
+FRAME_STRUCTS = {
+    OP_MOUSE_MOVE: struct.Struct('<hh'),
+    OP_SCROLL: struct.Struct('<bB'),
+    OP_MOUSE_BUTTON: struct.Struct('<BB'),
+    OP_GAMEPAD_STICK: struct.Struct('<Bff'),
+    OP_GAMEPAD_GYRO: struct.Struct('<ff'),
+    OP_GAMEPAD_MOTION: struct.Struct('<ff'),
+    OP_GAMEPAD_BUTTON: struct.Struct('<BB'),
+    OP_KEY: struct.Struct('<HB'),
+}
+
+# Text command each opcode stands in for (used for acks and logging)
+OPCODE_NAMES = {
+    OP_MOUSE_MOVE: 'MOUSE_MOVE',
+    OP_SCROLL: 'SCROLL',
+    OP_MOUSE_BUTTON: 'MOUSE_BUTTON',
+    OP_GAMEPAD_STICK: 'GAMEPAD_STICK',
+    OP_GAMEPAD_GYRO: 'GAMEPAD_GYRO',
+    OP_GAMEPAD_MOTION: 'GAMEPAD_MOTION',
+    OP_GAMEPAD_BUTTON: 'GAMEPAD_BUTTON',
+    OP_KEY: 'KEY',
+}
+
+# Enumerations used inside payloads
+MOUSE_BUTTONS = ('left', 'right', 'middle')
+STICKS = ('left', 'right')
+GAMEPAD_BUTTONS = (
+    'a', 'b', 'x', 'y',
+    'dpad_up', 'dpad_down', 'dpad_left', 'dpad_right',
+    'l1', 'l2', 'r1', 'r2',
+    'start', 'select', 'home',
+)
+
+ACTION_CLICK = 0    # MOUSE_BUTTON click / KEY press-and-release
+ACTION_DOWN = 1     # button/key down, gamepad 'press'
+ACTION_UP = 2       # button/key up, gamepad 'release'
+
+
+def encode(opcode, *values):
+    """Build a binary frame; mainly for clients, tools and benchmarks"""
+    return bytes((FRAME_MARKER, opcode)) + FRAME_STRUCTS[opcode].pack(*values)
+
+
+def decode(buf, pos):
+    """Decode the frame starting at buf[pos] (which must be FRAME_MARKER).
+
+    Returns ((opcode, values), next_pos), or None if the frame is incomplete.
+    Raises ValueError for an unknown opcode, since the stream cannot be
+    resynchronized after it.
+    """
+    if pos + 2 > len(buf):
+        return None
+    opcode = buf[pos + 1]
+    frame_struct = FRAME_STRUCTS.get(opcode)
+    if frame_struct is None:
+        raise ValueError(f"Unknown binary opcode 0x{opcode:02x}")
+    stop = pos + 2 + frame_struct.size
+    if stop > len(buf):
+        return None
+    return (opcode, frame_struct.unpack_from(buf, pos + 2)), stop
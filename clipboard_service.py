@@ -2,6 +2,11 @@ import socket
 import threading
 import pyperclip
 import logging
+import metrics
+
+requests_total = metrics.counter('anycommand_clipboard_requests_total', 'Clipboard requests by command', ('command',))
+clipboard_bytes = metrics.counter('anycommand_clipboard_bytes_total', 'Clipboard text bytes moved',
+                                  ('direction',))
 
 class ClipboardService:
     def __init__(self, port=8084):
@@ -20,6 +25,13 @@ class ClipboardService:
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
     
+    def get_text(self):
+        """Current clipboard text ('' if empty or not text)"""
+        return pyperclip.paste() or ""
+
+    def set_text(self, text):
+        pyperclip.copy(text)
+
     def start(self):
         if self.is_running:
             return
@@ -70,7 +82,10 @@ class ClipboardService:
                         # Add error handling for empty clipboard
                         if not content:
                             content = ""
-                        client.sendall(content.encode('utf-8'))
+                        payload = content.encode('utf-8')
+                        client.sendall(payload)
+                        requests_total.labels('get').inc()
+                        clipboard_bytes.labels('to_client').inc(len(payload))
                     except Exception as e:
                         self.logger.error(f"Error getting clipboard: {e}")
                         client.sendall("".encode('utf-8'))
@@ -80,6 +95,8 @@ class ClipboardService:
                         content = command[14:]  # Remove 'SET_CLIPBOARD:' prefix
                         if content:  # Only set if content is not empty
                             pyperclip.copy(content)
+                            requests_total.labels('set').inc()
+                            clipboard_bytes.labels('from_client').inc(len(data) - len(b'SET_CLIPBOARD:'))
                             # Send confirmation back to client
                             client.sendall("SUCCESS".encode('utf-8'))
                     except Exception as e:
@@ -0,0 +1,181 @@
+"""
+Incremental command framing for the port-8000 control channel.
+
+The phone streams commands much faster than one recv() per command, so a
+single read routinely contains several commands (and sometimes half of the
+next one). CommandParser keeps one reusable buffer per connection and pulls
+every complete command out of each read.
+
+Framing:
+    MOUSE_MOVE:3:-1\\n          newline-terminated text command
+    @11:TYPE_TEXT:a\\nb         length-framed command, payload may contain '\\n'
+    0xFF <opcode> <payload>     binary input event, see binary_protocol.py
+
+Text commands come back as str, binary events as (opcode, values) tuples.
+A command over the size limit comes back as OversizedCommand: its bytes are
+skipped (up to the next newline, or the frame's declared length) so the
+connection stays usable and the server can answer ERROR.
+Newline-terminated and legacy commands are normalised the same way (see
+normalize_command()); a length-framed payload is returned exactly as sent.
+
+Older app builds never terminate their commands. Until the first newline is
+seen on a connection, each read is treated as exactly one command, which is
+what the server always did.
+"""
+
+from collections import namedtuple
+
+import binary_protocol
+
+MAX_COMMAND_LENGTH = 64 * 1024       # Longest newline-terminated command we are willing to buffer
+MAX_FRAME_LENGTH = 4 * 1024 * 1024   # Longest @<length>: frame (TYPE_TEXT pastes of a few 100 KB)
+RECV_BUFFER_SIZE = 64 * 1024         # Size of the reusable recv_into() buffer
+
+LENGTH_FRAME_PREFIX = ord('@')
+BINARY_FRAME_MARKER = binary_protocol.FRAME_MARKER
+NEWLINE = b'\n'
+
+
+# Placeholder for a command that was too long and skipped; length is in bytes (None if unknown)
+OversizedCommand = namedtuple('OversizedCommand', 'length')
+
+
+def normalize_command(text):
+    """Drop leading whitespace and the line terminator; trailing spaces are payload ("TYPE: ")"""
+    return text.lstrip().rstrip('\r\n')
+
+
+class CommandParser:
+    """Split a control-channel byte stream into complete commands"""
+
+    def __init__(self, max_command_length=MAX_COMMAND_LENGTH, recv_buffer_size=RECV_BUFFER_SIZE,
+                 max_frame_length=MAX_FRAME_LENGTH):
+        self.max_command_length = max_command_length
+        self.max_frame_length = max_frame_length
+        self.buffer = bytearray()
+        self.framed = False  # Becomes True once the client terminates a command
+        self.skip = 0                # Bytes of an oversized length frame still to discard
+        self.skip_line = False       # Discarding an oversized command up to its newline
+        self._recv_buffer = bytearray(recv_buffer_size)
+        self._recv_view = memoryview(self._recv_buffer)
+
+    def receive(self, sock):
+        """Read once from sock and return the complete commands.
+
+        Returns None when the peer closed the connection. The returned list
+        may be empty if only part of a command has arrived so far.
+        """
+        received = sock.recv_into(self._recv_buffer)
+        if not received:
+            return None
+        return self.feed(self._recv_view[:received])
+
+    def feed(self, data):
+        """Append raw bytes and return every complete command"""
+        buf = self.buffer
+        if self.skip:
+            # Rest of an oversized length frame
+            skipped = min(self.skip, len(data))
+            self.skip -= skipped
+            data = data[skipped:]
+        buf += data
+        if not buf:
+            return []
+
+        if not self.framed:
+            if NEWLINE not in buf and buf[0] not in (LENGTH_FRAME_PREFIX, BINARY_FRAME_MARKER):
+                # Legacy client: one read is one command
+                command = normalize_command(buf.decode('utf-8', errors='replace'))
+                buf.clear()
+                return [command] if command.strip() else []
+            self.framed = True
+
+        commands = []
+        frame_structs = binary_protocol.FRAME_STRUCTS
+        pos = 0
+        end = len(buf)
+        if self.skip_line:
+            newline = buf.find(NEWLINE)
+            if newline < 0:
+                buf.clear()
+                return commands
+            self.skip_line = False
+            pos = newline + 1
+
+        while pos < end:
+            lead = buf[pos]
+            if lead == BINARY_FRAME_MARKER:
+                # Inlined binary_protocol.decode(); this is the hottest path
+                if pos + 2 > end:
+                    break
+                opcode = buf[pos + 1]
+                frame_struct = frame_structs.get(opcode)
+                if frame_struct is None:
+                    raise ValueError(f"Unknown binary opcode 0x{opcode:02x}")
+                stop = pos + 2 + frame_struct.size
+                if stop > end:
+                    break
+                commands.append((opcode, frame_struct.unpack_from(buf, pos + 2)))
+                pos = stop
+                continue
+
+            if lead == LENGTH_FRAME_PREFIX:
+                frame = self._parse_length_frame(buf, pos)
+                if frame is None:
+                    break
+                command, pos = frame
+                commands.append(command)
+                if pos > end:
+                    # Oversized frame: drop what arrived of it and skip the rest as it comes
+                    self.skip = pos - end
+                    pos = end
+                continue
+
+            newline = buf.find(NEWLINE, pos)
+            if newline < 0:
+                break
+            command = normalize_command(buf[pos:newline].decode('utf-8', errors='replace'))
+            if command.strip():
+                commands.append(command)
+            pos = newline + 1
+
+        if pos:
+            del buf[:pos]
+        if len(buf) > self.max_command_length and buf[0] not in (LENGTH_FRAME_PREFIX, BINARY_FRAME_MARKER):
+            # No terminator in sight: report it once and drop everything up to the next newline
+            buf.clear()
+            self.skip_line = True
+            commands.append(OversizedCommand(None))
+        return commands
+
+    def _parse_length_frame(self, buf, pos):
+        """Parse '@<length>:<payload>' at pos; return (command, next_pos) or None if incomplete.
+
+        An oversized frame returns (OversizedCommand, pos past its payload),
+        which may lie beyond the data received so far.
+        """
+        colon = buf.find(b':', pos + 1, pos + 12)
+        if colon < 0:
+            if len(buf) - pos >= 12:
+                raise ValueError("Malformed length-framed command")
+            return None
+        try:
+            length = int(buf[pos + 1:colon])
+        except ValueError:
+            raise ValueError("Malformed length-framed command")
+        if length < 0:
+            raise ValueError("Malformed length-framed command")
+
+        start = colon + 1
+        stop = start + length
+        if length > self.max_frame_length:
+            return OversizedCommand(length), stop
+        if stop > len(buf):
+            return None
+        return buf[start:stop].decode('utf-8', errors='replace'), stop
+
+    def reset(self):
+        """Drop any partially received command"""
+        self.buffer.clear()
+        self.skip = 0
+        self.skip_line = False
@@ -0,0 +1,184 @@
+"""
+Table-driven dispatch for control-channel commands.
+
+Text commands are looked up by name and binary frames by opcode, both in a
+single dict lookup. Timing can be switched on at runtime; while it is off the
+registry calls handlers directly and adds no overhead.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (10 us .. 1 s, then +Inf)
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, sum and max"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Estimate a percentile as the upper bound of the bucket that contains it"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p95_ms': round(self.percentile(0.95) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+        }
+
+
+class CommandRegistry:
+    """Map command names and binary opcodes to handler callables"""
+
+    def __init__(self, timing=False):
+        self.lock = threading.Lock()
+        self.timing = timing
+        self.handlers = {}          # name -> handler
+        self.prefix_handlers = []   # (prefix, handler), tried in order when a name is unknown
+        self.opcode_handlers = {}   # opcode -> (name, handler)
+        self.histograms = {}        # name -> LatencyHistogram
+        self.hooks = []             # callables(name, seconds) run after each timed command
+
+        # What dispatch() actually calls: the raw handler, or a timing wrapper
+        self._dispatch_table = {}
+        self._opcode_table = {}
+
+    def register(self, name, handler):
+        """Register a handler(client, data, params) for a text command"""
+        with self.lock:
+            self.handlers[name] = handler
+            self._dispatch_table[name] = self._wrap(name, handler)
+
+    def register_prefix(self, prefix, handler):
+        """Register a handler for every command name starting with prefix"""
+        with self.lock:
+            self.prefix_handlers.append((prefix, handler))
+
+    def register_opcode(self, opcode, name, handler):
+        """Register a handler(*values) for a binary opcode; stats are kept under name"""
+        with self.lock:
+            self.opcode_handlers[opcode] = (name, handler)
+            self._opcode_table[opcode] = self._wrap(name, handler)
+
+    def unregister(self, name):
+        with self.lock:
+            self.handlers.pop(name, None)
+            self._dispatch_table.pop(name, None)
+
+    def command(self, name):
+        """Decorator form of register()"""
+        def decorator(handler):
+            self.register(name, handler)
+            return handler
+        return decorator
+
+    def dispatch(self, name, client, data, params):
+        """Run the handler for a text command; returns False if none is registered.
+
+        A handler that raises is logged and answered with ERROR, so one bad
+        command does not take the client's connection down.
+        """
+        handler = self._dispatch_table.get(name)
+        if handler is None:
+            for prefix, prefix_handler in self.prefix_handlers:
+                if name.startswith(prefix):
+                    handler = self._wrap(prefix, prefix_handler)
+                    break
+            else:
+                return False
+        try:
+            handler(client, data, params)
+        except Exception as e:
+            logging.error(f"Command {name} failed: {e}")
+            try:
+                client.send(b'ERROR\n')
+            except OSError:
+                pass
+        return True
+
+    def dispatch_opcode(self, opcode, values):
+        """Run the handler for a binary opcode; returns False if none is registered"""
+        handler = self._opcode_table.get(opcode)
+        if handler is None:
+            return False
+        handler(*values)
+        return True
+
+    def set_timing(self, enabled):
+        """Turn per-command timing on or off at runtime"""
+        with self.lock:
+            self.timing = enabled
+            self._dispatch_table = {name: self._wrap(name, handler)
+                                    for name, handler in self.handlers.items()}
+            self._opcode_table = {opcode: self._wrap(name, handler)
+                                  for opcode, (name, handler) in self.opcode_handlers.items()}
+        logging.info(f"Command timing {'enabled' if enabled else 'disabled'}")
+
+    def add_hook(self, hook):
+        """Call hook(name, seconds) after every timed command"""
+        with self.lock:
+            self.hooks.append(hook)
+
+    def get_stats(self):
+        """Per-command count and latency percentiles (only collected while timing is on)"""
+        with self.lock:
+            return {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())}
+
+    def reset_stats(self):
+        with self.lock:
+            self.histograms = {}
+
+    def _wrap(self, name, handler):
+        if not self.timing:
+            return handler
+
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                self._record(name, time.perf_counter() - start)
+
+        return timed
+
+    def _record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        histogram.observe(seconds)
+        for hook in self.hooks:
+            try:
+                hook(name, seconds)
+            except Exception as e:
+                logging.error(f"Command timing hook failed: {e}")
@@ -0,0 +1,195 @@
+"""
+Cached display topology for cursor clamping and coordinate conversion.
+
+Relative motion, MOUSE_CLICK_POS and the screen-share cursor overlay all need
+the screen geometry. Asking Windows for it on every event costs two syscalls
+per move and only ever sees the primary monitor. DisplayTopology keeps the
+virtual-screen bounds and every monitor rect, and refreshes
+them when invalidate() is called or after refresh_interval seconds.
+
+The server entry points call enable_dpi_awareness() first thing. In a
+per-monitor DPI aware process, monitor rects, cursor positions, SendInput
+coordinates and screen grabs are all physical pixels, so monitors need no
+DPI scale factor. Without it, Windows would virtualize the geometry of
+scaled monitors and clicks would land off target.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_REFRESH_INTERVAL = 2.0  # Seconds between cheap re-reads of the layout
+
+MONITORINFOF_PRIMARY = 1
+PROCESS_PER_MONITOR_DPI_AWARE = 2
+
+
+class Monitor(namedtuple('Monitor', 'left top right bottom primary')):
+    """One monitor in virtual-desktop pixels; right/bottom are exclusive"""
+
+    __slots__ = ()
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+    def contains(self, x, y):
+        return self.left <= x < self.right and self.top <= y < self.bottom
+
+    def clamp(self, x, y):
+        return (max(self.left, min(x, self.right - 1)),
+                max(self.top, min(y, self.bottom - 1)))
+
+
+def enable_dpi_awareness():
+    """Make the process DPI aware so every coordinate is in physical pixels.
+
+    Must run before anything creates a window or imports pyautogui, which
+    sets a weaker (system-wide) awareness of its own. Returns False when
+    awareness could not be set (not Windows, or already set differently).
+    """
+    try:
+        import ctypes
+        windll = ctypes.windll
+    except (ImportError, AttributeError):
+        return False  # Not Windows
+
+    try:
+        # Windows 8.1+: per-monitor, so each monitor's rect is physical pixels
+        return windll.shcore.SetProcessDpiAwareness(PROCESS_PER_MONITOR_DPI_AWARE) == 0
+    except (AttributeError, OSError):
+        pass
+    try:
+        # Vista to Windows 8: system-wide awareness only
+        return bool(windll.user32.SetProcessDPIAware())
+    except (AttributeError, OSError):
+        return False
+
+
+def single_monitor_layout(width, height):
+    """Layout with one primary monitor at the origin (headless sinks, fallbacks)"""
+    return [Monitor(0, 0, int(width), int(height), True)]
+
+
+def query_windows_layout():
+    """Read every monitor rect from Windows"""
+    import win32api
+
+    monitors = []
+    for handle, _, _ in win32api.EnumDisplayMonitors():
+        info = win32api.GetMonitorInfo(handle)
+        left, top, right, bottom = info['Monitor']
+        monitors.append(Monitor(left, top, right, bottom, bool(info['Flags'] & MONITORINFOF_PRIMARY)))
+    return monitors
+
+
+class DisplayTopology:
+    """Virtual-screen bounds and monitor rects, cached between refreshes"""
+
+    def __init__(self, query=query_windows_layout, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        query: callable returning a list of Monitor; the default asks Windows.
+        refresh_interval: seconds after which the layout is re-read on next use.
+        """
+        self.query = query
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.monitors = []
+        self.primary = None
+        self.bounds = (0, 0, 0, 0)  # left, top, right, bottom of the virtual screen
+        self._expires = 0.0
+        self._last_monitor = None
+        self.refresh()
+
+    def invalidate(self):
+        """Re-read the layout on next use (call on WM_DISPLAYCHANGE / DPI change)"""
+        self._expires = 0.0
+
+    def refresh(self):
+        try:
+            monitors = self.query()
+        except Exception as e:
+            logging.error(f"Could not read display layout: {e}")
+            monitors = []
+        if not monitors:
+            # Keep the last known layout rather than clamping everything to a point
+            monitors = self.monitors or single_monitor_layout(1920, 1080)
+
+        primary = next((m for m in monitors if m.primary), monitors[0])
+        bounds = (min(m.left for m in monitors), min(m.top for m in monitors),
+                  max(m.right for m in monitors), max(m.bottom for m in monitors))
+
+        with self.lock:
+            changed = monitors != self.monitors
+            self.monitors = monitors
+            self.primary = primary
+            self.bounds = bounds
+            self._last_monitor = primary
+            self._expires = time.monotonic() + self.refresh_interval
+        if changed:
+            logging.info(f"Display layout: {len(monitors)} monitor(s), virtual screen {bounds}")
+
+    def _current(self):
+        if time.monotonic() >= self._expires:
+            self.refresh()
+        return self.monitors
+
+    def get_bounds(self):
+        """(left, top, right, bottom) of the virtual screen; right/bottom are exclusive"""
+        self._current()
+        return self.bounds
+
+    def monitor_at(self, x, y):
+        """The monitor containing (x, y), or None if the point is off every screen"""
+        for monitor in self._current():
+            if monitor.contains(x, y):
+                return monitor
+        return None
+
+    def clamp(self, x, y):
+        """Clamp a point to the nearest monitor, so gaps between monitors are skipped"""
+        monitors = self._current()
+        last = self._last_monitor
+        if last is not None and last.contains(x, y):
+            return x, y
+
+        best = None
+        best_distance = None
+        for monitor in monitors:
+            if monitor.contains(x, y):
+                self._last_monitor = monitor
+                return x, y
+            clamped = monitor.clamp(x, y)
+            distance = (clamped[0] - x) ** 2 + (clamped[1] - y) ** 2
+            if best_distance is None or distance < best_distance:
+                best, best_distance = clamped, distance
+        return best
+
+    def percent_to_pixel(self, percent_x, percent_y, monitor=None):
+        """Convert a position in percent of a monitor (primary by default) to pixels"""
+        self._current()
+        monitor = monitor or self.primary
+        x = monitor.left + int((percent_x / 100.0) * monitor.width)
+        y = monitor.top + int((percent_y / 100.0) * monitor.height)
+        return monitor.clamp(x, y)
+
+    def to_image(self, x, y, image_size, monitor=None):
+        """Map a desktop point onto a captured image of a monitor (primary by default).
+
+        The image may be scaled, and with DPI virtualization its pixels need
+        not match desktop coordinates, so the mapping uses the ratio between
+        the monitor rect and the image size. Returns None if the point is off
+        that monitor.
+        """
+        self._current()
+        monitor = monitor or self.primary
+        if not monitor.contains(x, y):
+            return None
+        image_width, image_height = image_size
+        return (int((x - monitor.left) * image_width / monitor.width),
+                int((y - monitor.top) * image_height / monitor.height))
@@ -6,6 +6,16 @@ import time
 import json
 import configparser
 from pathlib import Path
+import metrics
+import profiler
+
+bytes_received_total = metrics.counter('anycommand_file_bytes_received_total', 'File bytes received from clients')
+bytes_sent_total = metrics.counter('anycommand_file_bytes_sent_total', 'File bytes sent to clients')
+transfers_total = metrics.counter('anycommand_file_transfers_total', 'File transfers by direction and result',
+                                  ('direction', 'result'))
+# Throughput is bytes / duration: rate(..._bytes_*_total) / rate(..._transfer_seconds_sum)
+transfer_seconds = metrics.histogram('anycommand_file_transfer_seconds', 'File transfer duration', ('direction',),
+                                     buckets=metrics.DURATION_BUCKETS)
 
 class FileTransferService:
     def __init__(self, port=8082):
@@ -185,6 +195,7 @@ class FileTransferService:
         client.sendall(f"FILES:{','.join(files)}\n".encode())
         self.logger.info(f"Sent file list: {len(files)} files")
     
+    @profiler.timed('receive_file')
     def receive_file(self, client, filename, filesize):
         """Receive a file from the client"""
         try:
@@ -194,9 +205,10 @@ class FileTransferService:
             
             # Receive file data
             self.logger.info(f"Receiving file: {safe_name} ({filesize} bytes)")
+            start = time.perf_counter()
+            bytes_received = 0
             
             with open(file_path, 'wb') as f:
-                bytes_received = 0
                 buffer_size = 4096  # Match client chunk size
                 
                 # Set a timeout for receiving data
@@ -228,11 +240,15 @@ class FileTransferService:
             # Check if we received the complete file
             if bytes_received == filesize:
                 self.logger.info(f"File received successfully: {safe_name} ({filesize} bytes)")
+                self._record_transfer('receive', 'ok', bytes_received, start)
             else:
                 self.logger.error(f"Incomplete file: {bytes_received}/{filesize} bytes")
+                self._record_transfer('receive', 'incomplete', bytes_received, start)
         except Exception as e:
             self.logger.error(f"Error receiving file: {e}")
+            transfers_total.labels('receive', 'error').inc()
     
+    @profiler.timed('send_file')
     def send_file(self, client, filename):
         """Send a file to the client"""
         try:
@@ -253,6 +269,7 @@ class FileTransferService:
             time.sleep(0.1)
             
             # Send file data
+            start = time.perf_counter()
             with open(file_path, 'rb') as f:
                 bytes_sent = 0
                 while bytes_sent < file_size:
@@ -263,6 +280,14 @@ class FileTransferService:
                     bytes_sent += len(chunk)
             
             self.logger.info(f"File sent: {safe_name} ({file_size} bytes)")
+            self._record_transfer('send', 'ok' if bytes_sent == file_size else 'incomplete', bytes_sent, start)
         except Exception as e:
             self.logger.error(f"Error sending file: {e}")
-            client.sendall(f"ERROR:Failed to send file: {str(e)}\n".encode()) 
\ No newline at end of file
+            transfers_total.labels('send', 'error').inc()
+            client.sendall(f"ERROR:Failed to send file: {str(e)}\n".encode())
+
+    def _record_transfer(self, direction, result, size, start):
+        """Count a finished transfer and its bytes and duration"""
+        transfers_total.labels(direction, result).inc()
+        transfer_seconds.labels(direction).observe(time.perf_counter() - start)
+        (bytes_received_total if direction == 'receive' else bytes_sent_total).inc(size)
@@ -0,0 +1,114 @@
+"""
+Change-driven frame pacing for the screen stream.
+
+Each grabbed frame gets a cheap signature (a CRC of a 1/SIGNATURE_REDUCE
+box-averaged thumbnail plus the cursor position). While the signature
+keeps changing the capture loop runs at the full rate. Once nothing has
+changed for idle_after seconds, every unchanged grab stretches the
+interval by RAMP_FACTOR until it reaches 1 / idle_fps. The first changed
+grab drops straight back to the full rate.
+
+Unchanged frames are neither encoded nor sent: a stream viewer keeps showing
+the last frame it received. force() makes the next grab count as changed,
+so a client that just joined gets a frame even from a static desktop.
+"""
+
+import collections
+import threading
+import time
+import zlib
+
+IDLE_FPS = 2.0       # Grab rate once the screen has been static for a while
+IDLE_AFTER = 1.0     # Seconds without change before the rate starts dropping
+RAMP_FACTOR = 1.5    # Interval growth per unchanged grab while ramping down
+FPS_WINDOW = 2.0     # Seconds of sent frames the effective FPS is averaged over
+SIGNATURE_REDUCE = 4  # Thumbnail factor for frame_signature(); each pixel averages a 4x4 block
+
+
+def frame_signature(image, cursor=None):
+    """Cheap change key for a PIL frame: CRC-32 of a reduced copy, plus the cursor position.
+
+    A box average rather than a strided sample, so a caret or a single typed
+    character still changes the thumbnail; it is ~4x cheaper than hashing
+    the full-resolution pixels.
+    """
+    return zlib.crc32(image.reduce(SIGNATURE_REDUCE).tobytes()), cursor
+
+
+class FramePacer:
+    """Grab interval and effective FPS of the capture loop; thread-safe"""
+
+    def __init__(self, fps, idle_fps=IDLE_FPS, idle_after=IDLE_AFTER, adaptive=True, clock=time.monotonic):
+        self.fps = fps
+        self.idle_fps = min(idle_fps, fps)
+        self.idle_after = idle_after
+        self.adaptive = adaptive
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.interval = 1.0 / fps
+        self.signature = None
+        self.forced = True
+        self.last_change = clock()
+        self.sent_times = collections.deque()
+
+        self.grabs = 0
+        self.unchanged = 0
+
+    @property
+    def idle(self):
+        """True while running below the full rate"""
+        return self.interval > 1.0 / self.fps
+
+    def force(self):
+        """Treat the next grab as changed and return to the full rate"""
+        with self.lock:
+            self.forced = True
+            self.interval = 1.0 / self.fps
+
+    def update(self, signature):
+        """Record a grabbed frame's signature; returns True if it should be encoded and sent"""
+        now = self.clock()
+        with self.lock:
+            self.grabs += 1
+            changed = self.forced or signature != self.signature or not self.adaptive
+            self.forced = False
+            self.signature = signature
+            if changed:
+                self.last_change = now
+                self.interval = 1.0 / self.fps
+            else:
+                self.unchanged += 1
+                if now - self.last_change >= self.idle_after:
+                    self.interval = min(self.interval * RAMP_FACTOR, 1.0 / self.idle_fps)
+            return changed
+
+    def frame_sent(self):
+        """Count a frame delivered to the stream clients"""
+        now = self.clock()
+        with self.lock:
+            self.sent_times.append(now)
+            self._prune(now)
+
+    def effective_fps(self):
+        """Frames sent per second over the last FPS_WINDOW seconds"""
+        with self.lock:
+            self._prune(self.clock())
+            return len(self.sent_times) / FPS_WINDOW
+
+    def _prune(self, now):
+        while self.sent_times and now - self.sent_times[0] > FPS_WINDOW:
+            self.sent_times.popleft()
+
+    def get_stats(self):
+        effective = self.effective_fps()
+        with self.lock:
+            return {
+                'adaptive': self.adaptive,
+                'max_fps': self.fps,
+                'idle_fps': self.idle_fps,
+                'grab_fps': round(1.0 / self.interval, 2),
+                'effective_fps': round(effective, 2),
+                'idle_seconds': round(self.clock() - self.last_change, 1),
+                'grabs': self.grabs,
+                'unchanged': self.unchanged,
+            }
@@ -0,0 +1,129 @@
+"""
+Frame-tick coalescing for relative cursor motion.
+
+Touchpad swipes and gyro/motion sensors deliver far more samples than the
+display can show. Instead of moving the cursor once per sample, every source
+adds its delta here and a single scheduler thread injects the summed motion
+once per tick.
+"""
+
+import logging
+import threading
+import time
+
+DEFAULT_RATE_HZ = 240
+
+
+class InputScheduler:
+    """Sum relative cursor deltas from all sources and apply them once per tick"""
+
+    def __init__(self, apply_motion, rate_hz=DEFAULT_RATE_HZ):
+        """
+        apply_motion: callable(dx, dy) that performs the actual cursor move.
+        rate_hz: flush rate; 0 disables coalescing and injects every event directly.
+        """
+        self.apply_motion = apply_motion
+        self.rate_hz = rate_hz
+        self.is_running = False
+        self.thread = None
+
+        self.lock = threading.Lock()         # Guards the accumulators and counters
+        self.inject_lock = threading.Lock()  # Serializes calls into apply_motion
+        self._wake = threading.Event()
+        self._pending_dx = 0.0
+        self._pending_dy = 0.0
+
+        # Statistics
+        self.events_received = 0
+        self.injections = 0
+        self.events_by_source = {}
+
+    @property
+    def coalescing(self):
+        return self.rate_hz > 0
+
+    def start(self):
+        if self.is_running or not self.coalescing:
+            return
+
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, name='InputScheduler')
+        self.thread.daemon = True
+        self.thread.start()
+        logging.info(f"Input scheduler started at {self.rate_hz} Hz")
+
+    def stop(self):
+        self.is_running = False
+        self._wake.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+        self.flush()
+
+    def add_motion(self, dx, dy, source='mouse'):
+        """Queue a relative cursor movement from the given input source"""
+        with self.lock:
+            self._pending_dx += dx
+            self._pending_dy += dy
+            self.events_received += 1
+            self.events_by_source[source] = self.events_by_source.get(source, 0) + 1
+
+        if self.is_running:
+            self._wake.set()
+        else:
+            self.flush()
+
+    def flush(self):
+        """Inject any pending motion now.
+
+        Called by the scheduler thread every tick and by discrete commands
+        (clicks, button presses, scrolls) so they land where the cursor should be.
+        """
+        with self.inject_lock:
+            with self.lock:
+                dx = int(self._pending_dx)
+                dy = int(self._pending_dy)
+                if dx == 0 and dy == 0:
+                    return
+                # Keep the sub-pixel remainder for the next tick
+                self._pending_dx -= dx
+                self._pending_dy -= dy
+                self.injections += 1
+
+            try:
+                self.apply_motion(dx, dy)
+            except Exception as e:
+                logging.error(f"Error applying coalesced motion: {e}")
+
+    def _run(self):
+        interval = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+
+        while self.is_running:
+            # Sleep until there is motion to inject
+            if not self._wake.wait(0.5):
+                continue
+
+            # Wait out the rest of the current tick so a burst is summed
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            self._wake.clear()
+            self.flush()
+            next_tick = time.perf_counter() + interval
+
+    def get_stats(self):
+        """Return counters for events received versus injections performed"""
+        with self.lock:
+            received = self.events_received
+            injections = self.injections
+            by_source = dict(self.events_by_source)
+
+        return {
+            'rate_hz': self.rate_hz,
+            'events_received': received,
+            'injections': injections,
+            'events_per_injection': round(received / injections, 2) if injections else 0.0,
+            'events_by_source': by_source,
+        }
@@ -0,0 +1,638 @@
+"""
+Pluggable input injection.
+
+Every mouse, keyboard, scroll and gamepad path in the server goes through an
+InputSink instead of calling win32api/pyautogui/keyboard directly, so the
+whole command path can run, and be measured, without a Windows desktop.
+
+    NativeInputSink     injects into the local Windows session
+    NullInputSink       discards everything (tracks a virtual cursor)
+    RecordingInputSink  keeps every call with a perf_counter() timestamp
+
+Keys are named as in the `keyboard` package ('ctrl', 'enter', 'a', ...);
+mouse buttons are 'left', 'right' and 'middle'.
+
+Multi-event operations (a key combo, a click at a position, a shifted
+character) are described as a list of batch events and handed to inject(),
+which the native sink turns into a single SendInput call:
+
+    (KEY, name, pressed)        key by name
+    (VK, virtual_key, pressed)  key by Windows virtual-key code
+    (BUTTON, button, pressed)   mouse button
+    (MOVE_TO, x, y)             absolute cursor position in pixels
+    (SCROLL, delta)             wheel delta, positive is up
+    (TEXT, text)                text typed with type_text()
+"""
+
+import ctypes
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import profiler
+from display_topology import DisplayTopology, query_windows_layout, single_monitor_layout
+
+WHEEL_DELTA = 120  # One wheel notch
+MOUSE_BUTTONS = ('left', 'right', 'middle')
+
+# Batch event kinds
+KEY = 'key'
+VK = 'vk'
+BUTTON = 'button'
+MOVE_TO = 'move_to'
+SCROLL = 'scroll'
+TEXT = 'text'
+
+InputEvent = namedtuple('InputEvent', 'timestamp action args')
+
+# SendInput constants
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_WHEEL = 0x0800
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+MOUSEEVENTF_ABSOLUTE = 0x8000
+MOUSE_BUTTON_FLAGS = {
+    'left': (0x0002, 0x0004),
+    'right': (0x0008, 0x0010),
+    'middle': (0x0020, 0x0040),
+}
+
+# Virtual-key codes for multi-character `keyboard` key names; single
+# characters are looked up with VkKeyScanW so the keyboard layout is honoured
+VIRTUAL_KEYS = {
+    'backspace': 0x08, 'tab': 0x09, 'enter': 0x0D, 'return': 0x0D,
+    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13, 'caps lock': 0x14,
+    'esc': 0x1B, 'escape': 0x1B, 'space': 0x20, 'num lock': 0x90, 'scroll lock': 0x91,
+    'page up': 0x21, 'page down': 0x22, 'end': 0x23, 'home': 0x24,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'print screen': 0x2C, 'insert': 0x2D, 'delete': 0x2E,
+    'windows': 0x5B, 'win': 0x5B, 'left windows': 0x5B, 'right windows': 0x5C, 'menu': 0x5D,
+    'left shift': 0xA0, 'right shift': 0xA1, 'left ctrl': 0xA2, 'right ctrl': 0xA3,
+    'left alt': 0xA4, 'right alt': 0xA5,
+    'volume mute': 0xAD, 'volume down': 0xAE, 'volume up': 0xAF,
+    'next track': 0xB0, 'previous track': 0xB1, 'play/pause media': 0xB3,
+}
+VIRTUAL_KEYS.update({f'f{n}': 0x6F + n for n in range(1, 25)})
+
+# pyautogui key names that older clients still send, as `keyboard` package names
+LEGACY_KEY_NAMES = {
+    'pageup': 'page up', 'pgup': 'page up', 'pagedown': 'page down', 'pgdn': 'page down',
+    'capslock': 'caps lock', 'numlock': 'num lock', 'scrolllock': 'scroll lock',
+    'printscreen': 'print screen', 'prntscrn': 'print screen', 'prtsc': 'print screen',
+    'prtscr': 'print screen', 'print': 'print screen',
+    'del': 'delete', 'apps': 'menu', 'option': 'alt',
+    'shiftleft': 'left shift', 'shiftright': 'right shift', 'ctrlleft': 'left ctrl',
+    'ctrlright': 'right ctrl', 'altleft': 'left alt', 'altright': 'right alt',
+    'winleft': 'left windows', 'winright': 'right windows',
+    'volumemute': 'volume mute', 'volumedown': 'volume down', 'volumeup': 'volume up',
+    'nexttrack': 'next track', 'prevtrack': 'previous track', 'playpause': 'play/pause media',
+    '\n': 'enter', '\r': 'enter', '\t': 'tab', ' ': 'space', '\b': 'backspace',
+}
+
+# Most SendInput calls an application can absorb at once without dropping events
+MAX_INPUTS_PER_CALL = 2048
+
+# Text characters sent as real keys because apps ignore them as Unicode packets
+TEXT_VIRTUAL_KEYS = {'\n': 0x0D, '\t': 0x09, '\b': 0x08}
+
+# Keys that need KEYEVENTF_EXTENDEDKEY to be told apart from their numpad twins
+EXTENDED_KEYS = frozenset({
+    0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2C, 0x2D, 0x2E,
+    0x5B, 0x5C, 0x5D, 0x6F, 0x90, 0xA3, 0xA5,
+})
+
+
+def legacy_key_name(key):
+    """`keyboard` package name for a key named as pyautogui names it ('pageup' -> 'page up')"""
+    return LEGACY_KEY_NAMES.get(key.lower() if len(key) > 1 else key, key)
+
+
+def combo_events(keys):
+    """Batch events for pressing keys in order and releasing them in reverse"""
+    return [(KEY, key, True) for key in keys] + [(KEY, key, False) for key in reversed(keys)]
+
+
+def text_key_units(text):
+    """Split text into ('vk', code) and ('unicode', utf16_unit) key strokes.
+
+    Layout independent: every character is sent as its UTF-16 code units
+    (two for emoji and other astral characters), except newline, tab and
+    backspace, which go out as their virtual keys. '\\r\\n' counts as one newline.
+    """
+    units = []
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    for char in text:
+        virtual_key = TEXT_VIRTUAL_KEYS.get(char)
+        if virtual_key is not None:
+            units.append(('vk', virtual_key))
+            continue
+        encoded = char.encode('utf-16-le')
+        for offset in range(0, len(encoded), 2):
+            units.append(('unicode', encoded[offset] | encoded[offset + 1] << 8))
+    return units
+
+
+def click_events(x, y, button='left'):
+    """Batch events for moving to (x, y) and clicking there"""
+    return [(MOVE_TO, x, y), (BUTTON, button, True), (BUTTON, button, False)]
+
+
+class InputSink:
+    """Base class for input backends.
+
+    Subclasses implement the primitives; move_relative, mouse_click and
+    key_press have default implementations built on them.
+    """
+
+    name = 'base'
+
+    # Foreground apps (lower-case process names) that drop events sent back to back
+    slow_apps = frozenset()
+    slow_app_delay = 0.05
+
+    # Cached screen geometry; shared with the server through set_display_topology()
+    display_topology = None
+
+    def set_pacing(self, slow_apps, delay):
+        """Pace inject() with delay seconds between events while one of slow_apps has focus"""
+        self.slow_apps = frozenset(app.lower() for app in slow_apps)
+        self.slow_app_delay = delay
+
+    def foreground_app(self):
+        """Process name of the focused window, or None if unknown"""
+        return None
+
+    def set_display_topology(self, topology):
+        """Use the caller's DisplayTopology instead of building one from get_display_layout()"""
+        self.display_topology = topology
+
+    def get_display_topology(self):
+        if self.display_topology is None:
+            self.display_topology = DisplayTopology(self.get_display_layout)
+        return self.display_topology
+
+    def pacing_delay(self):
+        """Seconds to leave between the events of one operation (0 means send as one batch)"""
+        if self.slow_apps and self.foreground_app() in self.slow_apps:
+            return self.slow_app_delay
+        return 0
+
+    def inject(self, events):
+        """Inject one logical operation (a list of batch events), blocking while paced"""
+        delay = self.pacing_delay()
+        if delay:
+            for index, event in enumerate(events):
+                if index:
+                    self.pause(delay)
+                self.send_batch([event])
+        else:
+            self.send_batch(events)
+
+    def send_batch(self, events):
+        """Inject batch events back to back; the native sink does this in one call"""
+        for event in events:
+            kind = event[0]
+            if kind == KEY:
+                if event[2]:
+                    self.key_down(event[1])
+                else:
+                    self.key_up(event[1])
+            elif kind == VK:
+                self.virtual_key(event[1], event[2])
+            elif kind == BUTTON:
+                self.mouse_button(event[1], event[2])
+            elif kind == MOVE_TO:
+                self.move_to(event[1], event[2])
+            elif kind == SCROLL:
+                self.scroll(event[1])
+            elif kind == TEXT:
+                self.type_text(event[1])
+            else:
+                raise ValueError(f"Unknown batch event {event!r}")
+
+    def get_cursor_pos(self):
+        raise NotImplementedError
+
+    def get_screen_size(self):
+        raise NotImplementedError
+
+    def get_display_layout(self):
+        """List of display_topology.Monitor this sink injects into"""
+        return single_monitor_layout(*self.get_screen_size())
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def move_relative(self, dx, dy):
+        """Move the cursor by a delta, clamped to the primary screen"""
+        x, y = self.get_cursor_pos()
+        width, height = self.get_screen_size()
+        self.move_to(max(0, min(x + dx, width - 1)), max(0, min(y + dy, height - 1)))
+
+    def mouse_button(self, button, pressed):
+        raise NotImplementedError
+
+    def mouse_click(self, button):
+        self.mouse_button(button, True)
+        self.mouse_button(button, False)
+
+    def scroll(self, delta):
+        """Scroll the window under the cursor; delta in wheel units, positive is up"""
+        raise NotImplementedError
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def key_press(self, key):
+        self.key_down(key)
+        self.key_up(key)
+
+    def virtual_key(self, virtual_key, pressed):
+        """Press or release a key by Windows virtual-key code"""
+        raise NotImplementedError
+
+    def type_text(self, text):
+        raise NotImplementedError
+
+    def pause(self, seconds):
+        """Wait between injected events (some applications miss events sent back to back)"""
+        time.sleep(seconds)
+
+
+class NativeInputSink(InputSink):
+    """Inject input into the local Windows session"""
+
+    name = 'native'
+
+    def __init__(self):
+        # Imported here so the other sinks work on machines without these packages
+        import keyboard
+        import pyautogui
+        import win32api
+        import win32con
+        import win32gui
+
+        self.keyboard = keyboard
+        self.pyautogui = pyautogui
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+
+        pyautogui.FAILSAFE = False  # Disable failsafe
+        pyautogui.MINIMUM_DURATION = 0
+        pyautogui.MINIMUM_SLEEP = 0
+        pyautogui.PAUSE = 0
+
+        self._button_flags = {
+            'left': (win32con.MOUSEEVENTF_LEFTDOWN, win32con.MOUSEEVENTF_LEFTUP),
+            'right': (win32con.MOUSEEVENTF_RIGHTDOWN, win32con.MOUSEEVENTF_RIGHTUP),
+            'middle': (win32con.MOUSEEVENTF_MIDDLEDOWN, win32con.MOUSEEVENTF_MIDDLEUP),
+        }
+        self._init_send_input()
+
+    def get_cursor_pos(self):
+        return self.win32api.GetCursorPos()
+
+    def get_screen_size(self):
+        return self.win32api.GetSystemMetrics(0), self.win32api.GetSystemMetrics(1)
+
+    def get_display_layout(self):
+        return query_windows_layout()
+
+    @profiler.timed('move_cursor')
+    def move_to(self, x, y):
+        self.win32api.SetCursorPos((int(x), int(y)))
+
+    @profiler.timed('move_cursor')
+    def move_relative(self, dx, dy):
+        # Use direct Win32 API for maximum performance and reliability
+        try:
+            super().move_relative(dx, dy)
+        except Exception as win32_error:
+            # Fallback to pyautogui if Win32 API fails
+            logging.warning(f"Win32 mouse move failed, using pyautogui fallback: {win32_error}")
+            current_x, current_y = self.pyautogui.position()
+            self.pyautogui.moveTo(current_x + dx, current_y + dy, duration=0)
+
+    def mouse_button(self, button, pressed):
+        if button not in self._button_flags:
+            logging.warning(f"Unknown mouse button: {button}")
+            return
+        down, up = self._button_flags[button]
+        self.win32api.mouse_event(down if pressed else up, 0, 0, 0, 0)
+
+    def mouse_click(self, button):
+        if button not in self._button_flags:
+            logging.warning(f"Unknown mouse button: {button}")
+            return
+        self.pyautogui.click(button=button)
+
+    @profiler.timed('send_input')
+    def scroll(self, delta):
+        # WM_MOUSEWHEEL straight to the window under the cursor
+        cursor_pos = self.win32gui.GetCursorPos()
+        window = self.win32gui.WindowFromPoint(cursor_pos)
+        wparam = int(delta) << 16  # Delta goes in the high word
+        lparam = cursor_pos[1] << 16 | cursor_pos[0]
+        self.win32gui.SendMessage(window, self.win32con.WM_MOUSEWHEEL, wparam, lparam)
+
+    def key_down(self, key):
+        self.keyboard.press(key)
+
+    def key_up(self, key):
+        self.keyboard.release(key)
+
+    def key_press(self, key):
+        self.keyboard.press_and_release(key)
+
+    def virtual_key(self, virtual_key, pressed):
+        flags = 0 if pressed else self.win32con.KEYEVENTF_KEYUP
+        self.win32api.keybd_event(virtual_key, 0, flags, 0)
+
+    def type_text(self, text):
+        self.send_batch([(TEXT, text)])
+
+    def foreground_app(self):
+        try:
+            import psutil
+            import win32process
+
+            _, pid = win32process.GetWindowThreadProcessId(self.win32gui.GetForegroundWindow())
+            return psutil.Process(pid).name().lower()
+        except Exception:
+            return None
+
+    @profiler.timed('send_input')
+    def send_batch(self, events):
+        """Inject all events with one SendInput call (long text is split into a few)"""
+        inputs = []
+        for event in events:
+            if event[0] == TEXT:
+                inputs.extend(self._text_inputs(event[1]))
+                continue
+            item = self._to_input(event)
+            if item is None:
+                # Something SendInput can't express here (e.g. a shifted key name): one by one
+                super().send_batch(events)
+                return
+            inputs.append(item)
+
+        input_type = self._INPUT
+        for start in range(0, len(inputs), MAX_INPUTS_PER_CALL):
+            chunk = inputs[start:start + MAX_INPUTS_PER_CALL]
+            array = (input_type * len(chunk))(*chunk)
+            sent = self._user32.SendInput(len(chunk), array, ctypes.sizeof(input_type))
+            if sent != len(chunk):
+                logging.warning(f"SendInput injected {sent} of {len(chunk)} events")
+                return
+
+    def _text_inputs(self, text):
+        """KEYEVENTF_UNICODE down/up pairs for text; no keyboard layout lookups"""
+        input_type = self._INPUT
+        keybd_input = self._KEYBDINPUT
+        inputs = []
+        for kind, value in text_key_units(text):
+            if kind == 'vk':
+                inputs.append(input_type(type=INPUT_KEYBOARD, ki=keybd_input(value, 0, 0, 0, 0)))
+                inputs.append(input_type(type=INPUT_KEYBOARD, ki=keybd_input(value, 0, KEYEVENTF_KEYUP, 0, 0)))
+            else:
+                inputs.append(input_type(type=INPUT_KEYBOARD, ki=keybd_input(0, value, KEYEVENTF_UNICODE, 0, 0)))
+                inputs.append(input_type(type=INPUT_KEYBOARD,
+                                         ki=keybd_input(0, value, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP, 0, 0)))
+        return inputs
+
+    def _init_send_input(self):
+        """Build the ctypes INPUT layout used by send_batch()"""
+        from ctypes import wintypes
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [
+                ("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+
+        class HARDWAREINPUT(ctypes.Structure):
+            _fields_ = [
+                ("uMsg", wintypes.DWORD),
+                ("wParamL", wintypes.WORD),
+                ("wParamH", wintypes.WORD),
+            ]
+
+        class INPUTUNION(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT), ("hi", HARDWAREINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _anonymous_ = ("u",)
+            _fields_ = [("type", wintypes.DWORD), ("u", INPUTUNION)]
+
+        self._MOUSEINPUT = MOUSEINPUT
+        self._KEYBDINPUT = KEYBDINPUT
+        self._INPUT = INPUT
+        self._user32 = ctypes.windll.user32
+        self._user32.VkKeyScanW.restype = ctypes.c_short
+        self._vk_cache = {}
+
+    def _to_input(self, event):
+        """Convert a batch event to an INPUT structure, or None if it has no SendInput form"""
+        input_type = self._INPUT
+        kind = event[0]
+        if kind == KEY or kind == VK:
+            virtual_key = self._virtual_key(event[1]) if kind == KEY else event[1]
+            if virtual_key is None:
+                return None
+            flags = 0 if event[2] else KEYEVENTF_KEYUP
+            if virtual_key in EXTENDED_KEYS:
+                flags |= KEYEVENTF_EXTENDEDKEY
+            scan = self._user32.MapVirtualKeyW(virtual_key, 0)
+            return input_type(type=INPUT_KEYBOARD, ki=self._KEYBDINPUT(virtual_key, scan, flags, 0, 0))
+        if kind == BUTTON:
+            flags = MOUSE_BUTTON_FLAGS.get(event[1])
+            if flags is None:
+                return None
+            flag = flags[0] if event[2] else flags[1]
+            return input_type(type=INPUT_MOUSE, mi=self._MOUSEINPUT(0, 0, 0, flag, 0, 0))
+        if kind == MOVE_TO:
+            # Absolute coordinates are normalized to 0..65535 over the virtual desktop
+            left, top, right, bottom = self.get_display_topology().get_bounds()
+            width, height = max(right - left - 1, 1), max(bottom - top - 1, 1)
+            dx = int((event[1] - left) * 65535 / width)
+            dy = int((event[2] - top) * 65535 / height)
+            flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+            return input_type(type=INPUT_MOUSE, mi=self._MOUSEINPUT(dx, dy, 0, flags, 0, 0))
+        if kind == SCROLL:
+            mouse_data = int(event[1]) & 0xFFFFFFFF  # Negative deltas as DWORD
+            return input_type(type=INPUT_MOUSE, mi=self._MOUSEINPUT(0, 0, mouse_data, MOUSEEVENTF_WHEEL, 0, 0))
+        return None
+
+    def _virtual_key(self, key):
+        """Virtual-key code for a key name, or None if it needs modifiers or is unknown"""
+        key = key.lower()
+        virtual_key = VIRTUAL_KEYS.get(key)
+        if virtual_key is not None:
+            return virtual_key
+        if len(key) != 1:
+            return None
+        if key not in self._vk_cache:
+            scan = self._user32.VkKeyScanW(ord(key))
+            # Low byte is the key, high byte the shift state it needs
+            self._vk_cache[key] = scan & 0xFF if scan != -1 and not (scan >> 8) & 0xFF else None
+        return self._vk_cache[key]
+
+
+class NullInputSink(InputSink):
+    """Discard all input; keeps a virtual cursor so relative motion still clamps"""
+
+    name = 'null'
+
+    def __init__(self, screen_size=(1920, 1080)):
+        self.screen_size = screen_size
+        self.cursor = (screen_size[0] // 2, screen_size[1] // 2)
+
+    def get_cursor_pos(self):
+        return self.cursor
+
+    def get_screen_size(self):
+        return self.screen_size
+
+    def move_to(self, x, y):
+        self.cursor = (int(x), int(y))
+
+    def mouse_button(self, button, pressed):
+        pass
+
+    def scroll(self, delta):
+        pass
+
+    def key_down(self, key):
+        pass
+
+    def key_up(self, key):
+        pass
+
+    def virtual_key(self, virtual_key, pressed):
+        pass
+
+    def type_text(self, text):
+        pass
+
+    def pause(self, seconds):
+        pass
+
+
+class RecordingInputSink(NullInputSink):
+    """Record every injected event with a time.perf_counter() timestamp.
+
+    Each call is one recorded event, so a batch counts as a single call.
+    Pauses are recorded but only slept with sleep_pauses=True, so recorded
+    runs measure the server's own processing time by default.
+    """
+
+    name = 'recording'
+
+    def __init__(self, screen_size=(1920, 1080), sleep_pauses=False):
+        super().__init__(screen_size)
+        self.sleep_pauses = sleep_pauses
+        self.foreground = None  # What foreground_app() reports, for testing pacing
+        self.lock = threading.Lock()
+        self.events = []
+
+    def foreground_app(self):
+        return self.foreground
+
+    def send_batch(self, events):
+        for event in events:
+            if event[0] == MOVE_TO:
+                NullInputSink.move_to(self, event[1], event[2])
+        self._record('batch', *events)
+
+    def _record(self, action, *args):
+        event = InputEvent(time.perf_counter(), action, args)
+        with self.lock:
+            self.events.append(event)
+
+    def move_to(self, x, y):
+        super().move_to(x, y)
+        self._record('move_to', *self.cursor)
+
+    def move_relative(self, dx, dy):
+        # Recorded as one event, not as the move_to it is built on
+        x, y = self.cursor
+        width, height = self.screen_size
+        self.cursor = (int(max(0, min(x + dx, width - 1))), int(max(0, min(y + dy, height - 1))))
+        self._record('move_relative', dx, dy)
+
+    def mouse_button(self, button, pressed):
+        self._record('mouse_button', button, pressed)
+
+    def mouse_click(self, button):
+        self._record('mouse_click', button)
+
+    def scroll(self, delta):
+        self._record('scroll', delta)
+
+    def key_down(self, key):
+        self._record('key_down', key)
+
+    def key_up(self, key):
+        self._record('key_up', key)
+
+    def key_press(self, key):
+        self._record('key_press', key)
+
+    def virtual_key(self, virtual_key, pressed):
+        self._record('virtual_key', virtual_key, pressed)
+
+    def type_text(self, text):
+        self._record('type_text', text)
+
+    def pause(self, seconds):
+        self._record('pause', seconds)
+        if self.sleep_pauses:
+            time.sleep(seconds)
+
+    def take_events(self):
+        """Return and clear the recorded events"""
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+
+
+INPUT_SINKS = {
+    NativeInputSink.name: NativeInputSink,
+    NullInputSink.name: NullInputSink,
+    RecordingInputSink.name: RecordingInputSink,
+}
+
+
+def create_input_sink(name='native'):
+    """Build an input sink by name ('native', 'null' or 'recording')"""
+    try:
+        sink_class = INPUT_SINKS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown input sink '{name}' (expected one of {', '.join(INPUT_SINKS)})")
+    return sink_class()
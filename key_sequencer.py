@@ -0,0 +1,109 @@
+"""
+Ordered, non-blocking playback of key and mouse-button sequences.
+
+A combo, shifted character or click is submitted as a list of input_sink
+batch events. When nothing is playing and the focused app needs no pacing,
+it is injected immediately as one batch on the caller's thread. Paced
+sequences play one event per step on the timer wheel instead of sleeping,
+so the connection keeps handling input meanwhile. Sequences always start
+in submission order: anything submitted while one is playing waits for it.
+
+A sequence can also be submitted as a callable that returns the events. It
+is called when the sequence starts, for work that must happen in order with
+the key strokes around it (e.g. putting text on the clipboard before Ctrl+V).
+"""
+
+import logging
+import threading
+from collections import deque
+
+
+class KeySequencer:
+    """Inject batch-event sequences in order, timing paced steps on a TimerWheel"""
+
+    def __init__(self, sink, wheel):
+        self.sink = sink
+        self.wheel = wheel
+        self.lock = threading.Lock()
+        self.queue = deque()   # (events, step_delay) waiting behind the playing sequence
+        self.playing = False
+
+        # Statistics
+        self.sequences_inline = 0
+        self.sequences_timed = 0
+
+    def submit(self, events, step_delay=None):
+        """Inject events after every sequence submitted before them.
+
+        events: list of batch events, or a callable returning one, called on
+        the playing thread right before the sequence starts.
+        step_delay: seconds between events; None uses the sink's pacing for
+        the focused app (usually 0, i.e. one batch).
+        """
+        with self.lock:
+            if self.playing:
+                self.queue.append((events, step_delay))
+                return
+            self.playing = True
+        self._play_from(events, step_delay)
+
+    def _play_from(self, events, step_delay):
+        """Play queued sequences until one needs timed steps or the queue is empty"""
+        while True:
+            if callable(events):
+                events = self._prepare(events)
+            delay = self.sink.pacing_delay() if step_delay is None else step_delay
+            if delay and len(events) > 1:
+                self.sequences_timed += 1
+                self._step(events, 0, delay)
+                return
+
+            self.sequences_inline += 1
+            self._send(events)
+            item = self._next()
+            if item is None:
+                return
+            events, step_delay = item
+
+    def _step(self, events, index, delay):
+        """Inject one event of a timed sequence and schedule the next (runs on the wheel)"""
+        self._send([events[index]])
+        if index + 1 < len(events):
+            self.wheel.schedule(delay, self._step, events, index + 1, delay)
+            return
+        item = self._next()
+        if item is not None:
+            self._play_from(*item)
+
+    def _next(self):
+        """Pop the next queued sequence, or mark the sequencer idle and return None"""
+        with self.lock:
+            if not self.queue:
+                self.playing = False
+                return None
+            return self.queue.popleft()
+
+    def _prepare(self, prepare):
+        try:
+            return prepare() or []
+        except Exception as e:
+            logging.error(f"Error preparing input sequence: {e}")
+            return []
+
+    def _send(self, events):
+        if not events:
+            return
+        try:
+            self.sink.send_batch(events)
+        except Exception as e:
+            logging.error(f"Error injecting input sequence: {e}")
+
+    def get_stats(self):
+        with self.lock:
+            queued = len(self.queue)
+        return {
+            'playing': self.playing,
+            'queued': queued,
+            'sequences_inline': self.sequences_inline,
+            'sequences_timed': self.sequences_timed,
+        }
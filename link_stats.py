@@ -0,0 +1,113 @@
+"""
+Round-trip time, jitter and loss of a control connection, measured with
+server-initiated probes.
+
+Clients that negotiate CAPS:PROBE get a probe every probe_interval seconds:
+
+    server: PROBE:<seq>:<timestamp_us>
+    client: PROBE_ACK:<seq>:<timestamp_us>    (both values echoed unchanged)
+
+The timestamp is the server's monotonic clock, so the client needs no state
+and no clock of its own. A probe not acknowledged within probe_timeout counts
+as lost. RTT is smoothed like TCP's SRTT (1/8 gain) and jitter like RTP's
+interarrival jitter (1/16 gain on the change between consecutive RTTs).
+
+The acknowledgement goes through the normal command path, so the RTT
+includes time the command waited behind queued input on the server; that is
+the latency input from the client actually sees.
+"""
+
+import collections
+import threading
+import time
+
+PROBE_INTERVAL = 2.0   # Seconds between probes
+PROBE_TIMEOUT = 5.0    # Seconds before an unacknowledged probe counts as lost
+LOSS_WINDOW = 50       # Loss is the fraction of the last LOSS_WINDOW probes
+
+RTT_GAIN = 1 / 8
+JITTER_GAIN = 1 / 16
+
+
+class LinkStats:
+    """Rolling RTT, jitter and loss for one connection; thread-safe"""
+
+    def __init__(self, probe_timeout=PROBE_TIMEOUT):
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Lock()
+        self.next_seq = 1
+        self.outstanding = {}   # seq -> timestamp_us of probes awaiting an ack
+        self.outcomes = collections.deque(maxlen=LOSS_WINDOW)  # True = acked, False = lost
+        self.probes_sent = 0
+        self.probes_acked = 0
+        self.last_rtt = None    # seconds
+        self.min_rtt = None
+        self.srtt = None
+        self.jitter = 0.0
+
+    def next_probe(self):
+        """Expire overdue probes and return the PROBE line for the next one"""
+        now_us = time.monotonic_ns() // 1000
+        with self.lock:
+            self._expire(now_us)
+            seq = self.next_seq
+            self.next_seq += 1
+            self.outstanding[seq] = now_us
+            self.probes_sent += 1
+        return f"PROBE:{seq}:{now_us}\n".encode()
+
+    def on_ack(self, seq, timestamp_us):
+        """Record a PROBE_ACK; returns the RTT in seconds, or None if it matches no probe"""
+        now_us = time.monotonic_ns() // 1000
+        with self.lock:
+            if self.outstanding.get(seq) != timestamp_us:
+                return None  # Unknown, duplicate, already counted lost or altered
+            del self.outstanding[seq]
+            rtt = (now_us - timestamp_us) / 1e6
+            self.outcomes.append(True)
+            self.probes_acked += 1
+            if self.srtt is None:
+                self.srtt = rtt
+            else:
+                self.jitter += (abs(rtt - self.last_rtt) - self.jitter) * JITTER_GAIN
+                self.srtt += (rtt - self.srtt) * RTT_GAIN
+            self.last_rtt = rtt
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+        return rtt
+
+    def _expire(self, now_us):
+        deadline = now_us - int(self.probe_timeout * 1e6)
+        for seq in [seq for seq, sent in self.outstanding.items() if sent < deadline]:
+            del self.outstanding[seq]
+            self.outcomes.append(False)
+
+    @property
+    def rtt(self):
+        """Smoothed RTT in seconds, None before the first ack"""
+        return self.srtt
+
+    @property
+    def loss(self):
+        """Fraction of recent probes that were lost"""
+        with self.lock:
+            self._expire(time.monotonic_ns() // 1000)
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def get_stats(self):
+        loss = self.loss
+        with self.lock:
+            return {
+                'rtt_ms': _ms(self.srtt),
+                'last_rtt_ms': _ms(self.last_rtt),
+                'min_rtt_ms': _ms(self.min_rtt),
+                'jitter_ms': _ms(self.jitter if self.srtt is not None else None),
+                'loss': round(loss, 3),
+                'probes_sent': self.probes_sent,
+                'probes_acked': self.probes_acked,
+            }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
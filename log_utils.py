@@ -0,0 +1,148 @@
+"""
+Logging setup for the server: per-category levels, rate-limited chatty
+records and a background file writer.
+
+Hot paths log through category loggers with %-style arguments, e.g.
+
+    input_log = get_logger('input')
+    input_log.debug("Gyro movement: (%.3f, %.3f)", rot_x, rot_y)
+
+so a disabled record costs one cached level check: no string is built and
+no record is created. Enabled records are handed to a QueueHandler and
+written to a rotating file by a QueueListener thread, so the thread that
+logged never waits on disk or the console.
+
+config.ini:
+    [Logging]
+    level = ERROR              ; root level
+    file = remote_server.log
+    max_bytes = 5242880        ; rotate at this size
+    backup_count = 3
+    rate_limit = 10            ; records/s per message below WARNING, 0 = unlimited
+
+    [LogLevels]
+    input = DEBUG              ; per category: input, gyro, control, screen, windows, ...
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+LOGGER_PREFIX = 'anycommand'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+DEFAULT_LEVEL = 'ERROR'
+DEFAULT_LOG_FILE = 'remote_server.log'
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_RATE_LIMIT = 10
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_logger(category):
+    """Logger for one category; its level can be set in [LogLevels]"""
+    return logging.getLogger(f"{LOGGER_PREFIX}.{category}")
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `rate` records per second per message template.
+
+    Only records below WARNING are limited, so warnings and errors are never
+    lost. The next record that gets through after a burst says how many
+    similar ones were dropped.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT):
+        super().__init__()
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.buckets = {}  # (logger name, msg template) -> [tokens, last refill, suppressed]
+
+    def filter(self, record):
+        if not self.rate or record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [float(self.rate), now, 0]
+            else:
+                bucket[0] = min(float(self.rate), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+        return True
+
+
+def configure_logging(config=None):
+    """Send all logging through a queue to a rotating file, with levels from config.ini.
+
+    Replaces the root logger's handlers; safe to call again after the config
+    changes.
+    """
+    global _listener
+
+    def setting(key, fallback):
+        if config is None:
+            return fallback
+        return config.get('Logging', key, fallback=str(fallback))
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        setting('file', DEFAULT_LOG_FILE),
+        maxBytes=int(setting('max_bytes', DEFAULT_MAX_BYTES)),
+        backupCount=int(setting('backup_count', DEFAULT_BACKUP_COUNT)),
+        encoding='utf-8',
+    )
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter(int(setting('rate_limit', DEFAULT_RATE_LIMIT))))
+
+    with _listener_lock:
+        stop_logging()
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(_level(setting('level', DEFAULT_LEVEL), logging.ERROR))
+
+        if config is not None and config.has_section('LogLevels'):
+            for category, level in config.items('LogLevels'):
+                get_logger(category).setLevel(_level(level, logging.NOTSET))
+
+        _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        _listener.start()
+
+
+def stop_logging():
+    """Write out queued records and stop the file writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _level(name, fallback):
+    level = logging.getLevelName(str(name).strip().upper())
+    if not isinstance(level, int):
+        logging.warning(f"Unknown log level '{name}'")
+        return fallback
+    return level
+
+
+atexit.register(stop_logging)
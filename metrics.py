@@ -0,0 +1,321 @@
+"""
+In-process metrics: counters, gauges and histograms, served on loopback.
+
+Modules create their instruments once at import, like loggers:
+
+    frames_encoded = metrics.counter('anycommand_screen_frames_encoded_total', 'Frames encoded')
+    bytes_sent = metrics.counter('anycommand_screen_bytes_sent_total', 'Bytes sent', ('client',))
+
+    frames_encoded.inc()
+    bytes_sent.labels(peer_label(client)).inc(len(frame))
+
+Recording is a lock and an add; nothing is formatted until a scrape.
+Gauges can instead be given a function that is called at scrape time.
+
+MetricsServer serves the registry over HTTP on 127.0.0.1 only:
+    /metrics        Prometheus text format
+    /metrics.json   JSON (histograms as count, sum and percentiles)
+
+config.ini:
+    [Metrics]
+    port = 8087     ; 0 disables the endpoint (instruments still record)
+"""
+
+import ipaddress
+import json
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from command_registry import LatencyHistogram, LATENCY_BUCKETS
+
+METRICS_PORT = 8087
+
+# Histogram bucket upper bounds for byte sizes (1 KB .. 4 MB) and durations (1 ms .. 60 s)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+
+class _Value:
+    """One counter or gauge time series"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def collect(self):
+        return self.value
+
+
+class _Histogram:
+    """One histogram time series"""
+
+    def __init__(self, buckets):
+        self.lock = threading.Lock()
+        self.histogram = LatencyHistogram(buckets)
+
+    def observe(self, value):
+        with self.lock:
+            self.histogram.observe(value)
+
+    def collect(self):
+        with self.lock:
+            histogram = self.histogram
+            return {
+                'buckets': list(zip(histogram.buckets, histogram.counts)),
+                'count': histogram.count,
+                'sum': histogram.total,
+                'max': histogram.max,
+                'p50': histogram.percentile(0.50),
+                'p95': histogram.percentile(0.95),
+                'p99': histogram.percentile(0.99),
+            }
+
+
+class Metric:
+    """A named metric and its time series, one per combination of label values.
+
+    Without labels the metric records directly (inc/set/observe); with
+    labels, labels(*values) returns the series to record on.
+    """
+
+    def __init__(self, kind, name, help_text, labelnames=(), buckets=None, function=None):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.function = function
+        self.lock = threading.Lock()
+        self.series = {}  # label values tuple -> _Value / _Histogram
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        series = self.series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self.lock:
+                series = self.series.get(values)
+                if series is None:
+                    series = _Histogram(self.buckets) if self.kind == HISTOGRAM else _Value()
+                    self.series[values] = series
+        return series
+
+    def remove(self, *values):
+        """Drop one series, e.g. when the client it describes disconnects"""
+        with self.lock:
+            self.series.pop(tuple(str(value) for value in values), None)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def collect(self):
+        """[(label values tuple, value)] where value is a number or a histogram dict"""
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception as e:
+                logging.error(f"Metric {self.name} failed: {e}")
+                return []
+            if isinstance(result, dict):
+                return [(key if isinstance(key, tuple) else (key,), value) for key, value in result.items()]
+            return [((), result)]
+        with self.lock:
+            series = list(self.series.items())
+        return [(values, item.collect()) for values, item in series]
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered on demand"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}  # name -> Metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(COUNTER, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        """function(): value, or {label values: value}, read at scrape time"""
+        metric = self._get(GAUGE, name, help_text, labelnames)
+        if function is not None:
+            metric.function = function  # The latest instance to register wins
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get(HISTOGRAM, name, help_text, labelnames, buckets)
+
+    def _get(self, kind, name, help_text, labelnames, buckets=None):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(kind, name, help_text, labelnames, buckets)
+            elif metric.kind != kind:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def _collect(self):
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return [(metric, metric.collect()) for metric in metrics]
+
+    def render_prometheus(self):
+        lines = []
+        for metric, samples in self._collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, value in samples:
+                labels = list(zip(metric.labelnames, values))
+                if metric.kind != HISTOGRAM:
+                    lines.append(f"{metric.name}{_label_text(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in value['buckets']:
+                    cumulative += count
+                    lines.append(f"{metric.name}_bucket{_label_text(labels + [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{metric.name}_bucket{_label_text(labels + [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{metric.name}_sum{_label_text(labels)} {_number(value['sum'])}")
+                lines.append(f"{metric.name}_count{_label_text(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def render_json(self):
+        result = {}
+        for metric, samples in self._collect():
+            series = []
+            for values, value in samples:
+                if metric.kind == HISTOGRAM:
+                    value = {key: item for key, item in value.items() if key != 'buckets'}
+                    value['avg'] = value['sum'] / value['count'] if value['count'] else 0.0
+                series.append({'labels': dict(zip(metric.labelnames, values)), 'value': value})
+            result[metric.name] = {'type': metric.kind, 'help': metric.help, 'series': series}
+        return json.dumps(result, default=str)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(int(value)) if value.is_integer() else repr(value)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.counter(name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=(), function=None):
+    return REGISTRY.gauge(name, help_text, labelnames, function)
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
+
+
+def peer_label(sock):
+    """Client label for a socket: its IP address, so reconnects reuse the series"""
+    try:
+        return sock.getpeername()[0]
+    except (OSError, IndexError, TypeError):
+        return 'unknown'
+
+
+class MetricsServer:
+    """Serve a registry over HTTP on a loopback address"""
+
+    def __init__(self, registry=REGISTRY, port=METRICS_PORT, host='127.0.0.1'):
+        if not _is_loopback(host):
+            logging.warning(f"Metrics endpoint is loopback-only, ignoring host {host}")
+            host = '127.0.0.1'
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def start(self):
+        if self.httpd:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = registry.render_prometheus(), 'text/plain; version=0.0.4'
+                elif path == '/metrics.json':
+                    body, content_type = registry.render_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("Metrics request: " + format, *args)
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+            self.port = self.httpd.server_address[1]
+            threading.Thread(target=self.httpd.serve_forever, name='MetricsServer', daemon=True).start()
+            logging.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        except Exception as e:
+            logging.error(f"Error starting metrics endpoint: {e}")
+            self.httpd = None
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
@@ -0,0 +1,442 @@
+"""
+Single-port multiplexed transport for all services.
+
+One TCP connection carries every channel a device uses (control input,
+screen share, files, window thumbnails, clipboard) as numbered streams.
+The device authenticates once, exactly as on the control port, then opens
+streams by channel name. Each stream is a socket-like MuxStream, so the
+existing service handlers run on it unchanged.
+
+Handshake:
+    server: AUTH_REQUIRED
+    client: {"pin": "123456"}\\n      (or {"resume": token}\\n, see session.py)
+    server: AUTH_SUCCESS              (or AUTH_FAILED and close)
+
+Then frames in both directions, header big-endian:
+    stream_id (uint16) | type (uint8) | length (uint32) | payload
+
+    OPEN    client -> server, payload = channel name (utf-8)
+    DATA    stream bytes
+    WINDOW  payload = uint32: the receiver has consumed that many more bytes
+    CLOSE   this side will send no more on the stream
+    RESET   stream refused or aborted, payload = reason (utf-8)
+
+Flow control: each side may have at most INITIAL_WINDOW bytes of DATA in
+flight per stream and direction; the receiver returns credit with WINDOW as
+its handler reads. A stalled screen stream therefore never holds back the
+control stream. One writer thread per connection sends queued frames in
+channel priority order (control first), and DATA frames are at most
+MAX_FRAME_DATA bytes, so input replies overtake bulk transfers.
+"""
+
+import itertools
+import logging
+import queue
+import socket
+import struct
+import threading
+import time
+
+MUX_PORT = 8086  # Suggested port for [Server] mux_port
+
+FRAME_HEADER = struct.Struct('!HBI')
+WINDOW_UPDATE = struct.Struct('!I')
+
+OPEN = 1
+DATA = 2
+WINDOW = 3
+CLOSE = 4
+RESET = 5
+
+INITIAL_WINDOW = 256 * 1024   # Bytes in flight per stream and direction
+MAX_FRAME_DATA = 16 * 1024    # Largest DATA payload; bounds how long input waits behind bulk data
+MAX_STREAMS = 64              # Open streams per connection
+MAX_HANDSHAKE = 4096          # Longest auth line
+
+# Channel priorities: lower is sent first
+PRIORITY_INPUT = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+
+class MuxStream:
+    """One channel on a MuxConnection, usable where service handlers expect a socket"""
+
+    def __init__(self, connection, stream_id, channel, priority):
+        self.connection = connection
+        self.stream_id = stream_id
+        self.channel = channel
+        self.priority = priority
+        self.cond = threading.Condition()
+        self.inbox = bytearray()
+        self.remote_closed = False  # Peer sent CLOSE/RESET or the connection dropped
+        self.closed = False         # We sent CLOSE
+        self.send_window = INITIAL_WINDOW
+        self.consumed = 0           # Bytes read since the last WINDOW we sent
+        self.timeout = None
+
+        # Statistics
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    # Socket API used by the service handlers
+
+    def recv(self, size):
+        with self.cond:
+            if not self._wait(lambda: self.inbox or self.remote_closed):
+                raise socket.timeout("timed out")
+            data = bytes(self.inbox[:size])
+            del self.inbox[:len(data)]
+        self._consumed(len(data))
+        return data
+
+    def recv_into(self, buffer, nbytes=0):
+        size = nbytes or len(buffer)
+        data = self.recv(size)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def send(self, data):
+        self.sendall(data)
+        return len(data)
+
+    def sendall(self, data):
+        view = memoryview(data).cast('B')
+        while view:
+            with self.cond:
+                if not self._wait(lambda: self.send_window > 0 or self.closed or self.remote_closed):
+                    raise socket.timeout("timed out")
+                if self.closed or self.remote_closed:
+                    raise OSError("Stream closed")
+                size = min(len(view), self.send_window, MAX_FRAME_DATA)
+                self.send_window -= size
+            self.connection.send_frame(self.priority, self.stream_id, DATA, view[:size].tobytes())
+            self.bytes_out += size
+            view = view[size:]
+
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        self.connection.send_frame(self.priority, self.stream_id, CLOSE)
+        self.connection.stream_closed(self)
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def gettimeout(self):
+        return self.timeout
+
+    def setsockopt(self, *args):
+        pass  # TCP options belong to the shared connection
+
+    def getpeername(self):
+        return self.connection.address
+
+    # Called by the connection's reader
+
+    def _feed(self, data):
+        with self.cond:
+            if len(self.inbox) + len(data) > INITIAL_WINDOW:
+                return False  # Peer ignored flow control
+            self.inbox += data
+            self.bytes_in += len(data)
+            self.cond.notify_all()
+        return True
+
+    def _grant(self, credit):
+        with self.cond:
+            self.send_window += credit
+            self.cond.notify_all()
+
+    def _remote_close(self):
+        with self.cond:
+            self.remote_closed = True
+            self.cond.notify_all()
+
+    def _wait(self, predicate):
+        """Wait on self.cond for predicate, honouring settimeout(); False on timeout"""
+        if self.timeout is None:
+            self.cond.wait_for(predicate)
+            return True
+        return self.cond.wait_for(predicate, self.timeout)
+
+    def _consumed(self, size):
+        if not size:
+            return
+        with self.cond:
+            self.consumed += size
+            if self.consumed < INITIAL_WINDOW // 2:
+                return
+            credit, self.consumed = self.consumed, 0
+        self.connection.send_frame(PRIORITY_INPUT, self.stream_id, WINDOW, WINDOW_UPDATE.pack(credit))
+
+
+class MuxConnection:
+    """One authenticated device connection and its streams"""
+
+    def __init__(self, server, sock, address, auth):
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.auth = auth  # What the authenticate hook returned, for the control channel
+        self.lock = threading.Lock()
+        self.streams = {}  # stream_id -> MuxStream
+        self.outgoing = queue.PriorityQueue()
+        self._order = itertools.count()  # FIFO within a priority
+        self.closed = False
+        self.opened_at = time.time()
+
+    def send_frame(self, priority, stream_id, frame_type, payload=b''):
+        if self.closed:
+            raise OSError("Connection closed")
+        frame = FRAME_HEADER.pack(stream_id, frame_type, len(payload)) + payload
+        self.outgoing.put((priority, next(self._order), frame))
+
+    def stream_closed(self, stream):
+        """Forget a stream once both sides are done with it"""
+        with self.lock:
+            if stream.closed and stream.remote_closed and self.streams.get(stream.stream_id) is stream:
+                del self.streams[stream.stream_id]
+
+    def serve(self):
+        writer = threading.Thread(target=self._write_loop, name='MuxWriter', daemon=True)
+        writer.start()
+        try:
+            while True:
+                header = self._read_exact(FRAME_HEADER.size)
+                if header is None:
+                    break
+                stream_id, frame_type, length = FRAME_HEADER.unpack(header)
+                if length > max(MAX_FRAME_DATA, INITIAL_WINDOW):
+                    raise ValueError(f"Frame of {length} bytes is too large")
+                payload = self._read_exact(length) if length else b''
+                if payload is None:
+                    break
+                self._handle_frame(stream_id, frame_type, payload)
+        except Exception as e:
+            logging.error(f"Mux connection {self.address} error: {e}")
+        finally:
+            self._shutdown()
+            writer.join(timeout=1.0)
+
+    def _handle_frame(self, stream_id, frame_type, payload):
+        if frame_type == OPEN:
+            self._open_stream(stream_id, payload.decode('utf-8', errors='replace'))
+            return
+
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            return  # Frames racing a close are dropped
+
+        if frame_type == DATA:
+            if not stream._feed(payload):
+                self._reset(stream_id, stream.priority, "flow control window exceeded")
+                self._drop(stream)
+        elif frame_type == WINDOW:
+            stream._grant(WINDOW_UPDATE.unpack(payload)[0])
+        elif frame_type in (CLOSE, RESET):
+            stream._remote_close()
+            if frame_type == RESET:
+                stream.closed = True
+            self.stream_closed(stream)
+
+    def _open_stream(self, stream_id, channel):
+        entry = self.server.channels.get(channel)
+        if entry is None:
+            self._reset(stream_id, PRIORITY_INPUT, f"unknown channel {channel}")
+            return
+        handler, priority = entry
+        with self.lock:
+            if stream_id in self.streams or len(self.streams) >= MAX_STREAMS:
+                refused = True
+            else:
+                refused = False
+                stream = self.streams[stream_id] = MuxStream(self, stream_id, channel, priority)
+        if refused:
+            self._reset(stream_id, priority, "stream refused")
+            return
+
+        logging.info(f"Mux {self.address} opened stream {stream_id} ({channel})")
+        threading.Thread(target=self._run_handler, args=(handler, stream),
+                         name=f"Mux-{channel}", daemon=True).start()
+
+    def _run_handler(self, handler, stream):
+        try:
+            handler(stream, self.address)
+        except Exception as e:
+            logging.error(f"Mux {stream.channel} handler error: {e}")
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _reset(self, stream_id, priority, reason):
+        try:
+            self.send_frame(priority, stream_id, RESET, reason.encode('utf-8'))
+        except OSError:
+            pass
+
+    def _drop(self, stream):
+        stream._remote_close()
+        stream.closed = True
+        self.stream_closed(stream)
+
+    def _read_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+
+    def _write_loop(self):
+        while True:
+            _, _, frame = self.outgoing.get()
+            if frame is None:
+                return
+            try:
+                self.sock.sendall(frame)
+            except OSError:
+                self._shutdown()
+                return
+
+    def _shutdown(self):
+        if self.closed:
+            return
+        self.closed = True
+        with self.lock:
+            streams = list(self.streams.values())
+            self.streams.clear()
+        for stream in streams:
+            stream._remote_close()
+        # Wake the writer ahead of anything still queued
+        self.outgoing.put((PRIORITY_INPUT - 1, next(self._order), None))
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def get_stats(self):
+        with self.lock:
+            streams = list(self.streams.values())
+        return {
+            'address': self.address,
+            'opened_at': self.opened_at,
+            'queued_frames': self.outgoing.qsize(),
+            'streams': [{
+                'stream_id': stream.stream_id,
+                'channel': stream.channel,
+                'bytes_in': stream.bytes_in,
+                'bytes_out': stream.bytes_out,
+                'send_window': stream.send_window,
+            } for stream in streams],
+        }
+
+
+class MuxServer:
+    """Accept multiplexed connections and route their streams to channel handlers"""
+
+    def __init__(self, authenticate, port=MUX_PORT, host='0.0.0.0'):
+        """
+        authenticate(address, line): checks the handshake line like the control
+            port does; a falsy result rejects the connection.
+        """
+        self.authenticate = authenticate
+        self.port = port
+        self.host = host
+        self.channels = {}  # name -> (handler(stream, address), priority)
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.server_socket = None
+        self.is_running = False
+
+    def register_channel(self, name, handler, priority=PRIORITY_BULK):
+        """Serve streams opened with this channel name; handler(stream, address) runs on its own thread"""
+        self.channels[name] = (handler, priority)
+
+    def start(self):
+        if self.is_running:
+            return
+        try:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(5)
+            self.port = self.server_socket.getsockname()[1]
+            self.is_running = True
+            threading.Thread(target=self._accept_loop, name='MuxAccept', daemon=True).start()
+            logging.info(f"Multiplexed transport listening on port {self.port}")
+        except Exception as e:
+            logging.error(f"Error starting multiplexed transport: {e}")
+            self.stop()
+
+    def stop(self):
+        self.is_running = False
+        if self.server_socket:
+            try:
+                self.server_socket.close()
+            except OSError:
+                pass
+            self.server_socket = None
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection._shutdown()
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                sock, address = self.server_socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle_connection, args=(sock, address),
+                             name='MuxConnection', daemon=True).start()
+
+    def _handle_connection(self, sock, address):
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(b'AUTH_REQUIRED')
+            line = self._read_line(sock)
+            auth = self.authenticate(address, line) if line else False
+            if not auth:
+                sock.sendall(b'AUTH_FAILED')
+                sock.close()
+                return
+            sock.sendall(b'AUTH_SUCCESS')
+        except Exception as e:
+            logging.error(f"Mux authentication error from {address}: {e}")
+            sock.close()
+            return
+
+        connection = MuxConnection(self, sock, address, auth)
+        with self.lock:
+            self.connections.add(connection)
+        try:
+            connection.serve()
+        finally:
+            with self.lock:
+                self.connections.discard(connection)
+            logging.info(f"Mux connection {address} closed")
+
+    def _read_line(self, sock):
+        """Read the handshake line byte by byte so no frame bytes are consumed"""
+        line = bytearray()
+        while len(line) < MAX_HANDSHAKE:
+            byte = sock.recv(1)
+            if not byte:
+                return None
+            if byte == b'\n':
+                return line.decode('utf-8', errors='replace')
+            line += byte
+        raise ValueError("Handshake line too long")
+
+    def get_stats(self):
+        with self.lock:
+            connections = list(self.connections)
+        return [connection.get_stats() for connection in connections]
@@ -0,0 +1,193 @@
+"""
+On-demand profiler: switched on and off at runtime, free while off.
+
+While running it does two things:
+
+  * samples every thread's Python stack SAMPLE_HZ times a second
+    (sys._current_frames) and counts identical stacks;
+  * times the named hot paths wrapped in section() or @timed().
+
+stop() writes to ~/.anycommand/profiles/:
+
+    profile-<time>.folded   one "thread;outer;...;inner count" line per stack,
+                            the input format of flamegraph.pl, speedscope and
+                            inferno
+    profile-<time>.json     call count and latency percentiles per section
+
+Instrumenting a hot path:
+
+    with profiler.section('capture_frame'):
+        ...
+
+    @profiler.timed('get_windows')
+    def _get_windows(self): ...
+
+While the profiler is off, section() returns a shared no-op context manager
+and @timed costs one flag check.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from command_registry import LatencyHistogram
+
+SAMPLE_HZ = 100
+MAX_DURATION = 600  # Seconds; a forgotten profiler stops itself
+
+_lock = threading.Lock()
+_active = None  # The running Profile, or None
+
+
+class Profile:
+    """Samples and section timings of one profiling run"""
+
+    def __init__(self, sample_hz):
+        self.interval = 1.0 / sample_hz
+        self.started_at = time.time()
+        self.stacks = {}     # folded stack -> samples
+        self.samples = 0
+        self.sections = {}   # name -> LatencyHistogram
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.sections.get(name)
+            if histogram is None:
+                histogram = self.sections[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def sample_loop(self, deadline):
+        sampler = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == sampler:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                folded = ';'.join(reversed(stack))
+                self.stacks[folded] = self.stacks.get(folded, 0) + 1
+            self.samples += 1
+            if time.monotonic() > deadline:
+                threading.Thread(target=stop, name='ProfilerStop', daemon=True).start()
+                break
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, time.strftime('profile-%Y%m%d-%H%M%S', time.localtime(self.started_at)))
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")  # Readers split at the last space
+        with self.lock:
+            sections = {name: histogram.snapshot() for name, histogram in sorted(self.sections.items())}
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'started_at': self.started_at,
+                'duration_seconds': round(time.time() - self.started_at, 3),
+                'samples': self.samples,
+                'sample_hz': round(1.0 / self.interval),
+                'sections': sections,
+            }, f, indent=2)
+        return base + '.folded'
+
+
+def start(duration=None, sample_hz=SAMPLE_HZ):
+    """Start profiling for up to `duration` seconds; returns False if already running"""
+    global _active
+    with _lock:
+        if _active is not None:
+            return False
+        profile = Profile(sample_hz)
+        deadline = time.monotonic() + min(duration or MAX_DURATION, MAX_DURATION)
+        profile.thread = threading.Thread(target=profile.sample_loop, args=(deadline,),
+                                          name='ProfilerSampler', daemon=True)
+        profile.thread.start()
+        _active = profile
+    return True
+
+
+def stop(directory=None):
+    """Stop profiling and write the results; returns the .folded path, or None if not running.
+
+    directory defaults to ~/.anycommand/profiles.
+    """
+    global _active
+    with _lock:
+        profile, _active = _active, None
+    if profile is None:
+        return None
+    profile.stopped.set()
+    if profile.thread is not threading.current_thread():
+        profile.thread.join()
+    return profile.write(directory or os.path.join(os.path.expanduser('~'), '.anycommand', 'profiles'))
+
+
+def is_running():
+    return _active is not None
+
+
+class _Section:
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.record(self.name, time.perf_counter() - self.start)
+
+
+class _NoSection:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SECTION = _NoSection()
+
+
+def record(name, seconds):
+    """Add a timing measured by the caller (e.g. one it also reports as a metric)"""
+    profile = _active
+    if profile is not None:
+        profile.record(name, seconds)
+
+
+def section(name):
+    """Context manager timing a named hot path while the profiler runs"""
+    profile = _active
+    if profile is None:
+        return _NO_SECTION
+    return _Section(profile, name)
+
+
+def timed(name):
+    """Decorator form of section()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _active
+            if profile is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
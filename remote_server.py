@@ -1,38 +1,59 @@
 import socket
-import pyautogui
-import keyboard
 from threading import Thread
 import sys
 import logging
 import os
 import math
 import time
-import win32api
-import win32con
-import ctypes
-from ctypes import wintypes
-import win32gui
 import sys
 import subprocess
 import hashlib
 import json
 import secrets
 import configparser
-from threading import Timer
-import customtkinter as ctk
-import win32event
-import win32security
-import winerror
-from screen_share_service import ScreenShareService
-from file_transfer_service import FileTransferService
-from window_thumbnails_service import WindowThumbnailsService
+try:
+    import win32api
+    import win32con
+    import win32event
+    import win32security
+    import winerror
+except ImportError:
+    # Not on Windows: only headless mode (services=False, null/recording input sink) works
+    win32api = win32con = win32event = win32security = winerror = None
 import threading
-from clipboard_service import ClipboardService
+from command_parser import CommandParser, OversizedCommand
+import binary_protocol
+from command_registry import CommandRegistry
+from input_scheduler import InputScheduler, DEFAULT_RATE_HZ
+from udp_input_channel import UdpInputChannel, UDP_PORT
+from display_topology import DisplayTopology, enable_dpi_awareness
+from timer_wheel import TimerWheel
+from key_sequencer import KeySequencer
+from text_input import TextInput
+from session import Session, SessionManager, SESSION_TICK, WARNING_LEAD, RESUME_TTL
+from link_stats import PROBE_INTERVAL
+from frame_pacer import IDLE_FPS, IDLE_AFTER
+from stream_rate import MIN_QUALITY, MIN_SCALE, MIN_FPS, LEVELS
+import metrics
+import profiler
+import shortcuts_handler
+from metrics import MetricsServer, METRICS_PORT
+from log_utils import configure_logging, get_logger
+from mux_transport import MuxServer, PRIORITY_INPUT, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from input_sink import (MOUSE_BUTTONS, KEY, VK, BUTTON, TEXT, NativeInputSink, create_input_sink, combo_events,
+                        click_events, legacy_key_name)
 import asyncio
-import websockets
 
 REQUIRED_PACKAGES = ["keyboard", "pyautogui", "pywin32", "customtkinter", "pyperclip", "websockets"]
 
+# Per-event logs go through category loggers so disabled ones cost nothing ([LogLevels] in config.ini)
+input_log = get_logger('input')
+gyro_log = get_logger('gyro')
+control_log = get_logger('control')
+
+commands_total = metrics.counter('anycommand_control_commands_total', 'Control commands executed',
+                                 ('command', 'transport'))
+
 # Use the same mutex name
 MUTEX_NAME = "Global\\AnyCommandServer_SingleInstance"
 
@@ -62,6 +83,30 @@ GAMEPAD_BUTTON_MAP = {
     'home': 'windows',
 }
 
+# Capabilities a client can request with "CAPS:<name>[,<name>...]" after AUTH_SUCCESS
+CAP_NO_ACK_STREAM = 'NO_ACK_STREAM'  # Skip the OK reply for streaming input commands
+CAP_BINARY = 'BINARY'                # Accept binary input frames (binary_protocol.py)
+CAP_UDP = 'UDP'                      # Issue a UDP session for streaming input (udp_input_channel.py)
+CAP_RESUME = 'RESUME'                # Issue resumption tokens for fast reconnects (session.py)
+CAP_PROBE = 'PROBE'                  # Measure RTT/jitter/loss with PROBE/PROBE_ACK (link_stats.py)
+SERVER_CAPABILITIES = frozenset({CAP_NO_ACK_STREAM, CAP_BINARY, CAP_UDP, CAP_RESUME, CAP_PROBE})
+
+# High-rate "latest value wins" input commands covered by CAP_NO_ACK_STREAM.
+# Discrete commands (KEY, TYPE, clicks, PIN_CONFIG, ...) are always acknowledged.
+STREAMING_COMMANDS = frozenset({
+    'MOUSE_MOVE',
+    'SCROLL',
+    'GAMEPAD_STICK',
+    'GAMEPAD_MOTION',
+    'GAMEPAD_GYRO',
+})
+
+def _is_local_address(address):
+    """True for loopback peers (local admin commands)"""
+    host = address[0] if address else ''
+    return host in ('127.0.0.1', '::1', 'localhost') or host.startswith('127.')
+
+
 # Function to install missing packages
 def install_packages():
     for package in REQUIRED_PACKAGES:
@@ -72,53 +117,8 @@ def install_packages():
             subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
 # Ensure all required packages are installed before proceeding
-install_packages()
-
-def send_input_mouse_wheel(delta):
-    # Mouse wheel input structure
-    class MOUSEINPUT(ctypes.Structure):
-        _fields_ = [
-            ("dx", wintypes.LONG),
-            ("dy", wintypes.LONG),
-            ("mouseData", wintypes.DWORD),
-            ("dwFlags", wintypes.DWORD),
-            ("time", wintypes.DWORD),
-            ("dwExtraInfo", ctypes.POINTER(wintypes.ULONG))
-        ]
-
-    class INPUT(ctypes.Structure):
-        _fields_ = [
-            ("type", wintypes.DWORD),
-            ("mi", MOUSEINPUT)
-        ]
-
-    MOUSEEVENTF_WHEEL = 0x0800
-
-    extra = ctypes.pointer(wintypes.ULONG(0))
-    input_struct = INPUT(
-        type=0,  # INPUT_MOUSE
-        mi=MOUSEINPUT(0, 0, delta, MOUSEEVENTF_WHEEL, 0, extra)
-    )
-
-    ctypes.windll.user32.SendInput(1, ctypes.byref(input_struct), ctypes.sizeof(INPUT))
-
-def find_scroll_window():
-    """Find the window under the cursor"""
-    cursor_pos = win32gui.GetCursorPos()
-    return win32gui.WindowFromPoint(cursor_pos)
-
-def send_scroll_message(direction):
-    """Send WM_MOUSEWHEEL message directly to the window"""
-    WM_MOUSEWHEEL = 0x020A
-    window = find_scroll_window()
-    wheel_delta = 120 if direction == 'up' else -120  # Standard wheel delta
-    cursor_pos = win32gui.GetCursorPos()
-
-    # Create message parameters
-    wparam = wheel_delta << 16  # Shift delta to high word
-    lparam = cursor_pos[1] << 16 | cursor_pos[0]  # Pack coordinates
-
-    win32gui.SendMessage(window, WM_MOUSEWHEEL, wparam, lparam)
+if sys.platform == 'win32':
+    install_packages()
 
 class GamepadState:
     """Track gamepad state for advanced features"""
@@ -135,48 +135,97 @@ class GamepadState:
         self.last_mouse_update = time.time()
 
 class RemoteServer:
-    def __init__(self, host='0.0.0.0', port=8000, pin_mode=True, custom_pin=''):
-        # Suppress all console output
-        logging.getLogger().handlers = []
-
-        # Add null handler to suppress console output
-        null_handler = logging.NullHandler()
-        logging.getLogger().addHandler(null_handler)
-
-        # Add file handler for logging to file
-        file_handler = logging.FileHandler('remote_server.log')
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            '%Y-%m-%d %H:%M:%S'
-        ))
-        logging.getLogger().addHandler(file_handler)
-        logging.getLogger().setLevel(logging.ERROR)
+    def __init__(self, host='0.0.0.0', port=8000, pin_mode=True, custom_pin='', input_sink=None, services=True):
+        """
+        input_sink: InputSink every injected event goes through; defaults to
+            [Input] input_sink in config.ini ('native' unless configured).
+        services: start the desktop services (screen share, file transfer,
+            thumbnails, clipboard, keyboard WebSocket). Pass False to run only
+            the control channel, e.g. for benchmarks on a headless machine.
+        """
+        # No console output: everything goes through a queue to remote_server.log
+        configure_logging()
 
         self.host = host
         self.port = port
         self.server = None
         self.config = self._load_or_create_config(pin_mode, custom_pin)
-        self.authenticated_clients = set()
-        self.disconnect_timer = None
-        self.warning_timer = None
-        self.disconnect_minutes = 120  # Default 2 hours
-        self.clients = set()  # Track connected clients
+        configure_logging(self.config)  # [Logging] / [LogLevels] settings
+        self.disconnect_minutes = 120  # Default for new sessions: 2 hours
+
+        # One Session per authenticated connection; its timeouts share one coarse timer wheel
+        self.session_wheel = TimerWheel(tick=SESSION_TICK, name='SessionTimers')
+        self.sessions = SessionManager(
+            self.session_wheel,
+            on_warning=self._send_warning,
+            on_disconnect=self.auto_disconnect,
+            on_idle=self.auto_disconnect,
+            idle_timeout=self.config.getint('Session', 'idle_timeout_minutes', fallback=0) * 60,
+            resume_ttl=self.config.getint('Session', 'resume_ttl_seconds', fallback=RESUME_TTL),
+            on_probe=self._send_probe,
+            probe_interval=self.config.getfloat('Session', 'probe_interval_seconds', fallback=PROBE_INTERVAL),
+        )
+
+        # Every injected mouse/keyboard event goes through the input sink
+        if input_sink is None:
+            input_sink = create_input_sink(self.config.get('Input', 'input_sink', fallback='native'))
+        self.input_sink = input_sink
+        shortcuts_handler.set_input_sink(input_sink)
+
+        # Multi-event operations are injected as one batch, except into apps known to drop them
+        slow_apps = [app.strip() for app in self.config.get('Input', 'slow_apps', fallback='').split(',') if app.strip()]
+        self.input_sink.set_pacing(slow_apps, self.config.getint('Input', 'slow_app_delay_ms', fallback=50) / 1000.0)
+
+        # Screen geometry for every clamp and percent-to-pixel conversion, refreshed periodically
+        self.display_topology = DisplayTopology(self.input_sink.get_display_layout)
+        self.input_sink.set_display_topology(self.display_topology)
+
+        # Key/button sequences are injected in order; paced steps run on the timer wheel
+        self.timer_wheel = TimerWheel()
+        self.key_sequencer = KeySequencer(self.input_sink, self.timer_wheel)
+        shortcuts_handler.set_key_sequencer(self.key_sequencer)
 
         # Initialize gamepad state
         self.gamepad_state = GamepadState()
 
-        # Initialize screen sharing service
-        self.screen_share_service = ScreenShareService()
-        self.screen_sharing_active = False
+        # Coalesce relative cursor motion from all sources into one move per tick
+        self.input_scheduler = InputScheduler(self._apply_cursor_motion, rate_hz=self._get_motion_rate())
 
-        # Initialize file transfer service
-        self.file_transfer_service = FileTransferService()
+        # Command name / binary opcode -> handler tables
+        timing = self.config.getboolean('Diagnostics', 'command_timing', fallback=False)
+        self.commands = CommandRegistry(timing=timing)
+        self._register_commands()
+        self._register_binary_commands()
 
-        # Initialize window thumbnails service
-        self.window_thumbnails_service = WindowThumbnailsService()
+        # Lossy side channel for pointer/analog input; [Input] udp_port = 0 disables it
+        udp_port = self.config.getint('Input', 'udp_port', fallback=UDP_PORT)
+        self.udp_input_channel = UdpInputChannel(self._process_udp_event, port=udp_port,
+                                                 on_activity=self.sessions.touch) if udp_port else None
 
-        # Initialize clipboard service
-        self.clipboard_service = ClipboardService(port=8084)
+        # Desktop services
+        self.services_enabled = services
+        self.screen_sharing_active = False
+        self.screen_share_service = None
+        self.file_transfer_service = None
+        self.window_thumbnails_service = None
+        self.clipboard_service = None
+        if services:
+            self._create_services()
+
+        # Optional single-port transport carrying every channel; [Server] mux_port = 0 disables it
+        mux_port = self.config.getint('Server', 'mux_port', fallback=0)
+        self.mux_server = MuxServer(self._authenticate, port=mux_port) if mux_port else None
+        if self.mux_server:
+            self._register_mux_channels()
+
+        # Loopback-only metrics endpoint; [Metrics] port = 0 disables it
+        metrics_port = self.config.getint('Metrics', 'port', fallback=METRICS_PORT)
+        self.metrics_server = MetricsServer(port=metrics_port) if metrics_port else None
+        self._register_metrics()
+
+        # Text is typed as Unicode key strokes, or pasted via the clipboard when long
+        self.text_input = TextInput.from_config(self.config, self.key_sequencer, self.timer_wheel,
+                                                clipboard=self.clipboard_service)
 
         # Initialize WebSocket server for keyboard/text input
         self.websocket_server = None
@@ -190,19 +239,12 @@ class RemoteServer:
             self.server.bind((self.host, self.port))
             self.server.listen(5)
 
-            # Initialize pyautogui settings
-            pyautogui.FAILSAFE = False  # Disable failsafe
-            pyautogui.MINIMUM_DURATION = 0
-            pyautogui.MINIMUM_SLEEP = 0
-            pyautogui.PAUSE = 0
-
             # Try to set mouse speed, but don't fail if we can't
-            try:
-                import win32api
-                import win32con
-                win32api.SystemParametersInfo(win32con.SPI_SETMOUSESPEED, 0, 20)
-            except:
-                logging.warning("Could not set mouse speed - continuing anyway")
+            if isinstance(self.input_sink, NativeInputSink):
+                try:
+                    win32api.SystemParametersInfo(win32con.SPI_SETMOUSESPEED, 0, 20)
+                except:
+                    logging.warning("Could not set mouse speed - continuing anyway")
 
         except Exception as e:
             logging.error(f"Failed to initialize server: {e}")
@@ -211,10 +253,90 @@ class RemoteServer:
             sys.exit(1)
 
         # Start services
-        self.screen_share_service.start()
-        self.file_transfer_service.start()
-        self.window_thumbnails_service.start()
-        self.clipboard_service.start()
+        self.input_scheduler.start()
+        self.timer_wheel.start()
+        self.session_wheel.start()
+        if self.udp_input_channel:
+            self.udp_input_channel.start()
+        if self.mux_server:
+            self.mux_server.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.services_enabled:
+            self.screen_share_service.start()
+            self.file_transfer_service.start()
+            self.window_thumbnails_service.start()
+            self.clipboard_service.start()
+
+    def _create_services(self):
+        """Create the desktop services (imported here so headless mode does not need them)"""
+        from screen_share_service import ScreenShareService
+        from file_transfer_service import FileTransferService
+        from window_thumbnails_service import WindowThumbnailsService
+        from clipboard_service import ClipboardService
+
+        # Initialize screen sharing service; [Screen] adaptive_fps drops the capture rate on a static screen,
+        # and each stream client gets quality, scale and fps between the min_* and max_* bounds
+        config = self.config
+        self.screen_share_service = ScreenShareService(
+            display_topology=self.display_topology,
+            adaptive_fps=config.getboolean('Screen', 'adaptive_fps', fallback=True),
+            idle_fps=config.getfloat('Screen', 'idle_fps', fallback=IDLE_FPS),
+            idle_after=config.getfloat('Screen', 'idle_after_seconds', fallback=IDLE_AFTER),
+            quality=config.getint('Screen', 'max_quality', fallback=75),
+            fps=config.getfloat('Screen', 'max_fps', fallback=20),
+            scale=config.getfloat('Screen', 'max_scale', fallback=0.9),
+            min_quality=config.getint('Screen', 'min_quality', fallback=MIN_QUALITY),
+            min_scale=config.getfloat('Screen', 'min_scale', fallback=MIN_SCALE),
+            min_fps=config.getfloat('Screen', 'min_fps', fallback=MIN_FPS),
+            quality_levels=config.getint('Screen', 'quality_levels', fallback=LEVELS),
+            link_for_host=self.sessions.link_for_host)
+
+        # Initialize file transfer service
+        self.file_transfer_service = FileTransferService()
+
+        # Initialize window thumbnails service
+        self.window_thumbnails_service = WindowThumbnailsService()
+
+        # Initialize clipboard service
+        self.clipboard_service = ClipboardService(port=8084)
+
+    def _register_metrics(self):
+        """Gauges read from server state when the metrics endpoint is scraped"""
+        def links():
+            return {str(link['session_id']): link for link in self.get_link_stats() if link['rtt_ms'] is not None}
+
+        metrics.gauge('anycommand_sessions', 'Open control sessions',
+                      function=lambda: len(self.sessions.sessions))
+        metrics.gauge('anycommand_link_rtt_seconds', 'Smoothed round-trip time of probed sessions', ('session',),
+                      function=lambda: {key: link['rtt_ms'] / 1000 for key, link in links().items()})
+        metrics.gauge('anycommand_link_jitter_seconds', 'Round-trip time jitter of probed sessions', ('session',),
+                      function=lambda: {key: link['jitter_ms'] / 1000 for key, link in links().items()})
+        metrics.gauge('anycommand_link_loss_ratio', 'Fraction of recent probes lost', ('session',),
+                      function=lambda: {key: link['loss'] for key, link in links().items()})
+        metrics.gauge('anycommand_mux_connections', 'Open multiplexed connections',
+                      function=lambda: len(self.get_mux_stats()))
+
+    def _register_mux_channels(self):
+        """Serve the control protocol and the desktop services as multiplexed channels"""
+        mux = self.mux_server
+        mux.register_channel('control', self._handle_mux_control, PRIORITY_INPUT)
+        if not self.services_enabled:
+            return
+        mux.register_channel('clipboard', lambda stream, address: self.clipboard_service._handle_client(stream),
+                             PRIORITY_INTERACTIVE)
+        mux.register_channel('thumbnails', lambda stream, address: self.window_thumbnails_service._handle_client(stream),
+                             PRIORITY_INTERACTIVE)
+        mux.register_channel('screen', lambda stream, address: self.screen_share_service._handle_client(stream),
+                             PRIORITY_BULK)
+        mux.register_channel('files', self.file_transfer_service.handle_client, PRIORITY_BULK)
+
+    def _handle_mux_control(self, stream, address):
+        """Control channel of a multiplexed connection; the device authenticated on connect"""
+        connection = stream.connection
+        # A resumed session belongs to the first control stream only
+        auth, connection.auth = connection.auth, True
+        self._serve_control(stream, address, auth, CommandParser(), [])
 
     def _load_or_create_config(self, pin_mode, custom_pin):
         config = configparser.ConfigParser()
@@ -272,20 +394,21 @@ class RemoteServer:
     def start(self):
         logging.info("Server starting...")
         try:
-            # Start WebSocket server for keyboard/text input
-            self.start_websocket_server()
+            if self.services_enabled:
+                # Start WebSocket server for keyboard/text input
+                self.start_websocket_server()
 
-            # Start screen sharing
-            self.toggle_screen_sharing(True)
+                # Start screen sharing
+                self.toggle_screen_sharing(True)
 
-            # Start file transfer service
-            self.file_transfer_service.start()
+                # Start file transfer service
+                self.file_transfer_service.start()
 
-            # Start window thumbnails service
-            self.window_thumbnails_service.start()
+                # Start window thumbnails service
+                self.window_thumbnails_service.start()
 
-            # Start clipboard service
-            self.clipboard_service.start()
+                # Start clipboard service
+                self.clipboard_service.start()
 
             while True:
                 logging.info("Waiting for connection...")
@@ -302,23 +425,11 @@ class RemoteServer:
             self.server.close()
 
     def handle_key_combination(self, key_combo):
-        """Handle complex key combinations with proper timing"""
+        """Press a key combination such as ctrl+shift+esc without blocking the caller"""
         try:
-            keys = key_combo.split('+')
-            # Press all keys in sequence
-            for k in keys:
-                key = k.lower().strip()
-                keyboard.press(key)
-                time.sleep(0.05)  # Small delay between key presses
-
-            # Small hold time for the combination
-            time.sleep(0.1)
-
-            # Release in reverse order
-            for k in reversed(keys):
-                key = k.lower().strip()
-                keyboard.release(key)
-                time.sleep(0.05)  # Small delay between key releases
+            keys = [k.lower().strip() for k in key_combo.split('+')]
+            # Press in order and release in reverse; paced steps run on the timer wheel
+            self.key_sequencer.submit(combo_events(keys))
 
         except Exception as e:
             logging.error(f"Error in key combination {key_combo}: {e}")
@@ -328,15 +439,17 @@ class RemoteServer:
         """Send a character using Windows API directly"""
         if char == '?':
             # VK_SHIFT = 0x10, VK_OEM_2 (/?key) = 0xBF
-            win32api.keybd_event(0x10, 0, 0, 0)  # Press Shift
-            win32api.keybd_event(0xBF, 0, 0, 0)  # Press /?
-            win32api.keybd_event(0xBF, 0, win32con.KEYEVENTF_KEYUP, 0)  # Release /?
-            win32api.keybd_event(0x10, 0, win32con.KEYEVENTF_KEYUP, 0)  # Release Shift
+            self.key_sequencer.submit([
+                (VK, 0x10, True),   # Press Shift
+                (VK, 0xBF, True),   # Press /?
+                (VK, 0xBF, False),  # Release /?
+                (VK, 0x10, False),  # Release Shift
+            ])
             return True
         return False
 
     def handle_mouse_move(self, dx, dy):
-        """Handle mouse movement with maximum performance and reliability."""
+        """Queue a relative mouse movement; the input scheduler injects it on the next tick"""
         try:
             # Convert to integers and validate
             dx_int = int(dx)
@@ -346,431 +459,721 @@ class RemoteServer:
             if dx_int == 0 and dy_int == 0:
                 return
             
-            # Use direct Win32 API for maximum performance and reliability
-            try:
-                current_pos = win32api.GetCursorPos()
-                new_x = current_pos[0] + dx_int
-                new_y = current_pos[1] + dy_int
-                
-                # Get screen dimensions to ensure cursor stays within bounds
-                screen_width = win32api.GetSystemMetrics(0)
-                screen_height = win32api.GetSystemMetrics(1)
-                
-                # Clamp coordinates to screen bounds
-                new_x = max(0, min(new_x, screen_width - 1))
-                new_y = max(0, min(new_y, screen_height - 1))
-                
-                # Set cursor position directly
-                win32api.SetCursorPos((new_x, new_y))
-                
-            except Exception as win32_error:
-                # Fallback to pyautogui if Win32 API fails
-                logging.warning(f"Win32 mouse move failed, using pyautogui fallback: {win32_error}")
-                current_x, current_y = pyautogui.position()
-                pyautogui.moveTo(current_x + dx_int, current_y + dy_int, duration=0)
+            self.input_scheduler.add_motion(dx_int, dy_int, source='mouse')
                 
         except Exception as e:
             logging.error(f"Error moving mouse: {e}")
 
+    def _apply_cursor_motion(self, dx, dy):
+        """Move the cursor by a coalesced relative delta (called by the input scheduler)"""
+        sink = self.input_sink
+        try:
+            x, y = sink.get_cursor_pos()
+            # Clamp against the cached layout so moves cross onto other monitors
+            sink.move_to(*self.display_topology.clamp(x + dx, y + dy))
+        except Exception as e:
+            logging.warning(f"Cursor move failed, retrying as relative move: {e}")
+            sink.move_relative(dx, dy)
+
+    def _get_motion_rate(self):
+        """Read the motion coalescing rate from config: a number in Hz, 'display', or 0 to disable"""
+        value = self.config.get('Input', 'motion_rate_hz', fallback=str(DEFAULT_RATE_HZ)).strip().lower()
+        if value == 'display':
+            try:
+                settings = win32api.EnumDisplaySettings(None, win32con.ENUM_CURRENT_SETTINGS)
+                if settings.DisplayFrequency > 1:
+                    return settings.DisplayFrequency
+            except Exception as e:
+                logging.warning(f"Could not read display refresh rate: {e}")
+            return DEFAULT_RATE_HZ
+        try:
+            return max(0, int(float(value)))
+        except ValueError:
+            logging.warning(f"Invalid motion_rate_hz '{value}', using {DEFAULT_RATE_HZ} Hz")
+            return DEFAULT_RATE_HZ
+
     def handle_mouse_click(self, button):
         """Handle mouse click with proper button mapping"""
         try:
-            if button == 'left':
-                pyautogui.click(button='left')
-            elif button == 'right':
-                pyautogui.click(button='right')
-            elif button == 'middle':
-                pyautogui.click(button='middle')
+            # Click where the cursor is meant to be, not where the last tick left it
+            self.input_scheduler.flush()
+
+            if button in MOUSE_BUTTONS:
+                self.key_sequencer.submit([(BUTTON, button, True), (BUTTON, button, False)])
             else:
                 logging.warning(f"Unknown mouse button: {button}")
         except Exception as e:
             logging.error(f"Error handling mouse click: {e}")
 
+    def handle_mouse_button(self, button, pressed):
+        """Press or release a mouse button without clicking"""
+        self.input_scheduler.flush()
+        if button not in MOUSE_BUTTONS:
+            logging.warning(f"Unknown mouse button: {button}")
+            return
+        self.key_sequencer.submit([(BUTTON, button, pressed)])
+
+    def handle_scroll(self, direction, intensity=1):
+        """Scroll the window under the cursor"""
+        self.input_scheduler.flush()
+
+        # Reduced multiplier for smoother scrolling
+        wheel_delta = 60 * intensity  # Reduced from 120 to 60
+        self.input_sink.scroll(wheel_delta if direction == 'up' else -wheel_delta)
+
+    def handle_virtual_key(self, virtual_key, action):
+        """Inject a key by Windows virtual-key code (binary KEY events)"""
+        events = []
+        if action in (binary_protocol.ACTION_CLICK, binary_protocol.ACTION_DOWN):
+            events.append((VK, virtual_key, True))
+        if action in (binary_protocol.ACTION_CLICK, binary_protocol.ACTION_UP):
+            events.append((VK, virtual_key, False))
+        self.key_sequencer.submit(events)
+
     def handle_client(self, client, address):
-        if address in self.authenticated_clients:
-            self.authenticated_clients.remove(address)
-            # Cancel any existing timers for this client
-            if self.disconnect_timer:
-                self.disconnect_timer.cancel()
-                self.disconnect_timer = None
-            if self.warning_timer:
-                self.warning_timer.cancel()
-                self.warning_timer = None
-
-        if address not in self.authenticated_clients:
-            # Send authentication challenge
-            client.send(b'AUTH_REQUIRED')
+        """Control loop for one connection, run on its own thread"""
+        # One parser per connection; commands pipelined behind the PIN are kept
+        parser = CommandParser()
+        commands = []
 
-            try:
-                data = client.recv(1024).decode()
-                logging.info(f"Raw data received: {data}")
-                received_pin = json.loads(data)['pin']
-
-                if received_pin == self.config['Security']['current_pin']:
-                    self.authenticated_clients.add(address)
-                    client.send(b'AUTH_SUCCESS')
-                    logging.info("Authentication successful")
-                else:
-                    logging.info("Authentication failed")
-                    client.send(b'AUTH_FAILED')
+        # Input commands are tiny; don't let Nagle hold them back
+        try:
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
+        # Send authentication challenge
+        client.send(b'AUTH_REQUIRED')
+
+        try:
+            while not commands:
+                commands = parser.receive(client)
+                if commands is None:
+                    logging.info(f"Client {address} closed the connection before authenticating")
                     client.close()
                     return
-            except Exception as e:
-                logging.error(f"Authentication error: {e}")
+
+            auth = self._authenticate(address, commands.pop(0))
+            if auth:
+                client.send(b'AUTH_SUCCESS')
+            else:
+                client.send(b'AUTH_FAILED')
                 client.close()
                 return
+        except Exception as e:
+            logging.error(f"Authentication error: {e}")
+            client.close()
+            return
 
-        try:
-            logging.info(f"Starting to handle client {address}")
-            # Initialize timer state after successful authentication
-            if self.disconnect_minutes > 0:
-                # Send warning 30 seconds before disconnect
-                self.warning_timer = Timer(
-                    (self.disconnect_minutes * 60) - 30,
-                    lambda: self._send_warning(client)
-                )
-                self.warning_timer.start()
-                logging.info(f"Warning timer set for {self.disconnect_minutes} minutes - 30 seconds")
-
-                self.disconnect_timer = Timer(
-                    self.disconnect_minutes * 60,
-                    lambda: self.auto_disconnect(client)
-                )
-                self.disconnect_timer.start()
-                logging.info(f"Auto-disconnect timer started: {self.disconnect_minutes} minutes")
-            else:
-                logging.info("Auto-disconnect disabled")
+        self._serve_control(client, address, auth, parser, commands)
 
-            # Add client to set when connected
-            self.clients.add(client)
+    def _serve_control(self, client, address, auth, parser, pending):
+        """Run commands from an authenticated connection until it closes"""
+        try:
+            self._on_client_authenticated(client, address, auth)
 
             while True:
-                data = client.recv(1024).decode('utf-8').strip()
-                if not data:
-                    logging.info(f"Client {address} sent empty data, breaking connection")
-                    break
-
-                logging.info(f"Received raw data: {data}")
-
-                if ':' in data:
-                    cmd_type, *params = data.split(':')
-                else:
-                    cmd_type = data
-
-                if cmd_type == 'SET_DISCONNECT_TIMER':
-                    try:
-                        minutes = int(params[0])
-                        self.disconnect_minutes = minutes
-                        # Reset the timer with new duration
-                        if self.disconnect_timer:
-                            self.disconnect_timer.cancel()
-                        self.disconnect_timer = Timer(minutes * 60, lambda: self.auto_disconnect(client))
-                        self.disconnect_timer.start()  # Start the new timer
-                        client.send(b'OK\n')
-                        logging.info(f"Auto-disconnect timer set to {minutes} minutes")
-                    except (ValueError, IndexError) as e:
-                        logging.error(f"Invalid timer value: {e}")
-                        client.send(b'ERROR\n')
-
-                elif cmd_type == 'SHUTDOWN':
-                    logging.info("Received shutdown command from client")
-                    print("\n⚠️ Auto-disconnect timer expired. Server shutting down...")
-                    # Force immediate shutdown
-                    client.send(b'SHUTDOWN_INITIATED')
-                    client.close()
-                    os._exit(0)  # Force immediate termination
-                    return
+                for data in pending:
+                    self._process_command(client, data)
 
-                elif cmd_type == 'MOUSE_MOVE':
-                    try:
-                        x = int(params[0])
-                        y = int(params[1])
-                        # Skip tiny movements to reduce overhead
-                        if abs(x) > 0 or abs(y) > 0:
-                            self.handle_mouse_move(x, y)
-                        client.send(b'OK\n')
-                    except:
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'MOUSE_CLICK':
-                    try:
-                        button = params[0]
-                        self.handle_mouse_click(button)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Mouse click error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'MOUSE_CLICK_POS':
-                    try:
-                        # Format: "MOUSE_CLICK_POS:50.5:30.2" (percentage coordinates)
-                        percent_x = float(params[0])
-                        percent_y = float(params[1])
-                        
-                        # Convert percentage to absolute coordinates
-                        screen_width = win32api.GetSystemMetrics(0)
-                        screen_height = win32api.GetSystemMetrics(1)
-                        
-                        abs_x = int((percent_x / 100.0) * screen_width)
-                        abs_y = int((percent_y / 100.0) * screen_height)
-                        
-                        # Move mouse to position and click
-                        win32api.SetCursorPos((abs_x, abs_y))
-                        time.sleep(0.05)  # Small delay for stability
-                        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                        time.sleep(0.05)
-                        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                        
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Mouse click position error: {e}")
-                    client.send(b'OK\n')
-
-                elif cmd_type == 'KEY':
-                    try:
-                        key = params[0]
-                        if '+' in key:
-                            self.handle_key_combination(key)
-                        else:
-                            keyboard.press_and_release(key.lower())
-                        
-                        client.send(b'OK\n')
-
-                    except Exception as e:
-                        logging.error(f"Key press error: {e}")
-                        print("Error processing keyboard input")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'TYPE':
-                    try:
-                        text = params[0]
-                        logging.info(f"Attempting to type character: {repr(text)}")
-
-                        if text == '?':
-                            # Use pyautogui for question mark
-                            pyautogui.keyDown('shift')
-                            pyautogui.press('/')
-                            pyautogui.keyUp('shift')
-                        elif text == ' ':
-                            # Handle space directly
-                            keyboard.press_and_release('space')
-                        else:
-                            # Special character mapping for other characters
-                            char_map = {
-                                '!': ['shift', '1'],
-                                '@': ['shift', '2'],
-                                '#': ['shift', '3'],
-                                '$': ['shift', '4'],
-                                '%': ['shift', '5'],
-                                '^': ['shift', '6'],
-                                '&': ['shift', '7'],
-                                '*': ['shift', '8'],
-                                '(': ['shift', '9'],
-                                ')': ['shift', '0'],
-                                '_': ['shift', '-'],
-                                '+': ['shift', '='],
-                                '{': ['shift', '['],
-                                '}': ['shift', ']'],
-                                '|': ['shift', '\\'],
-                                ':': ['shift', ';'],
-                                '"': ['shift', "'"],
-                                '<': ['shift', ','],
-                                '>': ['shift', '.'],
-                                '~': ['shift', '`'],
-                            }
-
-                            if text in char_map:
-                                keys = char_map[text]
-                                keyboard.press(keys[0])
-                                keyboard.press(keys[1])
-                                time.sleep(0.1)
-                                keyboard.release(keys[1])
-                                keyboard.release(keys[0])
-                            else:
-                                keyboard.write(text)
-
-                        client.send(b'OK\n')
-
-                    except Exception as e:
-                        logging.error(f"Error typing text: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'SCROLL':
-                    try:
-                        direction = params[0]
-                        intensity = int(params[1]) if len(params) > 1 else 1
-
-                        # Reduced multiplier for smoother scrolling
-                        wheel_delta = 60 * intensity  # Reduced from 120 to 60
-
-                        # Send scroll message with intensity
-                        window = find_scroll_window()
-                        wparam = wheel_delta << 16 if direction == 'up' else (-wheel_delta) << 16
-                        cursor_pos = win32gui.GetCursorPos()
-                        lparam = cursor_pos[1] << 16 | cursor_pos[0]
-
-                        win32gui.SendMessage(window, 0x020A, wparam, lparam)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Scroll error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'MOUSE_DOWN':
-                    try:
-                        button = params[0]
-                        # Use win32api for more reliable mouse button control
-                        if button == 'left':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                        elif button == 'right':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, 0, 0, 0, 0)
-                        elif button == 'middle':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_MIDDLEDOWN, 0, 0, 0, 0)
-                        client.send(b'OK\n')
-                        logging.info(f"Mouse button {button} pressed down")
-                    except Exception as e:
-                        logging.error(f"Mouse down error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'MOUSE_UP':
-                    try:
-                        button = params[0]
-                        # Use win32api for more reliable mouse button control
-                        if button == 'left':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                        elif button == 'right':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTUP, 0, 0, 0, 0)
-                        elif button == 'middle':
-                            win32api.mouse_event(win32con.MOUSEEVENTF_MIDDLEUP, 0, 0, 0, 0)
-                        client.send(b'OK\n')
-                        logging.info(f"Mouse button {button} released")
-                    except Exception as e:
-                        logging.error(f"Mouse up error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'DISABLE_DISCONNECT_TIMER':
-                    # Client requested to disable the timer
-                    if self.disconnect_timer:
-                        self.disconnect_timer.cancel()
-                    self.disconnect_timer = None
-                    client.send(b'OK\n')  # Add missing acknowledgment
-
-                elif cmd_type.startswith('SET_DISCONNECT_TIMER:'):
-                    minutes = int(cmd_type.split(':')[1])
-                    self.disconnect_minutes = minutes
-                    # Reset existing timer if any
-                    if hasattr(self, 'disconnect_timer'):
-                        self.disconnect_timer.cancel()
-                    # Set new timer
-                    if minutes > 0:
-                        self.disconnect_timer = Timer(minutes * 60, lambda: self.auto_disconnect(client))
-                        self.disconnect_timer.start()
-                    client.send(b'OK\n')
-
-                # Add handling for screen sharing commands
-                elif cmd_type == 'screen_share':
-                    command = data.get('command')
-                    if command == 'start':
-                        self.toggle_screen_sharing(True)
-                    elif command == 'stop':
-                        self.toggle_screen_sharing(False)
-                    client.send(b'OK\n')
-
-                # Handle PIN configuration updates
-                elif cmd_type.startswith('PIN_CONFIG'):
-                    try:
-                        # Handle JSON PIN config data
-                        if '{' in data:
-                            config_data = json.loads(data)
-                            if config_data.get('command') == 'PIN_CONFIG':
-                                pin_config = config_data.get('config', {})
-                                self._update_pin_configuration(pin_config)
-                                client.send(b'PIN_CONFIG_OK\n')
-                    except Exception as e:
-                        logging.error(f"Error processing PIN config: {e}")
-                        client.send(b'PIN_CONFIG_ERROR\n')
-
-                # Handle screen share view status messages
-                elif cmd_type == "screen_view":
-                    view_status = params[0] == "start"
-                    self.screen_share_service.set_viewing_status(view_status)
-                    client.send(b'OK\n')  # Send response instead of returning
-
-                # Handle gamepad commands
-                elif cmd_type == 'GAMEPAD_BUTTON':
-                    try:
-                        button = params[0]
-                        action = params[1]
-                        self.handle_gamepad_button(button, action)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Gamepad button error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'GAMEPAD_STICK':
-                    try:
-                        stick = params[0]
-                        x = float(params[1])
-                        y = float(params[2])
-                        self.handle_gamepad_stick(stick, x, y)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Gamepad stick error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'GAMEPAD_MOTION':
-                    try:
-                        tilt_x = float(params[0])
-                        tilt_y = float(params[1])
-                        self.handle_gamepad_motion(tilt_x, tilt_y)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Gamepad motion error: {e}")
-                        client.send(b'OK\n')
-
-                elif cmd_type == 'GAMEPAD_GYRO':
-                    try:
-                        rot_x = float(params[0])
-                        rot_y = float(params[1])
-                        logging.info(f"Received gyro data: x={rot_x:.3f}, y={rot_y:.3f}")
-                        self.handle_gamepad_gyro(rot_x, rot_y)
-                        client.send(b'OK\n')
-                    except Exception as e:
-                        logging.error(f"Gamepad gyro error: {e}")
-                        client.send(b'OK\n')
-
-                # Handle gamepad mode toggle
-                elif cmd_type == 'gamepad_mode':
-                    mode = params[0] if params else 'start'
-                    self.gamepad_state.gamepad_mode = (mode == 'start')
-                    logging.info(f"Gamepad mode {'enabled' if self.gamepad_state.gamepad_mode else 'disabled'}")
-                    client.send(b'OK\n')
-
-                # Handle PING for connection health monitoring
-                elif cmd_type == 'PING':
-                    client.send(b'PONG\n')
-
-                # Handle HEARTBEAT for background stability
-                elif cmd_type == 'HEARTBEAT':
-                    client.send(b'HEARTBEAT_ACK\n')
+                pending = parser.receive(client)
+                if pending is None:
+                    logging.info(f"Client {address} closed the connection")
+                    break
 
         except Exception as e:
             logging.error(f"Error handling client {address}: {e}")
         finally:
-            # Clean up when client disconnects
-            if client in self.clients:
-                self.clients.remove(client)
+            self._on_client_disconnected(client)
             try:
                 client.close()
             except:
                 pass
 
-    def auto_disconnect(self, client):
-        """Handle auto-disconnect with proper notification"""
+    def _authenticate(self, address, data):
+        """Check the JSON sent in reply to AUTH_REQUIRED.
+
+        {"pin": "123456"} returns True; {"resume": token} returns the Session
+        being resumed. False means authentication failed.
+        """
+        control_log.debug("Raw data received: %s", data)
+        message = json.loads(data)
+
+        if 'resume' in message:
+            resumed, stale_client = self.sessions.claim_resume_token(str(message['resume']))
+            if resumed is None:
+                logging.info("Session resumption failed: unknown or expired token")
+                return False
+            if stale_client is not None:
+                # The old connection is dead but not yet noticed; this one takes over
+                try:
+                    stale_client.close()
+                except Exception:
+                    pass
+            logging.info(f"Resuming session {resumed.session_id}")
+            return resumed
+
+        received_pin = message['pin']
+
+        if received_pin == self.config['Security']['current_pin']:
+            logging.info("Authentication successful")
+            return True
+
+        logging.info("Authentication failed")
+        return False
+
+    def _on_client_authenticated(self, client, address, auth=True):
+        """Open the connection's session, which arms its disconnect warning and timeout"""
+        logging.info(f"Starting to handle client {address}")
+        if isinstance(auth, Session):
+            self._resume_session(client, address, auth)
+            return
+
+        self.sessions.open(client, address, self.disconnect_minutes)
+        if self.disconnect_minutes > 0:
+            logging.info(f"Auto-disconnect timer started: {self.disconnect_minutes} minutes")
+        else:
+            logging.info("Auto-disconnect disabled")
+
+    def _resume_session(self, client, address, resumed):
+        """Carry a parked session over to a new connection and tell the client what it got"""
+        session = self.sessions.open(client, address, self.disconnect_minutes, resumed=resumed)
+        udp_channel = self.udp_input_channel
+        if not (udp_channel and udp_channel.is_running):
+            session.capabilities.discard(CAP_UDP)
+        self.gamepad_state.gamepad_mode = session.gamepad_mode
+
+        # RESUMED replaces the CAPS exchange: everything negotiated before is in effect again
+        client.send(f"RESUMED:{','.join(sorted(session.capabilities))}\n".encode())
+        self._send_session_grants(client, session)
+
+    def _on_client_disconnected(self, client):
+        """Clean up when client disconnects"""
+        self.sessions.close(client)
+        if self.udp_input_channel:
+            self.udp_input_channel.close_session(client)
+
+    @profiler.timed('handle_client_dispatch')
+    def _process_command(self, client, data):
+        """Execute a single control command received from an authenticated client"""
+        if isinstance(data, OversizedCommand):
+            # The parser already skipped it; the connection stays usable
+            logging.warning(f"Command of {data.length or 'unknown'} bytes exceeds the size limit")
+            commands_total.labels('oversized', 'tcp').inc()
+            client.send(b'ERROR\n')
+            return
+        # Probe acks arrive without user action, so they must not hold off the idle timeout
+        if not (isinstance(data, str) and data.startswith('PROBE_ACK:')):
+            self.sessions.touch(client)
+        if not isinstance(data, str):
+            self._process_binary_command(client, *data)
+            return
+
+        input_log.debug("Received raw data: %s", data)
+
+        if data.startswith('{'):
+            # JSON commands name themselves, e.g. {"command": "PIN_CONFIG", ...}
+            try:
+                cmd_type = str(json.loads(data).get('command', ''))
+            except (ValueError, AttributeError):
+                cmd_type = ''
+            params = []
+        elif ':' in data:
+            cmd_type, *params = data.split(':')
+        else:
+            cmd_type = data
+            params = []
+
+        if self.commands.dispatch(cmd_type, client, data, params):
+            commands_total.labels(cmd_type, 'tcp').inc()
+        else:
+            commands_total.labels('unknown', 'tcp').inc()
+            logging.warning(f"Unknown command: {cmd_type}")
+
+    def _register_commands(self):
+        """Register the built-in control commands; extensions use register_command()"""
+        commands = self.commands
+        commands.register('CAPS', self._cmd_caps)
+        commands.register('SET_DISCONNECT_TIMER', self._cmd_set_disconnect_timer)
+        commands.register('SHUTDOWN', self._cmd_shutdown)
+        commands.register('MOUSE_MOVE', self._cmd_mouse_move)
+        commands.register('MOUSE_CLICK', self._cmd_mouse_click)
+        commands.register('MOUSE_CLICK_POS', self._cmd_mouse_click_pos)
+        commands.register('KEY', self._cmd_key)
+        commands.register('TYPE', self._cmd_type)
+        commands.register('TYPE_TEXT', self._cmd_type_text)
+        commands.register('SCROLL', self._cmd_scroll)
+        commands.register('MOUSE_DOWN', self._cmd_mouse_down)
+        commands.register('MOUSE_UP', self._cmd_mouse_up)
+        commands.register('DISABLE_DISCONNECT_TIMER', self._cmd_disable_disconnect_timer)
+        commands.register('screen_share', self._cmd_screen_share)
+        commands.register_prefix('PIN_CONFIG', self._cmd_pin_config)
+        commands.register('screen_view', self._cmd_screen_view)
+        commands.register('GAMEPAD_BUTTON', self._cmd_gamepad_button)
+        commands.register('GAMEPAD_STICK', self._cmd_gamepad_stick)
+        commands.register('GAMEPAD_MOTION', self._cmd_gamepad_motion)
+        commands.register('GAMEPAD_GYRO', self._cmd_gamepad_gyro)
+        commands.register('gamepad_mode', self._cmd_gamepad_mode)
+        commands.register('PING', self._cmd_ping)
+        commands.register('HEARTBEAT', self._cmd_heartbeat)
+        commands.register('PROBE_ACK', self._cmd_probe_ack)
+        commands.register('PROFILE', self._cmd_profile)
+
+    def register_command(self, name, handler):
+        """Add or replace a control command; handler(client, data, params)"""
+        self.commands.register(name, handler)
+
+    def set_command_timing(self, enabled):
+        """Turn per-command latency histograms on or off"""
+        self.commands.set_timing(enabled)
+
+    def get_command_stats(self):
+        """Per-command count and latency percentiles collected while timing is on"""
+        return self.commands.get_stats()
+
+    def get_session_stats(self):
+        """Active control sessions with their idle time and timeout deadlines"""
+        return self.sessions.get_stats()
+
+    def start_profiling(self, duration=None):
+        """Start the sampling profiler (profiler.py); False if it is already running"""
+        started = profiler.start(duration)
+        if started:
+            logging.info(f"Profiling started{f' for {duration}s' if duration else ''}")
+        return started
+
+    def stop_profiling(self):
+        """Stop the profiler and return the flamegraph file it wrote, or None"""
+        path = profiler.stop()
+        if path:
+            logging.info(f"Profile written to {path}")
+        return path
+
+    def get_link_stats(self):
+        """RTT, jitter and loss of every probed control session"""
+        return [{'session_id': stats['session_id'], 'address': stats['address'], **stats['link']}
+                for stats in self.sessions.get_stats() if CAP_PROBE in stats['capabilities']]
+
+    def get_screen_stats(self):
+        """Screen stream clients, effective FPS and capture pacing, or None without desktop services"""
+        return self.screen_share_service.get_stats() if self.screen_share_service else None
+
+    def get_mux_stats(self):
+        """Open multiplexed connections with per-stream byte counts and send windows"""
+        return self.mux_server.get_stats() if self.mux_server else []
+
+    def _cmd_caps(self, client, data, params):
+        """Negotiate optional protocol capabilities"""
+        self._negotiate_capabilities(client, params)
+
+    def _cmd_set_disconnect_timer(self, client, data, params):
+        """Restart the auto-disconnect timer with a new duration in minutes"""
         try:
-            if client in self.clients:
-                client.send(b'SERVER_SHUTDOWN')
-                client.close()
-                self.clients.remove(client)
+            minutes = int(params[0])
+            # Re-arm this session's warning and disconnect with the new duration
+            session = self.sessions.get(client)
+            if session:
+                self.sessions.set_disconnect_timer(session, minutes)
+            client.send(b'OK\n')
+            logging.info(f"Auto-disconnect timer set to {minutes} minutes")
+        except (ValueError, IndexError) as e:
+            logging.error(f"Invalid timer value: {e}")
+            client.send(b'ERROR\n')
+
+    def _cmd_shutdown(self, client, data, params):
+        """Shut the server down at the client's request"""
+        logging.info("Received shutdown command from client")
+        print("\n⚠️ Auto-disconnect timer expired. Server shutting down...")
+        # Force immediate shutdown
+        client.send(b'SHUTDOWN_INITIATED')
+        client.close()
+        os._exit(0)  # Force immediate termination
+        return
+
+    def _cmd_mouse_move(self, client, data, params):
+        """Relative mouse movement"""
+        try:
+            x = int(params[0])
+            y = int(params[1])
+            # Skip tiny movements to reduce overhead
+            if abs(x) > 0 or abs(y) > 0:
+                self.handle_mouse_move(x, y)
+            self._send_ack(client, 'MOUSE_MOVE')
+        except:
+            self._send_ack(client, 'MOUSE_MOVE')
+
+    def _cmd_mouse_click(self, client, data, params):
+        """Click a mouse button at the current position"""
+        try:
+            button = params[0]
+            self.handle_mouse_click(button)
+            client.send(b'OK\n')
+        except Exception as e:
+            logging.error(f"Mouse click error: {e}")
+            client.send(b'OK\n')
+
+    def _cmd_mouse_click_pos(self, client, data, params):
+        """Click at a position given in percent of the screen"""
+        try:
+            # Format: "MOUSE_CLICK_POS:50.5:30.2" (percentage coordinates)
+            percent_x = float(params[0])
+            percent_y = float(params[1])
+
+            # Drop into place after any queued relative motion
+            self.input_scheduler.flush()
+
+            # Convert percentage of the primary monitor to absolute coordinates
+            abs_x, abs_y = self.display_topology.percent_to_pixel(percent_x, percent_y)
+
+            # Move mouse to position and click, as one batch
+            self.key_sequencer.submit(click_events(abs_x, abs_y))
+
+            client.send(b'OK\n')
+        except Exception as e:
+            logging.error(f"Mouse click position error: {e}")
+        client.send(b'OK\n')
+
+    def _cmd_key(self, client, data, params):
+        """Press a key or a key combination such as ctrl+c"""
+        try:
+            key = params[0]
+            if '+' in key:
+                self.handle_key_combination(key)
+            else:
+                self.key_sequencer.submit(combo_events([key.lower()]))
+
+            client.send(b'OK\n')
+
+        except Exception as e:
+            logging.error(f"Key press error: {e}")
+            print("Error processing keyboard input")
+            client.send(b'OK\n')
+
+    def _cmd_type_text(self, client, data, params):
+        """Type a whole UTF-8 string (pasted when long); send text with newlines as @<len>:TYPE_TEXT:..."""
+        text = data.split(':', 1)[1] if ':' in data else ''
+        input_log.debug("Typing %d characters", len(text))
+        self.text_input.type_text(text)
+        client.send(b'OK\n')
+
+    def _cmd_type(self, client, data, params):
+        """Type a single character"""
+        try:
+            # Everything after the first ':' is the text, so "TYPE::" types a colon
+            text = data.split(':', 1)[1]
+            input_log.debug("Attempting to type character: %r", text)
+
+            sequencer = self.key_sequencer
+            if text == '?':
+                # Type question mark as shift+/
+                sequencer.submit(combo_events(['shift', '/']))
+            elif text == ' ':
+                # Handle space directly
+                sequencer.submit(combo_events(['space']))
+            else:
+                # Special character mapping for other characters
+                char_map = {
+                    '!': ['shift', '1'],
+                    '@': ['shift', '2'],
+                    '#': ['shift', '3'],
+                    '$': ['shift', '4'],
+                    '%': ['shift', '5'],
+                    '^': ['shift', '6'],
+                    '&': ['shift', '7'],
+                    '*': ['shift', '8'],
+                    '(': ['shift', '9'],
+                    ')': ['shift', '0'],
+                    '_': ['shift', '-'],
+                    '+': ['shift', '='],
+                    '{': ['shift', '['],
+                    '}': ['shift', ']'],
+                    '|': ['shift', '\\'],
+                    ':': ['shift', ';'],
+                    '"': ['shift', "'"],
+                    '<': ['shift', ','],
+                    '>': ['shift', '.'],
+                    '~': ['shift', '`'],
+                }
+
+                if text in char_map:
+                    sequencer.submit(combo_events(char_map[text]))
+                else:
+                    sequencer.submit([(TEXT, text)])
+
+            client.send(b'OK\n')
+
+        except Exception as e:
+            logging.error(f"Error typing text: {e}")
+            client.send(b'OK\n')
+
+    def _cmd_scroll(self, client, data, params):
+        """Scroll the window under the cursor"""
+        try:
+            direction = params[0]
+            intensity = int(params[1]) if len(params) > 1 else 1
+            self.handle_scroll(direction, intensity)
+            self._send_ack(client, 'SCROLL')
+        except Exception as e:
+            logging.error(f"Scroll error: {e}")
+            self._send_ack(client, 'SCROLL')
+
+    def _cmd_mouse_down(self, client, data, params):
+        """Press a mouse button (drag start)"""
+        try:
+            button = params[0]
+            self.handle_mouse_button(button, True)
+            client.send(b'OK\n')
+            input_log.debug("Mouse button %s pressed down", button)
+        except Exception as e:
+            logging.error(f"Mouse down error: {e}")
+            client.send(b'OK\n')
+
+    def _cmd_mouse_up(self, client, data, params):
+        """Release a mouse button (drag end)"""
+        try:
+            button = params[0]
+            self.handle_mouse_button(button, False)
+            client.send(b'OK\n')
+            input_log.debug("Mouse button %s released", button)
+        except Exception as e:
+            logging.error(f"Mouse up error: {e}")
+            client.send(b'OK\n')
+
+    def _cmd_disable_disconnect_timer(self, client, data, params):
+        """Client requested to disable the auto-disconnect timer"""
+        session = self.sessions.get(client)
+        if session:
+            self.sessions.set_disconnect_timer(session, 0)
+        client.send(b'OK\n')  # Add missing acknowledgment
+
+    def _cmd_screen_share(self, client, data, params):
+        """Start or stop screen sharing: screen_share:start / screen_share:stop"""
+        command = params[0] if params else ''
+        if command == 'start':
+            self.toggle_screen_sharing(True)
+        elif command == 'stop':
+            self.toggle_screen_sharing(False)
+        client.send(b'OK\n')
+
+    def _cmd_pin_config(self, client, data, params):
+        """Handle PIN configuration updates"""
+        try:
+            # Handle JSON PIN config data
+            if '{' in data:
+                config_data = json.loads(data)
+                if config_data.get('command') == 'PIN_CONFIG':
+                    pin_config = config_data.get('config', {})
+                    self._update_pin_configuration(pin_config)
+                    client.send(b'PIN_CONFIG_OK\n')
+        except Exception as e:
+            logging.error(f"Error processing PIN config: {e}")
+            client.send(b'PIN_CONFIG_ERROR\n')
+
+    def _cmd_screen_view(self, client, data, params):
+        """Handle screen share view status messages"""
+        if self.screen_share_service is None:
+            client.send(b'ERROR\n')  # Desktop services are disabled
+            return
+        view_status = bool(params) and params[0] == "start"
+        self.screen_share_service.set_viewing_status(view_status)
+        client.send(b'OK\n')  # Send response instead of returning
+
+    def _cmd_gamepad_button(self, client, data, params):
+        """Gamepad button press/release"""
+        try:
+            button = params[0]
+            action = params[1]
+            self.handle_gamepad_button(button, action)
+            client.send(b'OK\n')
+        except Exception as e:
+            logging.error(f"Gamepad button error: {e}")
+            client.send(b'OK\n')
+
+    def _cmd_gamepad_stick(self, client, data, params):
+        """Gamepad analog stick position"""
+        try:
+            stick = params[0]
+            x = float(params[1])
+            y = float(params[2])
+            self.handle_gamepad_stick(stick, x, y)
+            self._send_ack(client, 'GAMEPAD_STICK')
+        except Exception as e:
+            logging.error(f"Gamepad stick error: {e}")
+            self._send_ack(client, 'GAMEPAD_STICK')
+
+    def _cmd_gamepad_motion(self, client, data, params):
+        """Gamepad accelerometer tilt"""
+        try:
+            tilt_x = float(params[0])
+            tilt_y = float(params[1])
+            self.handle_gamepad_motion(tilt_x, tilt_y)
+            self._send_ack(client, 'GAMEPAD_MOTION')
+        except Exception as e:
+            logging.error(f"Gamepad motion error: {e}")
+            self._send_ack(client, 'GAMEPAD_MOTION')
+
+    def _cmd_gamepad_gyro(self, client, data, params):
+        """Gamepad gyroscope rotation"""
+        try:
+            rot_x = float(params[0])
+            rot_y = float(params[1])
+            gyro_log.debug("Received gyro data: x=%.3f, y=%.3f", rot_x, rot_y)
+            self.handle_gamepad_gyro(rot_x, rot_y)
+            self._send_ack(client, 'GAMEPAD_GYRO')
+        except Exception as e:
+            logging.error(f"Gamepad gyro error: {e}")
+            self._send_ack(client, 'GAMEPAD_GYRO')
+
+    def _cmd_gamepad_mode(self, client, data, params):
+        """Handle gamepad mode toggle"""
+        mode = params[0] if params else 'start'
+        self.gamepad_state.gamepad_mode = (mode == 'start')
+        session = self.sessions.get(client)
+        if session:
+            session.gamepad_mode = self.gamepad_state.gamepad_mode
+        logging.info(f"Gamepad mode {'enabled' if self.gamepad_state.gamepad_mode else 'disabled'}")
+        client.send(b'OK\n')
+
+    def _cmd_ping(self, client, data, params):
+        """Handle PING for connection health monitoring"""
+        client.send(b'PONG\n')
+
+    def _cmd_heartbeat(self, client, data, params):
+        """Handle HEARTBEAT for background stability"""
+        client.send(b'HEARTBEAT_ACK\n')
+
+    def _cmd_profile(self, client, data, params):
+        """PROFILE:start[:seconds] / PROFILE:stop, accepted from this machine only"""
+        session = self.sessions.get(client)
+        if session is None or not _is_local_address(session.address):
+            logging.warning(f"Rejected PROFILE from {session.address if session else 'unknown client'}")
+            client.send(b'ERROR\n')
+            return
+        action = params[0].lower() if params else ''
+        if action == 'start':
+            try:
+                duration = float(params[1]) if len(params) > 1 else None
+            except ValueError:
+                duration = None
+            started = self.start_profiling(duration)
+            client.send(b'PROFILE_STARTED\n' if started else b'PROFILE_RUNNING\n')
+        elif action == 'stop':
+            path = self.stop_profiling()
+            client.send(f"PROFILE_SAVED:{path}\n".encode() if path else b'PROFILE_NOT_RUNNING\n')
+        else:
+            client.send(b'ERROR\n')
+
+    def _cmd_probe_ack(self, client, data, params):
+        """Handle PROBE_ACK:<seq>:<timestamp_us>, the echo of a PROBE; never acknowledged"""
+        session = self.sessions.get(client)
+        if session is None or len(params) != 2:
+            return
+        try:
+            rtt = session.link.on_ack(int(params[0]), int(params[1]))
+        except ValueError:
+            logging.warning(f"Malformed PROBE_ACK: {data}")
+            return
+        if rtt is not None:
+            control_log.debug("Session %d RTT %.1f ms", session.session_id, rtt * 1000)
+
+    def _process_binary_command(self, client, opcode, values):
+        """Execute a binary input event (see binary_protocol.py)"""
+        if CAP_BINARY not in self._capabilities(client):
+            logging.warning("Ignoring binary frame from a client that did not negotiate CAPS:BINARY")
+            return
+
+        try:
+            self.commands.dispatch_opcode(opcode, values)
+            commands_total.labels(binary_protocol.OPCODE_NAMES[opcode], 'binary').inc()
+        except Exception as e:
+            logging.error(f"Binary {binary_protocol.OPCODE_NAMES[opcode]} error: {e}")
+        self._send_ack(client, binary_protocol.OPCODE_NAMES[opcode])
+
+    def _register_binary_commands(self):
+        """Map binary opcodes to the same handlers the text commands use"""
+        def mouse_button(button, action):
+            name = binary_protocol.MOUSE_BUTTONS[button]
+            if action == binary_protocol.ACTION_CLICK:
+                self.handle_mouse_click(name)
+            else:
+                self.handle_mouse_button(name, action == binary_protocol.ACTION_DOWN)
+
+        def gamepad_button(button, action):
+            action_name = 'press' if action == binary_protocol.ACTION_DOWN else 'release'
+            self.handle_gamepad_button(binary_protocol.GAMEPAD_BUTTONS[button], action_name)
+
+        handlers = {
+            binary_protocol.OP_MOUSE_MOVE: self.handle_mouse_move,
+            binary_protocol.OP_SCROLL: lambda direction, intensity: self.handle_scroll(
+                'up' if direction > 0 else 'down', intensity),
+            binary_protocol.OP_MOUSE_BUTTON: mouse_button,
+            binary_protocol.OP_GAMEPAD_STICK: lambda stick, x, y: self.handle_gamepad_stick(
+                binary_protocol.STICKS[stick], x, y),
+            binary_protocol.OP_GAMEPAD_GYRO: self.handle_gamepad_gyro,
+            binary_protocol.OP_GAMEPAD_MOTION: self.handle_gamepad_motion,
+            binary_protocol.OP_GAMEPAD_BUTTON: gamepad_button,
+            binary_protocol.OP_KEY: self.handle_virtual_key,
+        }
+        for opcode, handler in handlers.items():
+            # Binary stats are kept apart from the text form of the same command
+            self.commands.register_opcode(opcode, 'bin:' + binary_protocol.OPCODE_NAMES[opcode], handler)
+
+    def _negotiate_capabilities(self, client, params):
+        """Enable the requested capabilities the server supports and echo them back"""
+        requested = {cap.strip().upper() for cap in ','.join(params).split(',') if cap.strip()}
+        accepted = requested & SERVER_CAPABILITIES
+        udp_channel = self.udp_input_channel
+        if not (udp_channel and udp_channel.is_running):
+            accepted.discard(CAP_UDP)
+        session = self.sessions.get(client)
+        if session:
+            session.capabilities = accepted
+        logging.info(f"Client capabilities negotiated: {sorted(accepted)}")
+        client.send(f"CAPS:{','.join(sorted(accepted))}\n".encode())
+        if session:
+            self._send_session_grants(client, session)
+
+    def _send_session_grants(self, client, session):
+        """Issue what the session's capabilities entitle it to: UDP session, resumption token"""
+        udp_channel = self.udp_input_channel
+        if CAP_UDP in session.capabilities:
+            udp_session = udp_channel.open_session(client)
+            client.send(f"UDP_SESSION:{udp_channel.port}:{udp_session.session_id}:{udp_session.key.hex()}\n".encode())
+        elif udp_channel:
+            udp_channel.close_session(client)
+
+        if CAP_RESUME in session.capabilities:
+            token = self.sessions.issue_resume_token(session)
+            client.send(f"RESUME_TOKEN:{token}:{self.sessions.resume_ttl}\n".encode())
+
+        if CAP_PROBE in session.capabilities:
+            self.sessions.start_probing(session)
+        else:
+            self.sessions.stop_probing(session)
+
+    def _process_udp_event(self, opcode, values):
+        """Apply a streaming input event received on the UDP channel (never acknowledged)"""
+        self.commands.dispatch_opcode(opcode, values)
+        commands_total.labels(binary_protocol.OPCODE_NAMES[opcode], 'udp').inc()
+
+    def _capabilities(self, client):
+        session = self.sessions.get(client)
+        return session.capabilities if session else ()
+
+    def _send_ack(self, client, cmd_type):
+        """Acknowledge a command unless the client opted out of acks for streaming input"""
+        if cmd_type in STREAMING_COMMANDS and CAP_NO_ACK_STREAM in self._capabilities(client):
+            return
+        client.send(b'OK\n')
+
+    def auto_disconnect(self, session):
+        """Disconnect a session whose auto-disconnect or idle timeout expired"""
+        logging.info(f"Session {session.session_id} timed out, disconnecting")
+        self.sessions.close(session.client, resumable=False)
+        try:
+            # Runs on the session wheel: a client that stopped reading is just closed
+            session.send_nowait(b'SERVER_SHUTDOWN')
+            session.client.close()
         except:
             pass
 
@@ -778,23 +1181,32 @@ class RemoteServer:
         """Get the current PIN"""
         return self.config['Security']['current_pin']
 
-    def _send_warning(self, client):
+    def _send_warning(self, session):
         """Send warning message 30 seconds before disconnect"""
         try:
-            logging.info("Sending disconnect warning to client")
-            client.send(b'DISCONNECT_WARNING:30')
+            logging.info(f"Sending disconnect warning to session {session.session_id}")
+            if not session.send_nowait(f'DISCONNECT_WARNING:{WARNING_LEAD}'.encode()):
+                logging.warning(f"Session {session.session_id} is not reading, warning skipped")
         except Exception as e:
             logging.error(f"Error sending warning: {e}")
 
+    def _send_probe(self, session):
+        """Send the next RTT probe; the client echoes it as PROBE_ACK"""
+        try:
+            # Skipped while the client isn't reading; the probe then counts as lost
+            session.send_nowait(session.link.next_probe())
+        except Exception as e:
+            logging.error(f"Error sending probe: {e}")
+
     def notify_clients_shutdown(self):
         """Notify all clients before shutting down"""
-        for client in self.clients.copy():  # Use copy to avoid modification during iteration
+        for client in self.sessions.clients():
+            self.sessions.close(client, resumable=False)
             try:
                 client.send(b'SERVER_SHUTDOWN')
                 client.close()
             except:
                 pass
-        self.clients.clear()
 
     def quit(self):
         """Clean shutdown of server"""
@@ -806,6 +1218,8 @@ class RemoteServer:
             pass
 
     def toggle_screen_sharing(self, active=True):
+        if not self.screen_share_service:
+            return
         if active and not self.screen_sharing_active:
             self.screen_share_service.start()
             self.screen_sharing_active = True
@@ -814,14 +1228,34 @@ class RemoteServer:
             self.screen_sharing_active = False
 
     def stop(self):
-        # Stop file transfer service
-        self.file_transfer_service.stop()
+        # Stop input scheduler (flushes any pending motion)
+        self.input_scheduler.stop()
+
+        # Stop timer wheels (drops paced key steps and session timeouts still pending)
+        self.timer_wheel.stop()
+        self.session_wheel.stop()
+
+        # Stop UDP input channel
+        if self.udp_input_channel:
+            self.udp_input_channel.stop()
+
+        # Stop multiplexed transport
+        if self.mux_server:
+            self.mux_server.stop()
 
-        # Stop window thumbnails service
-        self.window_thumbnails_service.stop()
+        # Stop metrics endpoint
+        if self.metrics_server:
+            self.metrics_server.stop()
 
-        # Stop clipboard service
-        self.clipboard_service.stop()
+        if self.services_enabled:
+            # Stop file transfer service
+            self.file_transfer_service.stop()
+
+            # Stop window thumbnails service
+            self.window_thumbnails_service.stop()
+
+            # Stop clipboard service
+            self.clipboard_service.stop()
         
         # Stop WebSocket server
         self.stop_websocket_server()
@@ -855,6 +1289,9 @@ class RemoteServer:
                 config.write(f)
             
             logging.info(f"Updated PIN configuration: use_random={use_random}, custom_pin={'set' if custom_pin else 'not set'}")
+
+            # Sessions authenticated under the old PIN settings must not come back without it
+            self.sessions.revoke_resume_tokens()
             
         except Exception as e:
             logging.error(f"Error updating PIN configuration: {e}")
@@ -869,8 +1306,8 @@ class RemoteServer:
                 # Map gamepad button to keyboard key
                 if button in GAMEPAD_BUTTON_MAP:
                     key = GAMEPAD_BUTTON_MAP[button]
-                    keyboard.press(key)
-                    logging.info(f"Gamepad button {button} pressed -> {key}")
+                    self.key_sequencer.submit([(KEY, key, True)])
+                    input_log.debug("Gamepad button %s pressed -> %s", button, key)
                     
             elif action == 'release':
                 self.gamepad_state.pressed_buttons.discard(button)
@@ -878,8 +1315,8 @@ class RemoteServer:
                 # Release mapped key
                 if button in GAMEPAD_BUTTON_MAP:
                     key = GAMEPAD_BUTTON_MAP[button]
-                    keyboard.release(key)
-                    logging.info(f"Gamepad button {button} released -> {key}")
+                    self.key_sequencer.submit([(KEY, key, False)])
+                    input_log.debug("Gamepad button %s released -> %s", button, key)
                     
         except Exception as e:
             logging.error(f"Error handling gamepad button {button}: {e}")
@@ -909,34 +1346,30 @@ class RemoteServer:
             # Dead zone
             if abs(x) < 0.1 and abs(y) < 0.1:
                 # Release all movement keys
-                for key in ['w', 'a', 's', 'd']:
-                    keyboard.release(key)
+                self.key_sequencer.submit([(KEY, key, False) for key in ['w', 'a', 's', 'd']])
                 return
             
-            # Press/release keys based on stick direction
+            # Press/release keys based on stick direction, injected as one batch
             threshold = 0.3
+            events = []
             
             # Forward/backward (Y axis)
             if y < -threshold:  # Up on stick = forward
-                keyboard.press('w')
-                keyboard.release('s')
+                events += [(KEY, 'w', True), (KEY, 's', False)]
             elif y > threshold:  # Down on stick = backward
-                keyboard.press('s')
-                keyboard.release('w')
+                events += [(KEY, 's', True), (KEY, 'w', False)]
             else:
-                keyboard.release('w')
-                keyboard.release('s')
+                events += [(KEY, 'w', False), (KEY, 's', False)]
             
             # Left/right (X axis)
             if x < -threshold:  # Left on stick = strafe left
-                keyboard.press('a')
-                keyboard.release('d')
+                events += [(KEY, 'a', True), (KEY, 'd', False)]
             elif x > threshold:  # Right on stick = strafe right
-                keyboard.press('d')
-                keyboard.release('a')
+                events += [(KEY, 'd', True), (KEY, 'a', False)]
             else:
-                keyboard.release('a')
-                keyboard.release('d')
+                events += [(KEY, 'a', False), (KEY, 'd', False)]
+
+            self.key_sequencer.submit(events)
                 
         except Exception as e:
             logging.error(f"Error in movement stick handling: {e}")
@@ -952,23 +1385,11 @@ class RemoteServer:
             if abs(x) < 0.1 and abs(y) < 0.1:
                 return
             
-            # Calculate mouse movement with sensitivity and time delta
-            mouse_dx = int(x * self.gamepad_state.mouse_sensitivity * dt)
-            mouse_dy = int(y * self.gamepad_state.mouse_sensitivity * dt)
-            
-            if mouse_dx != 0 or mouse_dy != 0:
-                # Use relative mouse movement
-                current_pos = win32api.GetCursorPos()
-                new_x = current_pos[0] + mouse_dx
-                new_y = current_pos[1] + mouse_dy
-                
-                # Keep within screen bounds
-                screen_width = win32api.GetSystemMetrics(0)
-                screen_height = win32api.GetSystemMetrics(1)
-                new_x = max(0, min(new_x, screen_width - 1))
-                new_y = max(0, min(new_y, screen_height - 1))
-                
-                win32api.SetCursorPos((new_x, new_y))
+            # Calculate mouse movement with sensitivity and time delta;
+            # sub-pixel amounts accumulate in the input scheduler
+            mouse_dx = x * self.gamepad_state.mouse_sensitivity * dt
+            mouse_dy = y * self.gamepad_state.mouse_sensitivity * dt
+            self.input_scheduler.add_motion(mouse_dx, mouse_dy, source='gamepad_stick')
                 
         except Exception as e:
             logging.error(f"Error in camera stick handling: {e}")
@@ -983,17 +1404,11 @@ class RemoteServer:
             motion_sensitivity = 100
             
             if abs(tilt_x) > 0.1 or abs(tilt_y) > 0.1:
-                current_pos = win32api.GetCursorPos()
-                new_x = current_pos[0] + int(tilt_x * motion_sensitivity)
-                new_y = current_pos[1] + int(tilt_y * motion_sensitivity)
-                
-                # Keep within screen bounds
-                screen_width = win32api.GetSystemMetrics(0)
-                screen_height = win32api.GetSystemMetrics(1)
-                new_x = max(0, min(new_x, screen_width - 1))
-                new_y = max(0, min(new_y, screen_height - 1))
-                
-                win32api.SetCursorPos((new_x, new_y))
+                self.input_scheduler.add_motion(
+                    tilt_x * motion_sensitivity,
+                    tilt_y * motion_sensitivity,
+                    source='gamepad_motion'
+                )
                 
         except Exception as e:
             logging.error(f"Error handling gamepad motion: {e}")
@@ -1008,50 +1423,54 @@ class RemoteServer:
             
             # Slightly higher dead zone to reduce jitter
             if abs(rot_x) > 0.03 or abs(rot_y) > 0.03:
-                current_pos = win32api.GetCursorPos()
-                new_x = current_pos[0] + int(rot_y * gyro_sensitivity)  # Pitch -> X movement
-                new_y = current_pos[1] + int(rot_x * gyro_sensitivity)  # Yaw -> Y movement
-                
-                # Keep within screen bounds
-                screen_width = win32api.GetSystemMetrics(0)
-                screen_height = win32api.GetSystemMetrics(1)
-                new_x = max(0, min(new_x, screen_width - 1))
-                new_y = max(0, min(new_y, screen_height - 1))
-                
-                logging.info(f"Gyro movement: ({rot_x:.3f}, {rot_y:.3f}) -> cursor ({current_pos[0]}->{new_x}, {current_pos[1]}->{new_y})")
-                win32api.SetCursorPos((new_x, new_y))
+                dx = rot_y * gyro_sensitivity  # Pitch -> X movement
+                dy = rot_x * gyro_sensitivity  # Yaw -> Y movement
+                gyro_log.debug("Gyro movement: (%.3f, %.3f) -> delta (%.1f, %.1f)", rot_x, rot_y, dx, dy)
+                self.input_scheduler.add_motion(dx, dy, source='gamepad_gyro')
             else:
-                logging.debug(f"Gyro values below dead zone: x={rot_x:.3f}, y={rot_y:.3f}")
+                gyro_log.debug("Gyro values below dead zone: x=%.3f, y=%.3f", rot_x, rot_y)
                 
         except Exception as e:
             logging.error(f"Error handling gamepad gyro: {e}")
 
     async def handle_websocket_message(self, websocket, path):
         """Handle WebSocket messages for keyboard and text input"""
+        import websockets
+
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
-                    msg_type = data.get('type')
-                    
-                    if msg_type == 'text':
-                        text = data.get('text', '')
-                        logging.info(f"Typing text: {text}")
-                        pyautogui.write(text)
-                        logging.info(f"Text typed: {text}")
-                            
-                    elif msg_type == 'key':
-                        key = data.get('key')
-                        logging.info(f"Pressing key: {key}")
-                        pyautogui.press(key)
-                        logging.info(f"Key pressed: {key}")
-                        
+                    self._process_websocket_message(json.loads(message))
                 except Exception as e:
                     logging.error(f"Error processing WebSocket message: {e}")
                     
         except websockets.exceptions.ConnectionClosed:
             logging.info("WebSocket client disconnected")
 
+    def _process_websocket_message(self, data):
+        """Apply one decoded message from the port-8001 keyboard WebSocket"""
+        msg_type = data.get('type')
+
+        if msg_type == 'text':
+            text = data.get('text', '')
+            input_log.debug("Typing text: %s", text)
+            self.text_input.type_text(text)
+
+        elif msg_type == 'type_text':
+            # Bulk text (pastes, paragraphs): one Unicode batch
+            text = data.get('text', '')
+            input_log.debug("Typing %d characters", len(text))
+            self.text_input.type_text(text)
+
+        elif msg_type == 'key':
+            key = data.get('key')
+            if not key:
+                return
+            # Clients send pyautogui key names ('pageup', 'capslock', ...)
+            key = legacy_key_name(key)
+            input_log.debug("Pressing key: %s", key)
+            self.key_sequencer.submit(combo_events([key]))
+
     def start_websocket_server(self):
         """Start WebSocket server in a separate thread"""
         if self.websocket_thread and self.websocket_thread.is_alive():
@@ -1059,6 +1478,8 @@ class RemoteServer:
             
         def run_websocket_server():
             try:
+                import websockets
+
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
                 
@@ -1169,6 +1590,9 @@ def get_pin_configuration():
             print(f"║" + " "*4 + f"Error: {str(e)[:35]}" + " "*(39-len(str(e)[:35])) + "║")
 
 if __name__ == '__main__':
+    # Physical pixels everywhere (see display_topology); before anything imports pyautogui
+    enable_dpi_awareness()
+
     # Clear console
     os.system('cls' if os.name == 'nt' else 'clear')
 
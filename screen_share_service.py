@@ -6,24 +6,52 @@ import numpy as np
 from PIL import ImageGrab, Image, ImageDraw
 import win32gui
 import win32con
+from display_topology import DisplayTopology
+from log_utils import get_logger
+import metrics
+import profiler
+from metrics import peer_label
+from tile_delta import TileDeltaEncoder, KEYFRAME, DELTA_CONTENT_TYPE
+from frame_pacer import FramePacer, frame_signature, IDLE_FPS, IDLE_AFTER
+from stream_sender import StreamSender, multipart_part
+from stream_rate import (RateController, StreamVariant, quality_ladder, MIN_QUALITY, MIN_SCALE, MIN_FPS,
+                         LEVELS)
+
+logger = get_logger('screen')
+
+frames_encoded = metrics.counter('anycommand_screen_frames_encoded_total', 'Screen frames captured and JPEG-encoded')
+frame_bytes = metrics.histogram('anycommand_screen_frame_bytes', 'Encoded JPEG frame size',
+                                buckets=metrics.SIZE_BUCKETS)
+encode_seconds = metrics.histogram('anycommand_screen_encode_seconds', 'Grab, resize and JPEG encode time per frame')
+capture_failures = metrics.counter('anycommand_screen_capture_errors_total', 'Failed screen captures')
+tile_frames = metrics.counter('anycommand_screen_tile_frames_total', 'Tile stream frames by kind (key, delta)',
+                              ('kind',))
+frames_unchanged = metrics.counter('anycommand_screen_frames_unchanged_total',
+                                   'Grabbed frames skipped because nothing changed')
 
 class ScreenShareService:
-    def __init__(self, port=8081):
+    def __init__(self, port=8081, display_topology=None, adaptive_fps=True, idle_fps=IDLE_FPS,
+                 idle_after=IDLE_AFTER, quality=75, fps=20, scale=0.9, min_quality=MIN_QUALITY,
+                 min_scale=MIN_SCALE, min_fps=MIN_FPS, quality_levels=LEVELS, link_for_host=None):
         self.port = port
+        # callable(ip) -> LinkStats of that device's probed control connection, or None
+        self.link_for_host = link_for_host
+        # Shared with RemoteServer so the layout is cached once per process
+        self.display_topology = display_topology or DisplayTopology()
         self.is_running = False
         self.server_socket = None
         self.clients = []
         self.stream_clients = []  # Separate list for stream clients
+        self.tile_clients = set()  # Stream clients that asked for /tiles (keyframes + tile deltas)
         self.lock = threading.Lock()
-        self.quality = 75     # Slightly increase JPEG quality from 70 to 75
-        self.fps = 20         # Increase FPS from 15 to 20 for better responsiveness
-        self.scale = 0.9      # Increase scale from 0.85 to 0.9 for better quality
+        # Best settings; a client on a congested link is stepped down towards the min_* bounds
+        self.quality = quality  # Slightly increase JPEG quality from 70 to 75
+        self.fps = fps          # Increase FPS from 15 to 20 for better responsiveness
+        self.scale = scale      # Increase scale from 0.85 to 0.9 for better quality
         self.show_cursor = True
         self.is_viewing = False  # Track if screen is being viewed
         
         # Connection health monitoring
-        self.client_health = {}  # Track client connection health
-        self.max_connection_errors = 3
         self.connection_check_interval = 5.0  # seconds
         
         # Performance optimization
@@ -38,6 +66,24 @@ class ScreenShareService:
         # Resource management
         self.max_clients = 3  # Limit concurrent clients
         self.frame_buffer_size = 2  # Limit frame buffer to reduce memory usage
+
+        # Per-client quality levels (stream_rate.py); one StreamVariant per (tiles, level) in use
+        self.ladder = quality_ladder(quality, min(min_quality, quality), scale, min(min_scale, scale),
+                                     fps, min(min_fps, fps), quality_levels)
+        self.variants = {}
+
+        # Full rate while the screen changes, dropping toward idle_fps while it is static
+        self.pacer = FramePacer(self.fps, idle_fps=idle_fps, idle_after=idle_after, adaptive=adaptive_fps)
+
+        # Stream socket -> StreamSender (latest-frame mailbox + sender thread, see stream_sender.py)
+        self.senders = {}
+        metrics.gauge('anycommand_screen_stream_clients', 'Connected screen stream clients',
+                      function=lambda: len(self.stream_clients))
+        metrics.gauge('anycommand_screen_effective_fps', 'Frames per second sent to stream clients',
+                      function=self.pacer.effective_fps)
+        metrics.gauge('anycommand_screen_client_level', 'Quality level of each stream client (0 = best)',
+                      ('client',), function=lambda: {sender.peer: sender.level
+                                                      for sender in list(self.senders.values())})
     
     def start(self):
         if self.is_running:
@@ -58,8 +104,8 @@ class ScreenShareService:
         self.health_thread.daemon = True
         self.health_thread.start()
         
-        print(f"Screen sharing server started on port {self.port}")
-        print("Screen capture thread started (waiting for clients)")
+        logger.info(f"Screen sharing server started on port {self.port}")
+        logger.info("Screen capture thread started (waiting for clients)")
     
     def set_viewing_status(self, is_viewing):
         """Set whether client is currently viewing the screen"""
@@ -70,9 +116,10 @@ class ScreenShareService:
             # Reset error counters when starting
             self.capture_errors = 0
             self.last_successful_frame = time.time()
-            print("Screen viewing enabled")
+            self.pacer.force()
+            logger.info("Screen viewing enabled")
         elif not is_viewing and old_status:
-            print("Screen viewing disabled")
+            logger.info("Screen viewing disabled")
     
     def stop(self):
         self.is_running = False
@@ -89,6 +136,8 @@ class ScreenShareService:
                     client.close()
                 except:
                     pass
+            for sender in self.senders.values():
+                sender.close()
             for client in self.stream_clients:
                 try:
                     client.close()
@@ -96,45 +145,24 @@ class ScreenShareService:
                     pass
             self.clients = []
             self.stream_clients = []
-            self.client_health = {}
+            self.tile_clients = set()
+            self.senders = {}
     
     def _monitor_connection_health(self):
-        """Monitor client connection health and clean up dead connections"""
+        """Clean up stream clients whose sender thread stopped (send error or timeout)"""
         while self.is_running:
             try:
                 time.sleep(self.connection_check_interval)
                 
                 with self.lock:
-                    # Check stream clients
-                    clients_to_remove = []
-                    for client in self.stream_clients:
-                        client_id = id(client)
-                        
-                        # Track connection errors
-                        if client_id not in self.client_health:
-                            self.client_health[client_id] = {'errors': 0, 'last_success': time.time()}
-                        
-                        # Test connection with a small keepalive
-                        try:
-                            # Send a small test frame to check connection
-                            test_data = b'--ping\r\n\r\n'
-                            client.send(test_data)
-                            self.client_health[client_id]['last_success'] = time.time()
-                            self.client_health[client_id]['errors'] = 0
-                        except:
-                            self.client_health[client_id]['errors'] += 1
-                            
-                            # Remove client if too many errors
-                            if self.client_health[client_id]['errors'] >= self.max_connection_errors:
-                                clients_to_remove.append(client)
-                                print(f"Removing unhealthy client after {self.client_health[client_id]['errors']} errors")
-                    
-                    # Clean up unhealthy clients
-                    for client in clients_to_remove:
+                    # Senders write to their own socket; the lock only guards the client lists
+                    dead = [client for client, sender in self.senders.items() if sender.done.is_set()]
+                    for client in dead:
+                        logger.error(f"Removing stream client after send failure: {self.senders[client].error}")
                         self._remove_client(client)
                         
             except Exception as e:
-                print(f"Error in connection health monitor: {e}")
+                logger.error(f"Error in connection health monitor: {e}")
     
     def _remove_client(self, client):
         """Safely remove a client and clean up resources"""
@@ -144,9 +172,15 @@ class ScreenShareService:
             if client in self.clients:
                 self.clients.remove(client)
             
-            client_id = id(client)
-            if client_id in self.client_health:
-                del self.client_health[client_id]
+            sender = self.senders.pop(client, None)
+            if sender:
+                sender.close()
+            self.tile_clients.discard(client)
+            
+            # If we have no more stream clients, reset error counters
+            if sender and not self.stream_clients:
+                self.capture_errors = 0
+                logger.info("No stream clients remaining, resetting error counters")
             
             client.close()
         except:
@@ -163,11 +197,11 @@ class ScreenShareService:
             while self.is_running:
                 try:
                     client, addr = self.server_socket.accept()
-                    print(f"New screen share client connected from {addr}")
+                    logger.info(f"New screen share client connected from {addr}")
                     
                     with self.lock:
                         if len(self.stream_clients) >= self.max_clients:
-                            print(f"Maximum clients ({self.max_clients}) reached, rejecting new connection")
+                            logger.warning(f"Maximum clients ({self.max_clients}) reached, rejecting new connection")
                             client.close()
                             return
                         self.clients.append(client)
@@ -180,10 +214,10 @@ class ScreenShareService:
                     continue  # Continue the loop on timeout
                 except Exception as e:
                     if self.is_running:  # Only log if not shutting down
-                        print(f"Error accepting client: {e}")
+                        logger.error(f"Error accepting client: {e}")
                     break
         except Exception as e:
-            print(f"Error starting screen share server: {e}")
+            logger.error(f"Error starting screen share server: {e}")
     
     def _handle_client(self, client):
         try:
@@ -192,19 +226,22 @@ class ScreenShareService:
             
             # Read the HTTP request
             request = client.recv(1024).decode('utf-8')
-            print(f"Received request: {request[:200]}...")  # Log first 200 chars
+            logger.debug("Received request: %.200s...", request)
             
             # Check if this is a request for the stream or the HTML page
-            if '/stream' in request:
-                print("Stream request detected, adding to stream clients")
+            if '/stream' in request or '/tiles' in request:
+                logger.debug("Stream request detected, adding to stream clients")
                 # Add to stream clients
                 with self.lock:
                     if len(self.stream_clients) >= self.max_clients:
-                        print(f"Maximum clients ({self.max_clients}) reached, rejecting new connection")
+                        logger.warning(f"Maximum clients ({self.max_clients}) reached, rejecting new connection")
                         client.close()
                         return
                     self.stream_clients.append(client)
-                    print(f"Added stream client. Total stream clients: {len(self.stream_clients)}")
+                    tiles = '/tiles' in request.split('\r\n', 1)[0]
+                    if tiles:
+                        self.tile_clients.add(client)
+                    logger.info(f"Added stream client. Total stream clients: {len(self.stream_clients)}")
                 
                 # Send MJPEG stream header with better caching control
                 headers = [
@@ -220,26 +257,31 @@ class ScreenShareService:
                 for header in headers:
                     client.send(header)
                 
-                print("Stream headers sent, keeping connection alive")
+                # Frames and keepalive pings go out on this client's own sender thread from here on
+                peer = peer_label(client)
+                rate = None
+                if len(self.ladder) > 1:
+                    link = (lambda: self.link_for_host(peer)) if self.link_for_host else None
+                    rate = RateController(self.ladder, link=link)
+                sender = StreamSender(client, peer, tiles=tiles, on_resync=self._request_keyframe, rate=rate)
+                with self.lock:
+                    if client not in self.stream_clients:
+                        return  # Removed (or service stopped) while the headers were sent
+                    self.senders[client] = sender
+                sender.start()
+                if tiles:
+                    self._request_keyframe()
+                else:
+                    self.pacer.force()  # A first frame even if the screen is static
+                
+                logger.debug("Stream headers sent, keeping connection alive")
                 # Keep connection alive for streaming - don't exit on viewing status change
-                while self.is_running:
-                    try:
-                        # Send a keepalive ping every 5 seconds to prevent timeout
-                        time.sleep(5.0)
-                        
-                        # Check if client is still connected
-                        try:
-                            # Send a small ping to test connection
-                            client.send(b'--ping\r\n\r\n')
-                        except Exception as ping_error:
-                            print(f"Client connection lost: {ping_error}")
-                            break
-                            
-                    except Exception as loop_error:
-                        print(f"Error in stream loop: {loop_error}")
-                        break
+                while self.is_running and not sender.done.wait(1.0):
+                    pass
+                if sender.error:
+                    logger.info(f"Client connection lost: {sender.error}")
             else:
-                print("HTML page request detected")
+                logger.debug("HTML page request detected")
                 # Send HTML page
                 html_content = self._get_html_page()
                 response = f'HTTP/1.1 200 OK\r\n'
@@ -252,11 +294,11 @@ class ScreenShareService:
                 response += html_content
                 
                 client.send(response.encode('utf-8'))
-                print("HTML page sent and connection closed")
+                logger.debug("HTML page sent and connection closed")
                 client.close()
                 
         except Exception as e:
-            print(f"Error handling client: {e}")
+            logger.error(f"Error handling client: {e}")
         finally:
             with self.lock:
                 self._remove_client(client)
@@ -264,12 +306,12 @@ class ScreenShareService:
     def _capture_screen(self):
         """Capture screen and send to clients with improved reliability"""
         last_capture_time = 0
-        frame_interval = 1.0 / self.fps  # Time between frames
         consecutive_errors = 0
         last_successful_screenshot = None
         error_recovery_delay = 1.0
         
-        print(f"Starting screen capture at {self.fps} FPS with {self.quality}% quality")
+        logger.info(f"Starting screen capture at {self.fps} FPS with {self.quality}% quality"
+                    f"{f' (adaptive, idle {self.pacer.idle_fps} FPS)' if self.pacer.adaptive else ''}")
         
         while self.is_running:
             try:
@@ -284,14 +326,18 @@ class ScreenShareService:
                 
                 current_time = time.time()
                 elapsed = current_time - last_capture_time
+                frame_interval = self.pacer.interval  # Time between frames
+                falling_behind = (current_time - self.last_successful_frame) > self.frame_skip_threshold
                 
-                # Adaptive frame rate - skip frames if we're falling behind
-                if elapsed >= frame_interval or (current_time - self.last_successful_frame) > self.frame_skip_threshold:
+                # Adaptive frame rate - skip frames if we're falling behind (not while idling)
+                if elapsed >= frame_interval or (falling_behind and not self.pacer.idle):
                     last_capture_time = current_time
                     
                     # Capture screen with improved error handling
                     try:
-                        screenshot = ImageGrab.grab()
+                        encode_start = time.perf_counter()
+                        with profiler.section('grab'):
+                            screenshot = ImageGrab.grab()
                         if screenshot is None:
                             raise Exception("Failed to capture screen - got None")
                         
@@ -299,38 +345,33 @@ class ScreenShareService:
                         if screenshot.size[0] == 0 or screenshot.size[1] == 0:
                             raise Exception("Screenshot has zero dimensions")
                         
-                        # Check if screenshot is completely black (common issue)
-                        if self._is_image_black(screenshot):
-                            if last_successful_screenshot is not None:
-                                print("Detected black screen, using last successful screenshot")
-                                screenshot = last_successful_screenshot
-                            else:
-                                raise Exception("Screenshot is black and no fallback available")
-                        
-                        # Resize image if needed
-                        if self.scale != 1.0:
-                            new_size = (int(screenshot.width * self.scale), 
-                                       int(screenshot.height * self.scale))
-                            screenshot = screenshot.resize(new_size, Image.LANCZOS)
-                        
-                        # Add cursor if enabled
-                        if self.show_cursor:
-                            self._add_cursor_to_image(screenshot)
-                        
-                        # Convert to JPEG with optimization
-                        buffer = io.BytesIO()
-                        screenshot.save(buffer, format='JPEG', quality=self.quality, 
-                                       optimize=True, progressive=True)
-                        jpeg_bytes = buffer.getvalue()
-                        
-                        if len(jpeg_bytes) == 0:
-                            raise Exception("Empty JPEG data")
-                        
-                        # Store successful screenshot for fallback
-                        last_successful_screenshot = screenshot.copy()
+                        # Nothing new to encode if neither the screen nor the cursor moved
+                        with profiler.section('frame_signature'):
+                            signature = frame_signature(screenshot, self._cursor_position())
+                        if self.pacer.update(signature):
+                            # Check if screenshot is completely black (common issue)
+                            if self._is_image_black(screenshot):
+                                if last_successful_screenshot is not None:
+                                    logger.debug("Detected black screen, using last successful screenshot")
+                                    screenshot = last_successful_screenshot
+                                else:
+                                    self.pacer.force()  # Check the next grab again
+                                    raise Exception("Screenshot is black and no fallback available")
+                            
+                            # Store successful screenshot for fallback and for variants encoded later
+                            last_successful_screenshot = screenshot
+                            self._mark_variants_dirty()
+                        else:
+                            frames_unchanged.inc()
                         
-                        # Send to stream clients with better error handling
-                        self._send_frame_to_clients(jpeg_bytes)
+                        # One encode per quality level in use whose frame interval has passed
+                        due = self._due_variants(time.monotonic())
+                        if due and last_successful_screenshot is not None:
+                            self._encode_variants(last_successful_screenshot, due)
+                            frame_seconds = time.perf_counter() - encode_start
+                            encode_seconds.observe(frame_seconds)
+                            profiler.record('capture_screen', frame_seconds)
+                            self.pacer.frame_sent()
                         
                         # Reset error counter on success
                         consecutive_errors = 0
@@ -340,21 +381,19 @@ class ScreenShareService:
                     except Exception as capture_error:
                         consecutive_errors += 1
                         self.capture_errors += 1
-                        print(f"Screen capture error ({consecutive_errors}/{self.max_capture_errors}): {capture_error}")
+                        capture_failures.inc()
+                        logger.error(f"Screen capture error ({consecutive_errors}/{self.max_capture_errors}): {capture_error}")
                         
                         # Try to send last successful frame if available
-                        if last_successful_screenshot is not None and consecutive_errors <= 3:
+                        if consecutive_errors <= 3:
                             try:
-                                print("Attempting to send last successful frame")
-                                buffer = io.BytesIO()
-                                last_successful_screenshot.save(buffer, format='JPEG', quality=self.quality)
-                                jpeg_bytes = buffer.getvalue()
-                                self._send_frame_to_clients(jpeg_bytes)
+                                logger.debug("Attempting to send last successful frame")
+                                self._republish_last_frames()
                             except Exception as fallback_error:
-                                print(f"Fallback frame failed: {fallback_error}")
+                                logger.error(f"Fallback frame failed: {fallback_error}")
                         
                         if consecutive_errors >= self.max_capture_errors:
-                            print(f"Too many consecutive capture errors, pausing capture for {error_recovery_delay}s")
+                            logger.error(f"Too many consecutive capture errors, pausing capture for {error_recovery_delay}s")
                             time.sleep(error_recovery_delay)
                             consecutive_errors = 0
                             error_recovery_delay = min(error_recovery_delay * 2, 10.0)  # Exponential backoff
@@ -368,53 +407,141 @@ class ScreenShareService:
                         time.sleep(min(sleep_time, 0.01))
                         
             except Exception as e:
-                print(f"Error in capture loop: {e}")
+                logger.error(f"Error in capture loop: {e}")
                 time.sleep(1.0)  # Longer delay on general error
     
-    def _send_frame_to_clients(self, jpeg_bytes):
-        """Send frame to all connected stream clients with error handling"""
+    def _due_variants(self, now):
+        """Keep one variant per (stream kind, level) clients are on; return those due for a frame"""
         with self.lock:
-            if not self.stream_clients:
-                return  # No clients to send to
+            wanted = {(sender.tiles, sender.level) for sender in self.senders.values()}
+            for key in list(self.variants):
+                if key not in wanted:
+                    del self.variants[key]
+            for tiles, level in wanted:
+                if (tiles, level) not in self.variants:
+                    settings = self.ladder[level]
+                    encoder = TileDeltaEncoder(quality=settings.quality) if tiles else None
+                    self.variants[(tiles, level)] = StreamVariant(tiles, level, settings, encoder)
+            return [variant for variant in self.variants.values() if variant.due(now)]
+
+    def _mark_variants_dirty(self):
+        with self.lock:
+            for variant in self.variants.values():
+                variant.dirty = True
+
+    def _encode_variants(self, screenshot, variants):
+        """Resize once per scale and encode once per variant, then publish to its clients"""
+        scaled = {}
+        now = time.monotonic()
+        for variant in variants:
+            settings = variant.settings
+            image = scaled.get(settings.scale)
+            if image is None:
+                # Resize image if needed
+                if settings.scale != 1.0:
+                    new_size = (int(screenshot.width * settings.scale),
+                                int(screenshot.height * settings.scale))
+                    with profiler.section('resize'):
+                        image = screenshot.resize(new_size, Image.LANCZOS)
+                else:
+                    image = screenshot.copy()
                 
-            clients_to_remove = []
-            print(f"Sending frame ({len(jpeg_bytes)} bytes) to {len(self.stream_clients)} clients")
+                # Add cursor if enabled
+                if self.show_cursor:
+                    self._add_cursor_to_image(image)
+                scaled[settings.scale] = image
             
-            for client in self.stream_clients[:]:  # Create a copy of the list
-                try:
-                    # Send frame with proper MJPEG format
-                    frame_data = [
-                        b'--frame\r\n',
-                        b'Content-Type: image/jpeg\r\n',
-                        f'Content-Length: {len(jpeg_bytes)}\r\n'.encode(),
-                        b'\r\n',
-                        jpeg_bytes,
-                        b'\r\n'
-                    ]
-                    
-                    # Send all frame data atomically
-                    for data in frame_data:
-                        client.send(data)
-                    
-                    # Update client health
-                    client_id = id(client)
-                    if client_id in self.client_health:
-                        self.client_health[client_id]['last_success'] = time.time()
-                        self.client_health[client_id]['errors'] = 0
-                        
-                except Exception as send_error:
-                    print(f"Error sending frame to client: {send_error}")
-                    clients_to_remove.append(client)
+            variant.dirty = False
+            variant.last_encoded = now
+            if variant.tiles:
+                # Changed tiles only; None when nothing changed
+                tile_frame = variant.tile_encoder.encode(image)
+                if tile_frame is not None:
+                    self._send_tiles_to_clients(variant, *tile_frame)
+                continue
             
-            # Remove failed clients
-            for client in clients_to_remove:
-                self._remove_client(client)
-                print("Removed disconnected client")
-                
-            # If we have no more stream clients, reset error counters
-            if not self.stream_clients:
-                self.capture_errors = 0
-                print("No stream clients remaining, resetting error counters")
+            # Full JPEG for MJPEG clients, with optimization
+            buffer = io.BytesIO()
+            with profiler.section('jpeg_encode'):
+                image.save(buffer, format='JPEG', quality=settings.quality, optimize=True, progressive=True)
+            jpeg_bytes = buffer.getvalue()
+            if len(jpeg_bytes) == 0:
+                raise Exception("Empty JPEG data")
+            frames_encoded.inc()
+            frame_bytes.observe(len(jpeg_bytes))
+            self._send_frame_to_clients(variant, jpeg_bytes)
+
+    def _send_frame_to_clients(self, variant, jpeg_bytes):
+        """Publish a full JPEG frame to the MJPEG stream clients on the variant's level"""
+        self._publish(variant, b'image/jpeg', jpeg_bytes)
+
+    def _send_tiles_to_clients(self, variant, kind, payload):
+        """Publish a keyframe or tile delta (tile_delta.py) to the /tiles clients on the variant's level"""
+        tile_frames.labels(kind).inc()
+        keyframe = kind == KEYFRAME
+        self._publish(variant, b'image/jpeg' if keyframe else DELTA_CONTENT_TYPE, payload, keyframe=keyframe)
+
+    @profiler.timed('publish_frame')
+    def _publish(self, variant, content_type, payload, keyframe=True):
+        """Frame a part once and hand it to each matching client's sender; never blocks on a socket"""
+        part = multipart_part(content_type, payload)
+        variant.last_part = (part, keyframe)
+        self._publish_part(variant, part, keyframe)
+
+    def _publish_part(self, variant, part, keyframe):
+        with self.lock:
+            senders = [sender for sender in self.senders.values()
+                       if sender.tiles == variant.tiles and sender.level == variant.level]
+        if not senders:
+            return  # No clients to send to
+        
+        logger.debug("Publishing frame (%d bytes) to %d clients", len(part), len(senders))
+        for sender in senders:
+            sender.publish(part, keyframe, variant.level)
+
+    def _republish_last_frames(self):
+        """Resend each MJPEG variant's last frame (tile deltas cannot be repeated safely)"""
+        with self.lock:
+            variants = [variant for variant in self.variants.values() if not variant.tiles and variant.last_part]
+        for variant in variants:
+            self._publish_part(variant, *variant.last_part)
+
+    def _request_keyframe(self):
+        """Next tile frame of every level is a keyframe, sent even if the screen is static"""
+        with self.lock:
+            for variant in self.variants.values():
+                if variant.tiles:
+                    variant.tile_encoder.request_keyframe()
+                    variant.dirty = True
+        self.pacer.force()
+    
+    def get_stats(self):
+        """Stream clients (level, throughput, frames sent and dropped), encoded variants and capture pacing"""
+        with self.lock:
+            clients = len(self.stream_clients)
+            tile_clients = len(self.tile_clients)
+            senders = list(self.senders.values())
+            variants = list(self.variants.values())
+        return {
+            'stream_clients': clients,
+            'tile_clients': tile_clients,
+            'capture_errors': self.capture_errors,
+            'ladder': [settings._asdict() for settings in self.ladder],
+            'clients': [sender.get_stats() for sender in senders],
+            'variants': [{'mode': 'tiles' if variant.tiles else 'mjpeg', 'level': variant.level,
+                          **variant.settings._asdict(),
+                          **(variant.tile_encoder.get_stats() if variant.tiles else {})} for variant in variants],
+            'pacing': self.pacer.get_stats(),
+        }
+    
+    def _cursor_position(self):
+        """Cursor position as part of the frame signature, or None when it is not drawn"""
+        if not self.show_cursor:
+            return None
+        try:
+            return win32gui.GetCursorPos()
+        except Exception:
+            return None
     
     def _add_cursor_to_image(self, image):
         try:
@@ -424,12 +551,12 @@ class ScreenShareService:
                 
             cursor_pos = win32gui.GetCursorPos()
             
-            # Scale cursor position to match image scale
-            scaled_x = int(cursor_pos[0] * self.scale)
-            scaled_y = int(cursor_pos[1] * self.scale)
+            # Map the cursor onto the (scaled) capture of the primary monitor
+            position = self.display_topology.to_image(cursor_pos[0], cursor_pos[1], image.size)
             
-            # Ensure cursor is within image bounds
-            if 0 <= scaled_x < image.width and 0 <= scaled_y < image.height:
+            # Skip the overlay while the cursor is on another monitor
+            if position is not None:
+                scaled_x, scaled_y = position
                 # Draw cursor on image with better visibility
                 draw = ImageDraw.Draw(image)
                 cursor_size = 6
@@ -444,7 +571,7 @@ class ScreenShareService:
                 draw.line((scaled_x, scaled_y-cursor_size*2, scaled_x, scaled_y+cursor_size*2), 
                          fill='white', width=1)
         except Exception as e:
-            print(f"Error adding cursor: {e}") 
+            logger.error(f"Error adding cursor: {e}")
     
     def _get_html_page(self):
         """Generate HTML page for screen sharing"""
@@ -639,5 +766,5 @@ class ScreenShareService:
             black_ratio = black_pixels / total_pixels
             return black_ratio > threshold
         except Exception as e:
-            print(f"Error checking if image is black: {e}")
+            logger.error(f"Error checking if image is black: {e}")
             return False 
\ No newline at end of file
@@ -6,6 +6,11 @@ MIT License - see LICENSE file for details
 GUI application for the AnyCommand Windows Server.
 """
 
+# Physical pixels everywhere (see display_topology); pyautogui and customtkinter
+# would otherwise set their own DPI awareness on import
+from display_topology import enable_dpi_awareness
+enable_dpi_awareness()
+
 import customtkinter as ctk
 import socket
 import pyautogui
@@ -35,6 +40,7 @@ from pystray import Icon as TrayIcon, Menu as TrayMenu, MenuItem as TrayMenuItem
 from PIL import Image, ImageDraw, ImageFont
 import shutil
 from file_transfer_service import FileTransferService
+import profiler
 import webbrowser
 import qrcode
 from io import BytesIO
@@ -550,6 +556,16 @@ class ServerGUI(ctk.CTk):
             text_color="#00D4FF"  # Bright cyan for PIN
         )
         self.pin_label.pack(anchor="w", pady=(5, 0))
+
+        # Link quality of connected devices (RTT/jitter/loss from CAPS:PROBE clients)
+        self.link_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=self.small_font,
+            text_color="#AAAAAA"
+        )
+        self.link_label.pack(anchor="w", pady=(3, 0))
+        self.after(2000, self.refresh_link_status)
         
         # QR Code section
         qr_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
@@ -681,7 +697,7 @@ class ServerGUI(ctk.CTk):
         # Create menu window positioned next to main window
         self.menu_window = ctk.CTkToplevel(self)
         self.menu_window.title("")
-        self.menu_window.geometry("180x160")
+        self.menu_window.geometry("180x205")
         self.menu_window.resizable(False, False)
         self.menu_window.configure(fg_color="#2A2A2A")
         self.menu_window.overrideredirect(True)
@@ -689,7 +705,7 @@ class ServerGUI(ctk.CTk):
         # Position menu to the right of main window
         main_x = self.winfo_x()
         main_y = self.winfo_y()
-        self.menu_window.geometry(f"180x160+{main_x + 330}+{main_y}")
+        self.menu_window.geometry(f"180x205+{main_x + 330}+{main_y}")
         
         # Menu container with rounded corners
         menu_container = ctk.CTkFrame(
@@ -713,6 +729,8 @@ class ServerGUI(ctk.CTk):
         self.create_menu_button(menu_container, "📖 How to Connect", self.show_instructions)
         self.create_menu_button(menu_container, "⚙️ Settings", self.show_settings)
         self.create_menu_button(menu_container, "❓ Help", self.open_help_page)
+        self.create_menu_button(menu_container, "⏹ Stop Profiling" if profiler.is_running() else "📊 Start Profiling",
+                                self.toggle_profiling)
         
         # Click outside to close
         self.menu_window.bind('<FocusOut>', lambda e: self.hide_menu())
@@ -737,6 +755,21 @@ class ServerGUI(ctk.CTk):
         btn.pack(fill="x", padx=12, pady=3)  # Better spacing
         return btn
 
+    def toggle_profiling(self):
+        """Start the profiler, or stop it and say where the flamegraph file went"""
+        if not self.server:
+            return
+        try:
+            if profiler.is_running():
+                path = self.server.stop_profiling()
+                if path:
+                    self.show_notification("Profile saved", path)
+            else:
+                self.server.start_profiling()
+                self.show_notification("Profiling", "Reproduce the lag, then choose Stop Profiling")
+        except Exception as e:
+            logging.error(f"Error toggling profiler: {e}")
+
     def hide_menu(self):
         """Hide the hamburger menu"""
         if self.menu_window is not None:
@@ -951,6 +984,17 @@ class ServerGUI(ctk.CTk):
         if ip != "..." and pin != "...":
             self.generate_qr_code(ip, pin)
 
+    def refresh_link_status(self):
+        """Show RTT, jitter and loss of connected devices; repeats every 2 seconds"""
+        try:
+            links = self.server.get_link_stats() if self.server else []
+            parts = [f"{link['rtt_ms']:.0f} ms ±{link['jitter_ms']:.0f}, {link['loss']:.0%} loss"
+                     for link in links if link['rtt_ms'] is not None]
+            self.link_label.configure(text=f"Link: {' | '.join(parts)}" if parts else "")
+        except Exception as e:
+            logging.error(f"Error updating link status: {e}")
+        self.after(2000, self.refresh_link_status)
+
     def start_server(self):
         try:
             from remote_server import RemoteServer
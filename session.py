@@ -0,0 +1,308 @@
+"""
+Per-connection session state and timeouts for the control channel.
+
+Every authenticated control connection gets a Session holding its
+negotiated capabilities, activity time and timeouts. The auto-disconnect
+warning, the auto-disconnect itself and the idle timeout are timers on one
+shared TimerWheel, so arming or cancelling one is O(1) and no thread is
+started per client. Commands do not re-arm the idle timer: they only stamp
+last_activity, and the idle timer re-checks it when it fires. Timer
+callbacks share the wheel thread, so they write with Session.send_nowait():
+a client that stopped reading misses its warning or probe instead of
+holding up every other session's timers.
+
+Clients that negotiated CAPS:RESUME get a resumption token. When the
+connection drops, its session is parked for resume_ttl seconds; a new
+connection that authenticates with {"resume": token} instead of the PIN
+takes the parked session's capabilities, gamepad mode and disconnect
+deadline over in one round trip. Tokens are single use: every resume
+issues a new one.
+
+Clients that negotiated CAPS:PROBE are probed on the same wheel; each
+session's LinkStats (link_stats.py) holds its RTT, jitter and loss.
+"""
+
+import itertools
+import logging
+import secrets
+import select
+import threading
+import time
+
+from link_stats import LinkStats, PROBE_INTERVAL
+
+WARNING_LEAD = 30      # Seconds between DISCONNECT_WARNING and the disconnect
+SESSION_TICK = 0.5     # Resolution of session timeouts; they are minutes long
+RESUME_TTL = 120       # Seconds a dropped session can be resumed
+
+# Timer names
+WARNING = 'warning'
+DISCONNECT = 'disconnect'
+IDLE = 'idle'
+PROBE = 'probe'
+
+
+class Session:
+    """State of one authenticated control connection"""
+
+    def __init__(self, session_id, client, address):
+        self.session_id = session_id
+        self.client = client
+        self.address = address
+        self.capabilities = set()   # Negotiated with CAPS
+        self.gamepad_mode = False
+        self.connected_at = time.time()
+        self.last_activity = time.monotonic()
+        self.disconnect_minutes = 0
+        self.disconnect_deadline = None  # monotonic; None while auto-disconnect is off
+        self.timers = {}            # name -> (WheelTimer, monotonic deadline)
+        self.resume_token = None
+        self.closed_at = None       # monotonic; set while parked for resumption
+        self.link = LinkStats()     # RTT/jitter/loss while probing
+
+    def send_nowait(self, data):
+        """Send a short message only if it cannot block; False if the client isn't taking data"""
+        window = getattr(self.client, 'send_window', None)
+        if window is not None:
+            # MuxStream: sends block only while the stream's flow-control window is short
+            ready = window >= len(data)
+        else:
+            try:
+                ready = bool(select.select([], [self.client], [], 0)[1])
+            except (OSError, ValueError):
+                return False  # Already closed
+        if not ready:
+            return False
+        self.client.send(data)
+        return True
+
+
+class SessionManager:
+    """Open, look up and time out sessions; all timeouts run on one TimerWheel"""
+
+    def __init__(self, wheel, on_warning, on_disconnect, on_idle, idle_timeout=0, resume_ttl=RESUME_TTL,
+                 on_probe=None, probe_interval=PROBE_INTERVAL):
+        """
+        wheel: TimerWheel the timeouts run on (callbacks run on its thread).
+        on_warning / on_disconnect / on_idle / on_probe: called with the Session.
+        idle_timeout: seconds without commands before on_idle; 0 disables it.
+        resume_ttl: seconds a dropped session stays resumable.
+        probe_interval: seconds between on_probe calls for sessions passed to
+            start_probing(); 0 disables probing.
+        """
+        self.wheel = wheel
+        self.on_warning = on_warning
+        self.on_disconnect = on_disconnect
+        self.on_idle = on_idle
+        self.on_probe = on_probe
+        self.idle_timeout = idle_timeout
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+        self.resume_ttl = resume_ttl
+        self.sessions = {}        # client -> Session
+        self.resume_tokens = {}   # token -> Session, open or parked
+        self._ids = itertools.count(1)
+
+    def open(self, client, address, disconnect_minutes, resumed=None):
+        """Start a session; resumed: Session from claim_resume_token() to carry over"""
+        session = Session(next(self._ids), client, address)
+        remaining = None
+        if resumed is not None:
+            session.capabilities = set(resumed.capabilities)
+            session.gamepad_mode = resumed.gamepad_mode
+            disconnect_minutes = resumed.disconnect_minutes
+            if resumed.disconnect_deadline is not None:
+                # Reconnecting does not push the auto-disconnect back
+                remaining = max(resumed.disconnect_deadline - time.monotonic(), SESSION_TICK)
+
+        with self.lock:
+            self.sessions[client] = session
+            self._arm_disconnect(session, disconnect_minutes, remaining)
+            if self.idle_timeout:
+                self._arm(session, IDLE, self.idle_timeout, self._check_idle)
+        if resumed is not None:
+            logging.info(f"Session {session.session_id} resumed session {resumed.session_id} for {address}")
+        else:
+            logging.info(f"Session {session.session_id} opened for {address}")
+        return session
+
+    def close(self, client, resumable=True):
+        """Forget a client's session and cancel its timers; returns the Session or None.
+
+        resumable=False also drops its resumption token (timeouts, kicks).
+        """
+        with self.lock:
+            session = self.sessions.get(client)
+            if session is not None and not resumable and session.resume_token is not None:
+                self.resume_tokens.pop(session.resume_token, None)
+                session.resume_token = None
+            session = self._close(client)
+        if session is not None:
+            logging.info(f"Session {session.session_id} closed")
+        return session
+
+    def _close(self, client):
+        session = self.sessions.pop(client, None)
+        if session is None:
+            return None
+        for timer, _ in session.timers.values():
+            timer.cancel()
+        session.timers.clear()
+        if session.resume_token is not None:
+            # Park it: resumable until the token expires
+            session.closed_at = time.monotonic()
+            self.wheel.schedule(self.resume_ttl, self._expire_token, session.resume_token, session)
+        return session
+
+    def issue_resume_token(self, session):
+        """Give an open session a new resumption token, replacing any previous one"""
+        token = secrets.token_hex(16)
+        with self.lock:
+            if session.resume_token is not None:
+                self.resume_tokens.pop(session.resume_token, None)
+            session.resume_token = token
+            self.resume_tokens[token] = session
+        return token
+
+    def claim_resume_token(self, token):
+        """Take the session a token belongs to; the token is used up either way.
+
+        Returns (session, stale_client). session is None if the token is
+        unknown or expired. If the session is still open (its connection
+        dropped without the server noticing), it is closed and its client is
+        returned as stale_client for the caller to close.
+        """
+        with self.lock:
+            session = self.resume_tokens.pop(token, None)
+            if session is None:
+                return None, None
+            session.resume_token = None
+            stale_client = None
+            if self.sessions.get(session.client) is session:
+                self._close(session.client)
+                stale_client = session.client
+            elif time.monotonic() - session.closed_at > self.resume_ttl:
+                return None, None
+        return session, stale_client
+
+    def revoke_resume_tokens(self):
+        """Invalidate every resumption token (e.g. after the PIN changes)"""
+        with self.lock:
+            for session in self.resume_tokens.values():
+                session.resume_token = None
+            self.resume_tokens.clear()
+
+    def _expire_token(self, token, session):
+        with self.lock:
+            if self.resume_tokens.get(token) is session:
+                del self.resume_tokens[token]
+
+    def get(self, client):
+        return self.sessions.get(client)
+
+    def link_for_host(self, host):
+        """LinkStats of the probed session connected from this IP, or None.
+
+        Lets services on other ports (e.g. screen share) use the control
+        connection's measurements for the same device.
+        """
+        with self.lock:
+            for session in self.sessions.values():
+                if session.address and session.address[0] == host and PROBE in session.timers:
+                    return session.link
+        return None
+
+    def start_probing(self, session):
+        """Send the session a probe every probe_interval seconds until it closes"""
+        if not (self.on_probe and self.probe_interval > 0):
+            return
+        with self.lock:
+            if self.sessions.get(session.client) is session and PROBE not in session.timers:
+                self._arm(session, PROBE, SESSION_TICK, self._probe)
+
+    def stop_probing(self, session):
+        with self.lock:
+            self._cancel(session, PROBE)
+
+    def _probe(self, session):
+        self.on_probe(session)
+        with self.lock:
+            if self.sessions.get(session.client) is session:
+                self._arm(session, PROBE, self.probe_interval, self._probe)
+
+    def touch(self, client):
+        """Record activity on a client's session (called for every command)"""
+        session = self.sessions.get(client)
+        if session is not None:
+            session.last_activity = time.monotonic()
+
+    def clients(self):
+        with self.lock:
+            return list(self.sessions)
+
+    def set_disconnect_timer(self, session, minutes):
+        """Restart the warning and auto-disconnect timers; 0 minutes disables them"""
+        with self.lock:
+            if self.sessions.get(session.client) is session:
+                self._arm_disconnect(session, minutes)
+
+    def _arm_disconnect(self, session, minutes, remaining=None):
+        session.disconnect_minutes = minutes
+        session.disconnect_deadline = None
+        self._cancel(session, WARNING)
+        self._cancel(session, DISCONNECT)
+        if minutes <= 0:
+            return
+        seconds = minutes * 60 if remaining is None else remaining
+        if seconds > WARNING_LEAD:
+            self._arm(session, WARNING, seconds - WARNING_LEAD, self.on_warning)
+        self._arm(session, DISCONNECT, seconds, self.on_disconnect)
+        session.disconnect_deadline = time.monotonic() + seconds
+
+    def _arm(self, session, name, delay, callback):
+        self._cancel(session, name)
+        timer = self.wheel.schedule(delay, self._fire, session, name, callback)
+        session.timers[name] = (timer, time.monotonic() + delay)
+
+    def _cancel(self, session, name):
+        entry = session.timers.pop(name, None)
+        if entry is not None:
+            entry[0].cancel()
+
+    def _fire(self, session, name, callback):
+        with self.lock:
+            if self.sessions.get(session.client) is not session:
+                return  # Closed in the meantime
+            session.timers.pop(name, None)
+        try:
+            callback(session)
+        except Exception as e:
+            logging.error(f"Session {session.session_id} {name} timeout failed: {e}")
+
+    def _check_idle(self, session):
+        idle = time.monotonic() - session.last_activity
+        if idle < self.idle_timeout:
+            # Active since the timer was armed: check again when it could next expire
+            with self.lock:
+                if self.sessions.get(session.client) is session:
+                    self._arm(session, IDLE, self.idle_timeout - idle, self._check_idle)
+            return
+        logging.info(f"Session {session.session_id} idle for {idle:.0f}s")
+        self.on_idle(session)
+
+    def get_stats(self):
+        """Active sessions with their idle time and seconds until each timeout"""
+        now = time.monotonic()
+        with self.lock:
+            sessions = list(self.sessions.values())
+            return [{
+                'session_id': session.session_id,
+                'address': session.address,
+                'connected_at': session.connected_at,
+                'idle_seconds': round(now - session.last_activity, 1),
+                'disconnect_minutes': session.disconnect_minutes,
+                'capabilities': sorted(session.capabilities),
+                'link': session.link.get_stats(),
+                'deadlines': {name: round(deadline - now, 1)
+                              for name, (_, deadline) in session.timers.items()},
+            } for session in sessions]
@@ -1,22 +1,24 @@
-from pynput.keyboard import Key, Controller
-import time
+from input_sink import NativeInputSink, combo_events
 
-keyboard = Controller()
+# Input backend used for shortcuts; replaced with set_input_sink()
+_input_sink = None
+# Ordered key sequencer shortcuts are submitted to; set with set_key_sequencer()
+_key_sequencer = None
 
-# Map special key names to pynput Keys
+# Map special key names to input sink (keyboard package) key names
 SPECIAL_KEYS = {
-    'ctrl': Key.ctrl,
-    'shift': Key.shift,
-    'alt': Key.alt,
-    'win': Key.cmd,  # or Key.cmd_l for left Windows key
-    'tab': Key.tab,
-    'enter': Key.enter,
-    'space': Key.space,
-    'up': Key.up,
-    'down': Key.down,
-    'left': Key.left,
-    'right': Key.right,
-    'esc': Key.esc,
+    'ctrl': 'ctrl',
+    'shift': 'shift',
+    'alt': 'alt',
+    'win': 'windows',
+    'tab': 'tab',
+    'enter': 'enter',
+    'space': 'space',
+    'up': 'up',
+    'down': 'down',
+    'left': 'left',
+    'right': 'right',
+    'esc': 'esc',
     'f': 'f',
     'n': 'n',
     'p': 'p',
@@ -43,28 +45,31 @@ SPECIAL_KEYS = {
     'minus': '-',    # For zoom out (Ctrl+-)
 }
 
+def set_input_sink(sink):
+    """Route shortcuts through the given InputSink (e.g. the server's)"""
+    global _input_sink
+    _input_sink = sink
+
+def set_key_sequencer(sequencer):
+    """Queue shortcuts behind the server's other key sequences instead of injecting directly"""
+    global _key_sequencer
+    _key_sequencer = sequencer
+
+def get_input_sink():
+    global _input_sink
+    if _input_sink is None:
+        _input_sink = NativeInputSink()
+    return _input_sink
+
 def send_shortcut(keys):
     """Send keyboard shortcut by pressing all keys in sequence"""
-    pressed_keys = []
-    try:
-        # Press all keys in sequence
-        for key in keys:
-            key_lower = key.lower()
-            if key_lower in SPECIAL_KEYS:
-                k = SPECIAL_KEYS[key_lower]
-                keyboard.press(k)
-                pressed_keys.append(k)
-            else:
-                keyboard.press(key)
-                pressed_keys.append(key)
-        
-        # Small delay to ensure keys are registered
-        time.sleep(0.1)
-        
-    finally:
-        # Release all keys in reverse order
-        for key in reversed(pressed_keys):
-            keyboard.release(key)
+    mapped_keys = [SPECIAL_KEYS.get(key.lower(), key) for key in keys]
+    # Press all keys in sequence and release them in reverse order, as one batch
+    events = combo_events(mapped_keys)
+    if _key_sequencer is not None:
+        _key_sequencer.submit(events)
+    else:
+        get_input_sink().inject(events)
 
 def handle_shortcut(shortcut_id, app_id, keys=None):
     """Handle shortcuts based on ID and application"""
@@ -0,0 +1,191 @@
+"""
+Per-client quality, scale and frame rate for the screen stream.
+
+The allowed range ([Screen] min/max quality, scale and fps) is cut into a
+small ladder of levels, level 0 being the best. Every stream client has a
+RateController that moves it along the ladder from what its sender
+observes over ADAPT_WINDOW:
+
+    busy        fraction of the window spent inside sendall(), i.e. the
+                delivered bitrate divided by the link capacity estimate
+                (bytes / seconds spent sending)
+    drops       frames replaced in the mailbox before they were sent,
+                i.e. a backlog the link could not drain
+
+Any drop or busy > HIGH_BUSY steps one level down. UPGRADE_AFTER windows
+in a row with busy < LOW_BUSY step one level up. A step up that is undone
+within its probation period doubles the wait before the next one, up to
+MAX_UPGRADE_AFTER windows, so a client on a marginal link stops probing
+every few seconds.
+
+When the device also probes its control connection (link_stats.py), that
+link is watched too: smoothed RTT more than QUEUE_DELAY above the minimum
+(the stream is filling buffers and input waits behind it) or loss above
+HIGH_LOSS blocks stepping up and steps down at most once per LINK_HOLD,
+since those figures only move once per probe.
+
+Clients on the same level (and stream kind) share one StreamVariant: the
+frame is resized and encoded once per level in use, not once per client.
+"""
+
+import time
+from collections import namedtuple
+
+from link_stats import PROBE_INTERVAL
+
+MIN_QUALITY = 40
+MIN_SCALE = 0.5
+MIN_FPS = 5
+LEVELS = 4
+
+ADAPT_WINDOW = 1.0        # Seconds of sends per decision
+HIGH_BUSY = 0.8           # Step down when sending takes more of the window than this
+LOW_BUSY = 0.5            # Count a window towards stepping up below this
+UPGRADE_AFTER = 3         # Good windows in a row before stepping up
+MAX_UPGRADE_AFTER = 30
+THROUGHPUT_GAIN = 1 / 4   # EWMA gain of the throughput estimates
+QUEUE_DELAY = 0.15        # Control-link RTT above its minimum that counts as congestion (seconds)
+HIGH_LOSS = 0.1           # Control-link probe loss that counts as congestion
+LINK_HOLD = 2 * PROBE_INTERVAL  # Seconds between steps down for link congestion alone
+
+StreamSettings = namedtuple('StreamSettings', 'quality scale fps')
+
+
+def quality_ladder(max_quality, min_quality, max_scale, min_scale, max_fps, min_fps, levels=LEVELS):
+    """Settings per level, best first, stepping all three evenly from max to min"""
+    levels = max(1, int(levels))
+    ladder = []
+    for level in range(levels):
+        t = level / (levels - 1) if levels > 1 else 0.0
+        ladder.append(StreamSettings(
+            quality=int(round(max_quality - t * (max_quality - min_quality))),
+            scale=round(max_scale - t * (max_scale - min_scale), 2),
+            fps=round(max_fps - t * (max_fps - min_fps), 1),
+        ))
+    return ladder
+
+
+class RateController:
+    """Ladder level of one stream client; called with its sender's lock held"""
+
+    def __init__(self, ladder, clock=time.monotonic, link=None):
+        """link: callable returning the device's control-link LinkStats, or None while not probed"""
+        self.ladder = ladder
+        self.clock = clock
+        self.link = link
+        self.level = 0
+        self.window_start = clock()
+        self.window_bytes = 0
+        self.window_busy = 0.0
+        self.window_drops = 0
+        self.good_windows = 0
+        self.upgrade_after = UPGRADE_AFTER
+        self.last_upgrade = None
+        self.last_downgrade = None
+
+        self.busy = 0.0
+        self.delivered = None   # Bytes per second actually sent
+        self.capacity = None    # Bytes per second while sending
+        self.link_congested = False
+        self.changes = 0
+
+    @property
+    def settings(self):
+        return self.ladder[self.level]
+
+    def on_sent(self, size, seconds):
+        """Record one sendall(); returns the new level if it changed"""
+        self.window_bytes += size
+        self.window_busy += seconds
+        return self._evaluate()
+
+    def on_dropped(self):
+        """Record a frame dropped from the mailbox; returns the new level if it changed"""
+        self.window_drops += 1
+        return self._evaluate()
+
+    def _evaluate(self):
+        now = self.clock()
+        elapsed = now - self.window_start
+        if elapsed < ADAPT_WINDOW:
+            return None
+
+        self.busy = min(self.window_busy / elapsed, 1.0)
+        self.delivered = self._smooth(self.delivered, self.window_bytes / elapsed)
+        if self.window_busy > 0:
+            self.capacity = self._smooth(self.capacity, self.window_bytes / self.window_busy)
+
+        previous = self.level
+        link_congested = self._check_link()
+        link_step = link_congested and (self.last_downgrade is None or now - self.last_downgrade >= LINK_HOLD)
+        if self.window_drops or self.busy > HIGH_BUSY or link_step:
+            self.good_windows = 0
+            if self.level < len(self.ladder) - 1:
+                self.level += 1
+                if self.last_upgrade is not None and now - self.last_upgrade < self.upgrade_after * ADAPT_WINDOW:
+                    self.upgrade_after = min(self.upgrade_after * 2, MAX_UPGRADE_AFTER)
+                self.last_downgrade = now
+        elif self.busy < LOW_BUSY and not link_congested:
+            self.good_windows += 1
+            if self.last_downgrade is None or now - self.last_downgrade > MAX_UPGRADE_AFTER * ADAPT_WINDOW:
+                self.upgrade_after = UPGRADE_AFTER
+            if self.level > 0 and self.good_windows >= self.upgrade_after:
+                self.level -= 1
+                self.good_windows = 0
+                self.last_upgrade = now
+        else:
+            self.good_windows = 0
+
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_busy = 0.0
+        self.window_drops = 0
+        if self.level == previous:
+            return None
+        self.changes += 1
+        return self.level
+
+    def _check_link(self):
+        link = self.link() if self.link else None
+        if link is None:
+            self.link_congested = False
+        else:
+            rtt, min_rtt = link.rtt, link.min_rtt
+            queued = rtt is not None and min_rtt is not None and rtt - min_rtt > QUEUE_DELAY
+            self.link_congested = queued or link.loss > HIGH_LOSS
+        return self.link_congested
+
+    @staticmethod
+    def _smooth(average, sample):
+        return sample if average is None else average + THROUGHPUT_GAIN * (sample - average)
+
+    def get_stats(self):
+        settings = self.settings
+        return {
+            'level': self.level,
+            'quality': settings.quality,
+            'scale': settings.scale,
+            'fps': settings.fps,
+            'busy': round(self.busy, 3),
+            'delivered_kbps': round(self.delivered * 8 / 1000, 1) if self.delivered is not None else None,
+            'capacity_kbps': round(self.capacity * 8 / 1000, 1) if self.capacity is not None else None,
+            'link_congested': self.link_congested,
+            'level_changes': self.changes,
+        }
+
+
+class StreamVariant:
+    """One encoded version of the stream shared by the clients on a level"""
+
+    def __init__(self, tiles, level, settings, tile_encoder=None):
+        self.tiles = tiles
+        self.level = level
+        self.settings = settings
+        self.tile_encoder = tile_encoder   # TileDeltaEncoder of a tile variant
+        self.dirty = True                  # The screen changed since the last encode
+        self.last_encoded = 0.0
+        self.last_part = None              # (part, keyframe) last published
+
+    def due(self, now):
+        """Changed and at least one frame interval (less 10% slack for grab jitter) since the last encode"""
+        return self.dirty and now - self.last_encoded >= 0.9 / self.settings.fps
@@ -0,0 +1,169 @@
+"""
+Per-client sender for the screen stream.
+
+The capture loop encodes each frame once, frames it as one multipart part
+and publishes the same bytes to every client's StreamSender. A sender holds
+at most one unsent part (a latest-frame mailbox) and has its own thread
+that writes it to the socket, so a slow client only delays itself: when a
+new part arrives before the previous one went out, the older one is
+dropped and counted.
+
+Tile stream clients (tile_delta.py) cannot skip a delta, since each one
+patches the previous frame. After a dropped part their sender discards
+deltas until the next keyframe and asks the encoder for one through
+on_resync.
+
+A sender may carry a RateController (stream_rate.py) that picks the
+client's quality level from the time spent in sendall() and the frames
+dropped; the service publishes each client the variant for its level.
+"""
+
+import threading
+import time
+
+import metrics
+
+KEEPALIVE_INTERVAL = 5.0   # Seconds without a frame before a '--ping' part is sent
+KEEPALIVE = b'--ping\r\n\r\n'
+
+bytes_sent = metrics.counter('anycommand_screen_bytes_sent_total', 'Screen stream bytes sent', ('client',))
+frames_sent = metrics.counter('anycommand_screen_frames_sent_total', 'Screen stream frames sent', ('client',))
+frames_dropped = metrics.counter('anycommand_screen_frames_dropped_total',
+                                 'Screen stream frames replaced before a slow client took them', ('client',))
+
+
+def multipart_part(content_type, payload):
+    """One part of the multipart/x-mixed-replace stream, ready to send"""
+    return b''.join((
+        b'--frame\r\n',
+        b'Content-Type: ' + content_type + b'\r\n',
+        f'Content-Length: {len(payload)}\r\n'.encode(),
+        b'\r\n',
+        payload,
+        b'\r\n',
+    ))
+
+
+class StreamSender:
+    """Latest-frame mailbox and sender thread of one stream client"""
+
+    def __init__(self, sock, peer, tiles=False, on_resync=None, rate=None):
+        self.sock = sock
+        self.peer = peer
+        self.tiles = tiles
+        self.rate = rate
+        self.on_resync = on_resync
+        self.cond = threading.Condition()
+        self.pending = None            # The unsent part, if any
+        self.resync = tiles            # Tile clients wait for a keyframe first
+        self.closed = False
+        self.done = threading.Event()  # Set when the sender thread has exited
+        self.thread = None
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.last_sent = time.monotonic()
+        self.error = None
+
+        # Series looked up once per client instead of once per frame
+        self.bytes_series = bytes_sent.labels(peer)
+        self.sent_series = frames_sent.labels(peer)
+        self.dropped_series = frames_dropped.labels(peer)
+
+    @property
+    def level(self):
+        """Quality level the client should be sent (0 without a rate controller)"""
+        return self.rate.level if self.rate else 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f'StreamSender-{self.peer}', daemon=True)
+        self.thread.start()
+
+    def publish(self, part, keyframe=True, level=0):
+        """Offer a part encoded for `level`; replaces (and drops) one the thread has not picked up yet"""
+        resync = level_changed = False
+        with self.cond:
+            if self.closed or level != self.level:
+                return  # Closed, or encoded for the level this client just left
+            if self.pending is not None:
+                self.pending = None
+                self._dropped()
+                self.resync = self.tiles   # The tile chain is broken until the next keyframe
+                level_changed = self.rate is not None and self.rate.on_dropped() is not None
+            if (self.resync and not keyframe) or level_changed:
+                self._dropped()
+                resync = True
+            else:
+                self.resync = False
+                self.pending = part
+                self.cond.notify()
+        if level_changed:
+            self._level_changed()
+        elif resync and self.on_resync:
+            self.on_resync()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.pending = None
+            self.cond.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self.cond:
+                    if self.pending is None and not self.closed:
+                        self.cond.wait(KEEPALIVE_INTERVAL)
+                    if self.closed:
+                        return
+                    part, self.pending = self.pending, None
+                if part is None:
+                    part = KEEPALIVE  # Idle: keep the connection from timing out
+                start = time.perf_counter()
+                self.sock.sendall(part)
+                self.last_sent = time.monotonic()
+                self.bytes_sent += len(part)
+                self.bytes_series.inc(len(part))
+                if part is not KEEPALIVE:
+                    self.frames_sent += 1
+                    self.sent_series.inc()
+                    if self.rate:
+                        with self.cond:
+                            changed = self.rate.on_sent(len(part), time.perf_counter() - start)
+                        if changed is not None:
+                            self._level_changed()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.cond:
+                self.closed = True
+                self.pending = None
+            self.done.set()
+
+    def _level_changed(self):
+        """Switch to another variant; a tile client needs that variant's next keyframe first"""
+        if self.tiles:
+            with self.cond:
+                self.resync = True
+        if self.on_resync:
+            self.on_resync()
+
+    def _dropped(self):
+        self.frames_dropped += 1
+        self.dropped_series.inc()
+
+    def get_stats(self):
+        with self.cond:
+            pending = self.pending is not None
+            rate = self.rate.get_stats() if self.rate else {}
+        return {
+            'peer': self.peer,
+            'mode': 'tiles' if self.tiles else 'mjpeg',
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'bytes_sent': self.bytes_sent,
+            'pending': pending,
+            'idle_seconds': round(time.monotonic() - self.last_sent, 1),
+            **rate,
+        }
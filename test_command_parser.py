@@ -0,0 +1,79 @@
+import pytest
+
+import binary_protocol
+from command_parser import CommandParser, OversizedCommand
+
+
+def test_legacy_read_is_one_command():
+    parser = CommandParser()
+    assert parser.feed(b'  MOUSE_CLICK:left') == ['MOUSE_CLICK:left']
+    assert parser.feed(b'   ') == []
+    assert not parser.framed
+
+
+def test_newline_commands_split_across_reads():
+    parser = CommandParser()
+    assert parser.feed(b'MOUSE_MOVE:1:2\nMOUSE_') == ['MOUSE_MOVE:1:2']
+    assert parser.feed(b'MOVE:3:4\r\n\nTYPE: \n') == ['MOUSE_MOVE:3:4', 'TYPE: ']
+    assert parser.framed
+
+
+def test_length_frame_keeps_payload_as_sent():
+    parser = CommandParser()
+    payload = 'TYPE_TEXT: a\nb\n'.encode()
+    data = b'@%d:' % len(payload) + payload
+    assert parser.feed(data[:5]) == []
+    assert parser.feed(data[5:] + b'PING\n') == ['TYPE_TEXT: a\nb\n', 'PING']
+
+
+def test_length_is_counted_in_bytes():
+    parser = CommandParser()
+    payload = 'TYPE_TEXT:日本'.encode()
+    assert parser.feed(b'@%d:' % len(payload) + payload) == ['TYPE_TEXT:日本']
+
+
+def test_binary_frames_mixed_with_text():
+    parser = CommandParser()
+    frame = binary_protocol.encode(binary_protocol.OP_MOUSE_MOVE, -3, 7)
+    assert parser.feed(frame[:3]) == []
+    assert parser.feed(frame[3:] + b'PING\n') == [(binary_protocol.OP_MOUSE_MOVE, (-3, 7)), 'PING']
+
+
+def test_unknown_binary_opcode_raises():
+    with pytest.raises(ValueError):
+        CommandParser().feed(bytes((binary_protocol.FRAME_MARKER, 0xEE)))
+
+
+@pytest.mark.parametrize('data', [b'@abc:xyz', b'@-1:x', b'@123456789012345'])
+def test_malformed_length_frame_raises(data):
+    with pytest.raises(ValueError):
+        CommandParser().feed(data)
+
+
+def test_oversized_length_frame_is_skipped():
+    parser = CommandParser(max_frame_length=32)
+    assert parser.feed(b'PING\n@40:' + b'x' * 10) == ['PING', OversizedCommand(40)]
+    assert parser.feed(b'x' * 20) == []
+    assert parser.feed(b'x' * 10 + b'PONG\n') == ['PONG']
+
+
+def test_oversized_line_is_skipped_up_to_newline():
+    parser = CommandParser(max_command_length=16)
+    assert parser.feed(b'PING\n' + b'A' * 20) == ['PING', OversizedCommand(None)]
+    assert parser.feed(b'A' * 20) == []
+    assert parser.feed(b'A\nPONG\n') == ['PONG']
+
+
+def test_receive_returns_none_on_close():
+    class ClosedSocket:
+        def recv_into(self, buffer):
+            return 0
+
+    assert CommandParser().receive(ClosedSocket()) is None
+
+
+def test_reset_drops_partial_state():
+    parser = CommandParser(max_frame_length=8)
+    parser.feed(b'PING\n@20:abc')
+    parser.reset()
+    assert parser.feed(b'PONG\n') == ['PONG']
@@ -0,0 +1,107 @@
+from command_registry import CommandRegistry, LatencyHistogram
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def test_dispatch_by_name():
+    registry = CommandRegistry()
+    calls = []
+    registry.register('PING', lambda client, data, params: calls.append((data, params)))
+    assert registry.dispatch('PING', FakeClient(), 'PING:1', ['1'])
+    assert calls == [('PING:1', ['1'])]
+    assert not registry.dispatch('PONG', FakeClient(), 'PONG', [])
+
+
+def test_exact_name_wins_over_prefix():
+    registry = CommandRegistry()
+    calls = []
+    registry.register_prefix('PIN', lambda client, data, params: calls.append('prefix'))
+    registry.register('PING', lambda client, data, params: calls.append('exact'))
+    registry.dispatch('PING', FakeClient(), 'PING', [])
+    registry.dispatch('PIN_CONFIG_SET', FakeClient(), 'PIN_CONFIG_SET', [])
+    assert calls == ['exact', 'prefix']
+
+
+def test_prefixes_are_tried_in_registration_order():
+    registry = CommandRegistry()
+    calls = []
+    registry.register_prefix('PIN_', lambda client, data, params: calls.append('first'))
+    registry.register_prefix('PIN_CONFIG', lambda client, data, params: calls.append('second'))
+    registry.dispatch('PIN_CONFIG', FakeClient(), 'PIN_CONFIG', [])
+    assert calls == ['first']
+
+
+def test_failing_handler_answers_error():
+    registry = CommandRegistry()
+
+    def broken(client, data, params):
+        raise IndexError('no params')
+
+    registry.register('BROKEN', broken)
+    client = FakeClient()
+    assert registry.dispatch('BROKEN', client, 'BROKEN', [])
+    assert client.sent == [b'ERROR\n']
+
+
+def test_unregister_and_decorator():
+    registry = CommandRegistry()
+
+    @registry.command('PING')
+    def ping(client, data, params):
+        client.send(b'PONG\n')
+
+    client = FakeClient()
+    registry.dispatch('PING', client, 'PING', [])
+    registry.unregister('PING')
+    assert not registry.dispatch('PING', client, 'PING', [])
+    assert client.sent == [b'PONG\n']
+
+
+def test_dispatch_opcode():
+    registry = CommandRegistry()
+    calls = []
+    registry.register_opcode(0x01, 'MOUSE_MOVE', lambda dx, dy: calls.append((dx, dy)))
+    assert registry.dispatch_opcode(0x01, (3, -4))
+    assert not registry.dispatch_opcode(0x02, (1,))
+    assert calls == [(3, -4)]
+
+
+def test_timing_records_prefix_and_opcode_handlers():
+    registry = CommandRegistry()
+    registry.register('PING', lambda client, data, params: None)
+    registry.register_prefix('PIN_CONFIG', lambda client, data, params: None)
+    registry.register_opcode(0x01, 'MOUSE_MOVE', lambda dx, dy: None)
+    hooked = []
+    registry.add_hook(lambda name, seconds: hooked.append(name))
+
+    registry.dispatch('PING', FakeClient(), 'PING', [])
+    assert registry.get_stats() == {}
+
+    registry.set_timing(True)
+    registry.dispatch('PING', FakeClient(), 'PING', [])
+    registry.dispatch('PIN_CONFIG_GET', FakeClient(), 'PIN_CONFIG_GET', [])
+    registry.dispatch_opcode(0x01, (1, 1))
+    stats = registry.get_stats()
+    assert {name: entry['count'] for name, entry in stats.items()} == {'MOUSE_MOVE': 1, 'PING': 1, 'PIN_CONFIG': 1}
+    assert hooked == ['PING', 'PIN_CONFIG', 'MOUSE_MOVE']
+
+    registry.reset_stats()
+    assert registry.get_stats() == {}
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.observe(0.0004)
+    histogram.observe(0.3)
+    # Bucket upper bounds, capped at the largest observation
+    assert histogram.percentile(0.5) == 0.0005
+    assert histogram.percentile(0.99) == 0.0005
+    assert histogram.percentile(1.0) == 0.3
+    assert histogram.snapshot()['count'] == 100
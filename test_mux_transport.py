@@ -0,0 +1,105 @@
+import socket
+import threading
+
+import pytest
+
+from mux_transport import (MuxConnection, MuxStream, DATA, WINDOW, RESET, WINDOW_UPDATE, FRAME_HEADER,
+                           INITIAL_WINDOW, MAX_FRAME_DATA, PRIORITY_BULK, PRIORITY_INPUT)
+
+
+class RecordingConnection:
+    """MuxConnection stand-in that keeps the frames a stream sends"""
+
+    address = ('10.0.0.2', 5000)
+
+    def __init__(self):
+        self.frames = []
+
+    def send_frame(self, priority, stream_id, frame_type, payload=b''):
+        self.frames.append((priority, stream_id, frame_type, payload))
+
+    def stream_closed(self, stream):
+        pass
+
+
+@pytest.fixture
+def connection():
+    return RecordingConnection()
+
+
+@pytest.fixture
+def stream(connection):
+    return MuxStream(connection, 3, 'screen', PRIORITY_BULK)
+
+
+def test_sendall_splits_into_frames_and_spends_window(stream, connection):
+    stream.sendall(b'x' * (MAX_FRAME_DATA * 2 + 10))
+    assert [len(payload) for _, _, _, payload in connection.frames] == [MAX_FRAME_DATA, MAX_FRAME_DATA, 10]
+    assert all(frame[:3] == (PRIORITY_BULK, 3, DATA) for frame in connection.frames)
+    assert stream.send_window == INITIAL_WINDOW - (MAX_FRAME_DATA * 2 + 10)
+    assert stream.bytes_out == MAX_FRAME_DATA * 2 + 10
+
+
+def test_sendall_waits_for_credit(stream, connection):
+    stream.settimeout(0.05)
+    with pytest.raises(socket.timeout):
+        stream.sendall(b'x' * (INITIAL_WINDOW + 1))
+    assert sum(len(frame[3]) for frame in connection.frames) == INITIAL_WINDOW
+    assert stream.send_window == 0
+
+    stream._grant(100)
+    stream.sendall(b'y' * 100)
+    assert connection.frames[-1][3] == b'y' * 100
+    assert stream.send_window == 0
+
+
+def test_sendall_resumes_when_window_update_arrives(stream, connection):
+    stream.send_window = 0
+    sender = threading.Thread(target=stream.sendall, args=(b'z' * 10,))
+    sender.start()
+    stream._grant(10)
+    sender.join(1.0)
+    assert not sender.is_alive()
+    assert connection.frames[-1][3] == b'z' * 10
+
+
+def test_receiver_returns_credit_after_half_a_window(stream, connection):
+    half = INITIAL_WINDOW // 2
+    assert stream._feed(b'a' * (half - 1))
+    assert stream._feed(b'b' * 2)
+    assert stream.recv(half - 1) == b'a' * (half - 1)
+    assert connection.frames == []
+
+    stream.recv(2)
+    assert connection.frames == [(PRIORITY_INPUT, 3, WINDOW, WINDOW_UPDATE.pack(half + 1))]
+    assert stream.consumed == 0
+
+
+def test_feed_rejects_data_beyond_the_window(stream):
+    assert stream._feed(b'a' * INITIAL_WINDOW)
+    assert not stream._feed(b'b')
+    assert stream.bytes_in == INITIAL_WINDOW
+
+
+def test_recv_after_remote_close_returns_empty(stream):
+    stream._feed(b'tail')
+    stream._remote_close()
+    assert stream.recv(100) == b'tail'
+    assert stream.recv(100) == b''
+
+
+def test_connection_resets_stream_that_overruns_its_window():
+    class Server:
+        channels = {'control': (lambda stream, address: stream.recv(1), PRIORITY_INPUT)}
+
+    mux = MuxConnection(Server(), None, ('10.0.0.2', 5000), True)
+    mux._handle_frame(1, 1, b'control')
+    mux._handle_frame(1, DATA, b'a' * INITIAL_WINDOW)
+    mux._handle_frame(1, DATA, b'b')
+
+    frames = []
+    while not mux.outgoing.empty():
+        frames.append(mux.outgoing.get()[2])
+    headers = [FRAME_HEADER.unpack_from(frame) for frame in frames]
+    assert (1, RESET) in [(stream_id, frame_type) for stream_id, frame_type, _ in headers]
+    assert 1 not in mux.streams
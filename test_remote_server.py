@@ -0,0 +1,65 @@
+import configparser
+import os
+import time
+
+import pytest
+
+from input_sink import KEY, RecordingInputSink
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Headless RemoteServer (control channel only) with its config in a temporary home"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / '.anycommand')
+    config = configparser.ConfigParser()
+    config['Input'] = {'udp_port': '0'}
+    config['Metrics'] = {'port': '0'}
+    with open(tmp_path / '.anycommand' / 'config.ini', 'w') as f:
+        config.write(f)
+
+    from remote_server import RemoteServer
+    server = RemoteServer(host='127.0.0.1', port=0, input_sink=RecordingInputSink(), services=False)
+    yield server
+    server.stop()
+    server.quit()
+
+
+def injected_keys(sink):
+    return [event.args for event in sink.events if event.action == 'batch']
+
+
+def test_websocket_key_translates_pyautogui_names(server):
+    for key in ('pageup', 'CapsLock', 'printscreen', 'a'):
+        server._process_websocket_message({'type': 'key', 'key': key})
+    assert injected_keys(server.input_sink) == [
+        ((KEY, 'page up', True), (KEY, 'page up', False)),
+        ((KEY, 'caps lock', True), (KEY, 'caps lock', False)),
+        ((KEY, 'print screen', True), (KEY, 'print screen', False)),
+        ((KEY, 'a', True), (KEY, 'a', False)),
+    ]
+
+
+def test_websocket_key_without_a_name_is_ignored(server):
+    server._process_websocket_message({'type': 'key'})
+    server._process_websocket_message({'type': 'key', 'key': ''})
+    assert injected_keys(server.input_sink) == []
+
+
+def test_shortcut_waits_behind_a_playing_key_sequence(server):
+    import shortcuts_handler
+
+    server.key_sequencer.submit([(KEY, 'a', True), (KEY, 'a', False)], step_delay=0.05)
+    shortcuts_handler.send_shortcut(['ctrl', 't'])
+    assert injected_keys(server.input_sink) == [((KEY, 'a', True),)]
+
+    deadline = time.monotonic() + 2.0
+    while len(injected_keys(server.input_sink)) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert injected_keys(server.input_sink) == [
+        ((KEY, 'a', True),),
+        ((KEY, 'a', False),),
+        ((KEY, 'ctrl', True), (KEY, 't', True), (KEY, 't', False), (KEY, 'ctrl', False)),
+    ]
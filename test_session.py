@@ -0,0 +1,196 @@
+import socket
+
+import pytest
+
+from session import Session, SessionManager, DISCONNECT, IDLE, WARNING
+
+
+class ManualWheel:
+    """TimerWheel stand-in whose timers only run when fire() is called"""
+
+    class Timer:
+        def __init__(self, delay, callback, args):
+            self.delay = delay
+            self.callback = callback
+            self.args = args
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def __init__(self):
+        self.timers = []
+
+    def schedule(self, delay, callback, *args):
+        timer = self.Timer(delay, callback, args)
+        self.timers.append(timer)
+        return timer
+
+    def fire(self):
+        timers, self.timers = self.timers, []
+        for timer in timers:
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+
+
+@pytest.fixture
+def wheel():
+    return ManualWheel()
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def sessions(wheel, events):
+    return SessionManager(wheel,
+                          on_warning=lambda s: events.append(('warning', s.client)),
+                          on_disconnect=lambda s: events.append(('disconnect', s.client)),
+                          on_idle=lambda s: events.append(('idle', s.client)),
+                          resume_ttl=60)
+
+
+def test_resume_token_is_single_use(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    sessions.close('conn-1')
+
+    resumed, stale = sessions.claim_resume_token(token)
+    assert resumed is session and stale is None
+    assert sessions.claim_resume_token(token) == (None, None)
+
+
+def test_reissuing_replaces_the_old_token(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    old = sessions.issue_resume_token(session)
+    new = sessions.issue_resume_token(session)
+    sessions.close('conn-1')
+    assert sessions.claim_resume_token(old) == (None, None)
+    assert sessions.claim_resume_token(new)[0] is session
+
+
+def test_resume_token_expires_after_ttl(sessions, wheel):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    sessions.close('conn-1')
+    session.closed_at -= 61
+    assert sessions.claim_resume_token(token) == (None, None)
+
+
+def test_expiry_timer_drops_the_token(sessions, wheel):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    sessions.close('conn-1')
+    assert [timer.delay for timer in wheel.timers] == [60]
+    wheel.fire()
+    assert token not in sessions.resume_tokens
+
+
+def test_claiming_an_open_session_returns_the_stale_client(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    resumed, stale = sessions.claim_resume_token(token)
+    assert resumed is session and stale == 'conn-1'
+    assert sessions.get('conn-1') is None
+
+
+def test_non_resumable_close_revokes_the_token(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    sessions.close('conn-1', resumable=False)
+    assert sessions.claim_resume_token(token) == (None, None)
+
+
+def test_resume_carries_state_over(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 10)
+    session.capabilities.update({'RESUME', 'UDP'})
+    session.gamepad_mode = True
+    token = sessions.issue_resume_token(session)
+    sessions.close('conn-1')
+
+    resumed, _ = sessions.claim_resume_token(token)
+    new = sessions.open('conn-2', ('10.0.0.2', 5001), 0, resumed=resumed)
+    assert new.capabilities == {'RESUME', 'UDP'}
+    assert new.gamepad_mode
+    assert new.disconnect_minutes == 10
+    assert set(new.timers) == {WARNING, DISCONNECT}
+
+
+def test_disconnect_timers_fire_only_for_open_sessions(sessions, wheel, events):
+    sessions.open('conn-1', ('10.0.0.2', 5000), 1)
+    sessions.open('conn-2', ('10.0.0.3', 5000), 1)
+    sessions.close('conn-2')
+    wheel.fire()
+    assert sorted(events) == [('disconnect', 'conn-1'), ('warning', 'conn-1')]
+
+
+def test_idle_timer_rearms_after_activity(wheel, events):
+    sessions = SessionManager(wheel, on_warning=None, on_disconnect=None,
+                              on_idle=lambda s: events.append(('idle', s.client)), idle_timeout=300)
+    sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    sessions.touch('conn-1')
+    wheel.fire()
+    assert events == []
+    assert IDLE in sessions.get('conn-1').timers
+
+    sessions.get('conn-1').last_activity -= 301
+    wheel.fire()
+    assert events == [('idle', 'conn-1')]
+
+
+def test_revoke_resume_tokens(sessions):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 0)
+    token = sessions.issue_resume_token(session)
+    sessions.revoke_resume_tokens()
+    sessions.close('conn-1')
+    assert sessions.claim_resume_token(token) == (None, None)
+
+
+
+def test_disconnect_timer_can_be_restarted_and_disabled(sessions, wheel, events):
+    session = sessions.open('conn-1', ('10.0.0.2', 5000), 1)
+    sessions.set_disconnect_timer(session, 0)
+    assert session.timers == {} and session.disconnect_deadline is None
+    wheel.fire()
+    assert events == []
+
+    sessions.set_disconnect_timer(session, 5)
+    assert set(session.timers) == {WARNING, DISCONNECT}
+    assert [timer.delay for timer in wheel.timers if not timer.cancelled] == [5 * 60 - 30, 5 * 60]
+
+
+def test_send_nowait_skips_a_client_that_is_not_reading():
+    server_end, client_end = socket.socketpair()
+    with server_end, client_end:
+        session = Session(1, server_end, ('127.0.0.1', 1))
+        assert session.send_nowait(b'PROBE')
+        assert client_end.recv(16) == b'PROBE'
+
+        # Fill the send and receive buffers, as a stalled client would
+        server_end.setblocking(False)
+        try:
+            while True:
+                server_end.send(b'x' * 65536)
+        except BlockingIOError:
+            pass
+        server_end.setblocking(True)
+        assert not session.send_nowait(b'DISCONNECT_WARNING:30')
+
+
+def test_send_nowait_respects_a_stream_window():
+    class Stream:
+        send_window = 4
+
+        def __init__(self):
+            self.sent = []
+
+        def send(self, data):
+            self.sent.append(data)
+
+    stream = Stream()
+    session = Session(1, stream, ('127.0.0.1', 1))
+    assert session.send_nowait(b'PING')
+    assert not session.send_nowait(b'PROBE')
+    assert stream.sent == [b'PING']
@@ -0,0 +1,141 @@
+import pytest
+
+from stream_rate import (RateController, StreamSettings, StreamVariant, quality_ladder, ADAPT_WINDOW,
+                         LINK_HOLD, MAX_UPGRADE_AFTER, UPGRADE_AFTER)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Link:
+    rtt = 0.02
+    min_rtt = 0.02
+    loss = 0.0
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def ladder():
+    return quality_ladder(75, 45, 0.9, 0.6, 20, 5, levels=4)
+
+
+def window(rate, clock, busy=0.1, drops=0):
+    """Advance one adaptation window; returns what the last call returned"""
+    for _ in range(drops):
+        rate.on_dropped()
+    clock.now += ADAPT_WINDOW
+    return rate.on_sent(1000, busy * ADAPT_WINDOW)
+
+
+def test_quality_ladder_steps_evenly():
+    assert quality_ladder(75, 45, 0.9, 0.6, 20, 5, levels=4) == [
+        StreamSettings(75, 0.9, 20.0), StreamSettings(65, 0.8, 15.0),
+        StreamSettings(55, 0.7, 10.0), StreamSettings(45, 0.6, 5.0)]
+    assert quality_ladder(75, 45, 0.9, 0.6, 20, 5, levels=1) == [StreamSettings(75, 0.9, 20.0)]
+
+
+def test_busy_link_steps_down_to_the_bottom(ladder, clock):
+    rate = RateController(ladder, clock)
+    assert [window(rate, clock, busy=0.9) for _ in range(5)] == [1, 2, 3, None, None]
+    assert rate.settings == ladder[-1]
+
+
+def test_drops_step_down(ladder, clock):
+    rate = RateController(ladder, clock)
+    assert window(rate, clock, drops=1) == 1
+
+
+def test_no_decision_inside_a_window(ladder, clock):
+    rate = RateController(ladder, clock)
+    clock.now += ADAPT_WINDOW / 2
+    assert rate.on_sent(10 ** 6, ADAPT_WINDOW / 2) is None
+    assert rate.level == 0
+
+
+def test_steps_up_after_sustained_headroom(ladder, clock):
+    rate = RateController(ladder, clock)
+    window(rate, clock, busy=0.9)
+    results = [window(rate, clock, busy=0.1) for _ in range(UPGRADE_AFTER)]
+    assert results == [None] * (UPGRADE_AFTER - 1) + [0]
+
+
+def test_middling_busy_holds_the_level(ladder, clock):
+    rate = RateController(ladder, clock)
+    window(rate, clock, busy=0.9)
+    assert [window(rate, clock, busy=0.6) for _ in range(10)] == [None] * 10
+    assert rate.level == 1
+
+
+def test_failed_upgrade_doubles_the_wait(ladder, clock):
+    rate = RateController(ladder, clock)
+    window(rate, clock, busy=0.9)
+    for _ in range(UPGRADE_AFTER):
+        window(rate, clock, busy=0.1)
+    assert rate.level == 0
+    window(rate, clock, busy=0.9)   # Undone right away
+    assert rate.upgrade_after == UPGRADE_AFTER * 2
+
+    for _ in range(UPGRADE_AFTER * 2 - 1):
+        assert window(rate, clock, busy=0.1) is None
+    assert window(rate, clock, busy=0.1) == 0
+
+
+def test_upgrade_wait_is_capped(ladder, clock):
+    rate = RateController(ladder, clock)
+    rate.upgrade_after = MAX_UPGRADE_AFTER
+    rate.last_upgrade = clock.now
+    window(rate, clock, busy=0.9)
+    assert rate.upgrade_after == MAX_UPGRADE_AFTER
+
+
+def test_congested_control_link_steps_down_once_per_hold(ladder, clock):
+    link = Link()
+    link.rtt = 0.5
+    rate = RateController(ladder, clock, link=lambda: link)
+    levels = [window(rate, clock) for _ in range(int(LINK_HOLD / ADAPT_WINDOW) + 1)]
+    assert levels[0] == 1
+    assert levels[1:-1] == [None] * (len(levels) - 2)
+    assert levels[-1] == 2
+    assert rate.get_stats()['link_congested']
+
+
+def test_control_link_loss_blocks_upgrades(ladder, clock):
+    link = Link()
+    rate = RateController(ladder, clock, link=lambda: link)
+    window(rate, clock, busy=0.9)
+    link.loss = 0.2
+    clock.now += LINK_HOLD
+    window(rate, clock)
+    assert rate.level == 2
+    for _ in range(UPGRADE_AFTER):
+        window(rate, clock)
+    assert rate.level >= 2
+
+    link.loss = 0.0
+    for _ in range(MAX_UPGRADE_AFTER):
+        window(rate, clock)
+    assert rate.level < 2
+
+
+def test_unprobed_link_is_ignored(ladder, clock):
+    rate = RateController(ladder, clock, link=lambda: None)
+    assert window(rate, clock) is None
+    assert not rate.get_stats()['link_congested']
+
+
+def test_variant_due_follows_its_fps():
+    variant = StreamVariant(False, 0, StreamSettings(75, 0.9, 10.0))
+    variant.last_encoded = 100.0
+    assert not variant.due(100.05)
+    assert variant.due(100.09)   # 10% slack for grab jitter
+    variant.dirty = False
+    assert not variant.due(101.0)
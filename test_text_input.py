@@ -0,0 +1,91 @@
+from input_sink import KEY, TEXT
+from text_input import TextInput
+
+
+class MemoryClipboard:
+    def __init__(self, text=''):
+        self.text = text
+        self.writes = []
+
+    def get_text(self):
+        return self.text
+
+    def set_text(self, text):
+        self.text = text
+        self.writes.append(text)
+
+
+class ImmediateSequencer:
+    """Plays every sequence at once, like an idle KeySequencer"""
+
+    def __init__(self):
+        self.injected = []
+
+    def submit(self, events, step_delay=None):
+        self.injected.append(events() if callable(events) else events)
+
+
+class ManualWheel:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, delay, callback, *args):
+        self.scheduled.append((callback, args))
+
+    def run(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback, args in scheduled:
+            callback(*args)
+
+
+CTRL_V = [(KEY, 'ctrl', True), (KEY, 'v', True), (KEY, 'v', False), (KEY, 'ctrl', False)]
+
+
+def make_text_input(clipboard, **kwargs):
+    return TextInput(ImmediateSequencer(), ManualWheel(), clipboard, paste_threshold=10, **kwargs)
+
+
+def test_short_text_is_typed():
+    text_input = make_text_input(MemoryClipboard('kept'))
+    text_input.type_text('hi')
+    assert text_input.sequencer.injected == [[(TEXT, 'hi')]]
+    assert text_input.clipboard.writes == []
+
+
+def test_long_text_is_pasted_and_clipboard_restored():
+    text_input = make_text_input(MemoryClipboard('kept'))
+    text_input.type_text('a long piece of text')
+    assert text_input.sequencer.injected == [CTRL_V]
+    assert text_input.clipboard.text == 'a long piece of text'
+    text_input.wheel.run()
+    assert text_input.clipboard.text == 'kept'
+
+
+def test_back_to_back_pastes_restore_the_first_saved_text():
+    text_input = make_text_input(MemoryClipboard('kept'))
+    text_input.type_text('first long text')
+    text_input.type_text('second long text')
+    text_input.wheel.run()
+    assert text_input.clipboard.writes == ['first long text', 'second long text', 'kept']
+
+
+def test_clipboard_without_text_is_not_overwritten_on_restore():
+    # ClipboardService.get_text() returns '' for an empty or non-text (image, files) clipboard
+    text_input = make_text_input(MemoryClipboard(''))
+    text_input.type_text('a long piece of text')
+    text_input.wheel.run()
+    assert text_input.clipboard.writes == ['a long piece of text']
+    assert text_input.saved_text is None
+
+    # The next paste saves whatever is on the clipboard again
+    text_input.clipboard.text = 'copied later'
+    text_input.type_text('another long text')
+    text_input.wheel.run()
+    assert text_input.clipboard.text == 'copied later'
+
+
+def test_keys_strategy_never_touches_the_clipboard():
+    text_input = make_text_input(MemoryClipboard('kept'), strategy='keys')
+    text_input.type_text('a long piece of text')
+    assert text_input.sequencer.injected == [[(TEXT, 'a long piece of text')]]
+    assert text_input.clipboard.writes == []
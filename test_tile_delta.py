@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from tile_delta import (TileDeltaEncoder, dirty_tiles, tile_runs, DELTA, DELTA_HEADER, DELTA_MAGIC, KEYFRAME,
+                        TILE_HEADER)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def frame(width=256, height=128, patches=()):
+    """Grey frame with white (x, y, w, h) patches"""
+    pixels = np.full((height, width, 3), 64, dtype=np.uint8)
+    for x, y, w, h in patches:
+        pixels[y:y + h, x:x + w] = 255
+    return Image.fromarray(pixels)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def encoder(clock):
+    return TileDeltaEncoder(tile_size=64, keyframe_interval=2.0, max_delta_fraction=0.5, clock=clock)
+
+
+def test_dirty_tiles_and_runs():
+    previous = np.zeros((100, 200, 3), dtype=np.uint8)
+    current = previous.copy()
+    current[10, 70, 2] = 1      # Row 0, col 1
+    current[10, 130] = 1        # Row 0, col 2
+    current[99, 199] = 1        # Row 1, col 3: partial edge tile
+    grid = dirty_tiles(previous, current, 64)
+    assert grid.shape == (2, 4)
+    assert grid.tolist() == [[False, True, True, False], [False, False, False, True]]
+    assert [list(map(int, run)) for run in tile_runs(grid)] == [[0, 1, 3], [1, 3, 4]]
+
+
+def test_first_frame_is_a_keyframe(encoder):
+    kind, payload = encoder.encode(frame())
+    assert kind == KEYFRAME
+    assert payload[:2] == b'\xff\xd8'  # JPEG
+
+
+def test_unchanged_frame_is_not_sent(encoder):
+    encoder.encode(frame())
+    assert encoder.encode(frame()) is None
+    assert encoder.get_stats()['unchanged'] == 1
+
+
+def test_small_change_is_a_delta_of_merged_tiles(encoder):
+    encoder.encode(frame())
+    kind, payload = encoder.encode(frame(patches=[(10, 10, 100, 5)]))  # Tiles (0, 0) and (0, 1)
+    assert kind == DELTA
+    magic, seq, width, height, count = DELTA_HEADER.unpack_from(payload)
+    assert (magic, seq, width, height, count) == (DELTA_MAGIC, 2, 256, 128, 1)
+    x, y, w, h, length = TILE_HEADER.unpack_from(payload, DELTA_HEADER.size)
+    assert (x, y, w, h) == (0, 0, 128, 64)
+    assert len(payload) == DELTA_HEADER.size + TILE_HEADER.size + length
+
+
+def test_large_change_falls_back_to_a_keyframe(encoder):
+    encoder.encode(frame())
+    kind, _ = encoder.encode(frame(patches=[(0, 0, 192, 128)]))  # 6 of 8 tiles
+    assert kind == KEYFRAME
+
+
+def test_keyframe_interval(encoder, clock):
+    encoder.encode(frame())
+    clock.now = 1.9
+    assert encoder.encode(frame(patches=[(0, 0, 8, 8)]))[0] == DELTA
+    clock.now = 2.0
+    assert encoder.encode(frame(patches=[(0, 0, 16, 16)]))[0] == KEYFRAME
+
+
+def test_requested_keyframe_even_without_change(encoder):
+    encoder.encode(frame())
+    encoder.request_keyframe()
+    assert encoder.encode(frame())[0] == KEYFRAME
+    assert encoder.encode(frame()) is None
+
+
+def test_size_change_forces_a_keyframe(encoder):
+    encoder.encode(frame())
+    assert encoder.encode(frame(width=128))[0] == KEYFRAME
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from timer_wheel import TimerWheel
+
+
+@pytest.fixture
+def wheel():
+    wheel = TimerWheel(tick=0.005, slots=8)
+    wheel.start()
+    yield wheel
+    wheel.stop()
+
+
+def test_callback_runs_after_delay(wheel):
+    fired = threading.Event()
+    start = time.monotonic()
+    wheel.schedule(0.05, fired.set)
+    assert fired.wait(1.0)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_callbacks_run_in_deadline_then_schedule_order(wheel):
+    order = []
+    done = threading.Event()
+    wheel.schedule(0.06, order.append, 'late')
+    wheel.schedule(0.02, order.append, 'first')
+    wheel.schedule(0.02, order.append, 'second')
+    wheel.schedule(0.08, done.set)
+    assert done.wait(1.0)
+    assert order == ['first', 'second', 'late']
+
+
+def test_delay_longer_than_one_revolution(wheel):
+    # 8 slots of 5 ms: 0.1 s takes more than two turns of the wheel
+    fired = threading.Event()
+    start = time.monotonic()
+    wheel.schedule(0.1, fired.set)
+    assert fired.wait(1.0)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_cancelled_timer_does_not_run(wheel):
+    calls = []
+    done = threading.Event()
+    timer = wheel.schedule(0.02, calls.append, 'cancelled')
+    wheel.schedule(0.04, done.set)
+    timer.cancel()
+    assert done.wait(1.0)
+    assert calls == []
+    assert wheel.pending == 0
+
+
+def test_failing_callback_does_not_stop_the_wheel(wheel):
+    fired = threading.Event()
+    wheel.schedule(0.01, lambda: 1 / 0)
+    wheel.schedule(0.02, fired.set)
+    assert fired.wait(1.0)
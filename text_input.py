@@ -0,0 +1,126 @@
+"""
+Text injection strategies: Unicode key strokes or clipboard paste.
+
+Typing sends two SendInput events per UTF-16 unit, so hundreds of
+characters take a while to land and some apps drop strokes under load.
+Above a size threshold the 'auto' strategy pastes instead: it keeps the
+current clipboard text, puts the text on the clipboard, sends Ctrl+V and
+puts the old text back once the target app has had time to read it. Only
+text is kept: if the clipboard held no text (an image, files, nothing), the
+pasted text is left there rather than clearing it.
+
+config.ini:
+    [TextInput]
+    strategy = auto           ; auto, keys or paste
+    paste_threshold = 500     ; characters; 'auto' pastes text at least this long
+    restore_delay_ms = 500    ; how long the pasted text stays on the clipboard
+"""
+
+import logging
+import threading
+
+from input_sink import TEXT, combo_events
+
+STRATEGIES = ('auto', 'keys', 'paste')
+DEFAULT_PASTE_THRESHOLD = 500
+DEFAULT_RESTORE_DELAY = 0.5
+
+
+class TextInput:
+    """Inject text through a KeySequencer, pasting long text via the clipboard"""
+
+    def __init__(self, sequencer, wheel, clipboard=None, strategy='auto',
+                 paste_threshold=DEFAULT_PASTE_THRESHOLD, restore_delay=DEFAULT_RESTORE_DELAY):
+        """
+        sequencer: KeySequencer the key strokes and Ctrl+V go through, so text
+            stays in order with the other keys.
+        wheel: TimerWheel that restores the clipboard after a paste.
+        clipboard: object with get_text()/set_text() (ClipboardService); None
+            always types.
+        """
+        if strategy not in STRATEGIES:
+            logging.warning(f"Unknown text input strategy '{strategy}', using 'auto'")
+            strategy = 'auto'
+        self.sequencer = sequencer
+        self.wheel = wheel
+        self.clipboard = clipboard
+        self.strategy = strategy
+        self.paste_threshold = paste_threshold
+        self.restore_delay = restore_delay
+
+        self.lock = threading.Lock()
+        self.saved_text = None      # Clipboard text to put back, None when nothing is pending
+        self.paste_generation = 0   # Only the restore for the latest paste runs
+
+        # Statistics
+        self.texts_typed = 0
+        self.texts_pasted = 0
+        self.paste_failures = 0
+
+    @classmethod
+    def from_config(cls, config, sequencer, wheel, clipboard=None):
+        """Build a TextInput from the [TextInput] section of config.ini"""
+        return cls(
+            sequencer, wheel, clipboard,
+            strategy=config.get('TextInput', 'strategy', fallback='auto').strip().lower(),
+            paste_threshold=config.getint('TextInput', 'paste_threshold', fallback=DEFAULT_PASTE_THRESHOLD),
+            restore_delay=config.getint('TextInput', 'restore_delay_ms',
+                                        fallback=int(DEFAULT_RESTORE_DELAY * 1000)) / 1000.0,
+        )
+
+    def uses_paste(self, text):
+        if self.clipboard is None or self.strategy == 'keys':
+            return False
+        return self.strategy == 'paste' or len(text) >= self.paste_threshold
+
+    def type_text(self, text):
+        """Queue text for injection after everything submitted before it"""
+        if not text:
+            return
+        if self.uses_paste(text):
+            self.sequencer.submit(lambda: self._paste_events(text))
+        else:
+            self.texts_typed += 1
+            self.sequencer.submit([(TEXT, text)])
+
+    def _paste_events(self, text):
+        """Put text on the clipboard and return Ctrl+V (runs when the sequence starts)"""
+        try:
+            with self.lock:
+                if self.saved_text is None:
+                    # Back-to-back pastes keep the text from before the first one
+                    self.saved_text = self.clipboard.get_text()
+                self.clipboard.set_text(text)
+                self.paste_generation += 1
+                generation = self.paste_generation
+        except Exception as e:
+            # Typing is slower but still gets the text there
+            logging.error(f"Clipboard paste failed, typing {len(text)} characters instead: {e}")
+            self.paste_failures += 1
+            self.texts_typed += 1
+            return [(TEXT, text)]
+
+        self.texts_pasted += 1
+        self.wheel.schedule(self.restore_delay, self._restore_clipboard, generation)
+        return combo_events(['ctrl', 'v'])
+
+    def _restore_clipboard(self, generation):
+        with self.lock:
+            if generation != self.paste_generation or self.saved_text is None:
+                return  # A later paste owns the clipboard now
+            saved, self.saved_text = self.saved_text, None
+            if not saved:
+                return  # Nothing we can put back; '' would only wipe the clipboard
+            try:
+                self.clipboard.set_text(saved)
+            except Exception as e:
+                logging.error(f"Could not restore clipboard after paste: {e}")
+
+    def get_stats(self):
+        return {
+            'strategy': self.strategy,
+            'paste_threshold': self.paste_threshold,
+            'texts_typed': self.texts_typed,
+            'texts_pasted': self.texts_pasted,
+            'paste_failures': self.paste_failures,
+        }
@@ -0,0 +1,106 @@
+"""
+Hashed timer wheel for cheap, non-blocking delayed callbacks.
+
+Scheduling and cancelling are O(1); one thread advances the wheel every
+tick and runs the callbacks that are due, in the order they were scheduled.
+The thread sleeps without ticking while nothing is scheduled.
+"""
+
+import logging
+import math
+import threading
+import time
+
+DEFAULT_TICK = 0.005  # Seconds per slot
+DEFAULT_SLOTS = 512   # Slots per revolution (~2.5 s at the default tick)
+
+
+class WheelTimer:
+    """Handle for a scheduled callback"""
+
+    def __init__(self, rounds, callback, args):
+        self.rounds = rounds
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Run callbacks after a delay on a single wheel thread"""
+
+    def __init__(self, tick=DEFAULT_TICK, slots=DEFAULT_SLOTS, name='TimerWheel'):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.name = name
+        self.cursor = 0     # Next slot to process
+        self.pending = 0    # Timers in the wheel, including cancelled ones not yet reached
+        self.lock = threading.Lock()
+        self.is_running = False
+        self.thread = None
+        self._wake = threading.Event()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        self._wake.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) on the wheel thread after at least delay seconds"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot_count = len(self.slots)
+        timer = WheelTimer((ticks - 1) // slot_count, callback, args)
+        with self.lock:
+            self.slots[(self.cursor + ticks - 1) % slot_count].append(timer)
+            self.pending += 1
+        self._wake.set()
+        return timer
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while self.is_running:
+            if not self.pending:
+                # Nothing scheduled: sleep until schedule() wakes us
+                self._wake.wait()
+                self._wake.clear()
+                next_tick = time.monotonic()
+                continue
+
+            next_tick += self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            due = []
+            with self.lock:
+                slot = self.slots[self.cursor]
+                if slot:
+                    waiting = []
+                    for timer in slot:
+                        if timer.rounds:
+                            timer.rounds -= 1
+                            waiting.append(timer)
+                        else:
+                            due.append(timer)
+                    self.slots[self.cursor] = waiting
+                    self.pending -= len(due)
+                self.cursor = (self.cursor + 1) % len(self.slots)
+
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    logging.error(f"Timer callback failed: {e}")
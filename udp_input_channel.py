@@ -0,0 +1,235 @@
+"""
+Optional UDP side channel for continuous input streams.
+
+Pointer and analog gamepad data is "latest value wins": when a TCP segment is
+lost, every later sample waits behind its retransmission. A client that
+negotiated CAPS:UDP on the control channel gets a session over TCP
+
+    UDP_SESSION:<port>:<session_id>:<key_hex>\\n
+
+and may then send MOUSE_MOVE / GAMEPAD_STICK / GAMEPAD_GYRO / GAMEPAD_MOTION
+as datagrams. Lost datagrams are simply skipped, and a datagram that arrives
+after a newer one is dropped. Clicks, keys and everything else stay on TCP.
+
+Datagram layout (little-endian):
+
+    session_id:u32  seq:u32  <binary_protocol frames>  tag:8 bytes
+
+tag is the first 8 bytes of HMAC-SHA256(key, everything before the tag).
+seq increases by one per datagram and may wrap around.
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+import socket
+import struct
+import threading
+
+import binary_protocol
+
+UDP_PORT = 8085
+HEADER = struct.Struct('<II')
+TAG_SIZE = 8
+KEY_SIZE = 16
+MAX_DATAGRAM_SIZE = 2048
+SEQ_MASK = 0xFFFFFFFF
+SEQ_WINDOW = 1 << 31  # seq values less than this far ahead of the last one count as newer
+
+# Only "latest value wins" input may take the lossy path
+UDP_OPCODES = frozenset({
+    binary_protocol.OP_MOUSE_MOVE,
+    binary_protocol.OP_GAMEPAD_STICK,
+    binary_protocol.OP_GAMEPAD_GYRO,
+    binary_protocol.OP_GAMEPAD_MOTION,
+})
+
+
+def sign_datagram(session_id, seq, key, frames):
+    """Build an authenticated datagram; used by clients, tools and benchmarks"""
+    body = HEADER.pack(session_id, seq & SEQ_MASK) + frames
+    return body + hmac.new(key, body, hashlib.sha256).digest()[:TAG_SIZE]
+
+
+class UdpSession:
+    """Key and sequence state for one authenticated control connection"""
+
+    def __init__(self, session_id, key, owner):
+        self.session_id = session_id
+        self.key = key
+        self.owner = owner     # Control connection the session was issued to
+        self.address = None    # Last address a valid datagram came from
+        self.last_seq = None
+
+        # Statistics
+        self.accepted = 0
+        self.dropped_stale = 0
+
+    def is_newer(self, seq):
+        if self.last_seq is None:
+            return True
+        return 0 < ((seq - self.last_seq) & SEQ_MASK) < SEQ_WINDOW
+
+
+class UdpInputChannel:
+    """Receive authenticated, sequenced input datagrams and hand them to a dispatcher"""
+
+    def __init__(self, dispatch, port=UDP_PORT, host='0.0.0.0', on_activity=None):
+        """
+        dispatch: callable(opcode, values) that applies one binary input event.
+        port: UDP port to listen on.
+        on_activity: callable(owner) run for every accepted datagram with the
+            control connection its session was issued to (idle tracking).
+        """
+        self.dispatch = dispatch
+        self.on_activity = on_activity
+        self.host = host
+        self.port = port
+        self.is_running = False
+        self.sock = None
+        self.thread = None
+
+        self.lock = threading.Lock()
+        self.sessions = {}         # session_id -> UdpSession
+        self.owner_sessions = {}   # control connection -> session_id
+
+        # Statistics for datagrams that never reached a session
+        self.dropped_unknown = 0
+        self.dropped_invalid = 0
+
+    def start(self):
+        if self.is_running:
+            return
+
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            self.port = self.sock.getsockname()[1]
+            self.is_running = True
+            self.thread = threading.Thread(target=self._receive_loop, name='UdpInputChannel', daemon=True)
+            self.thread.start()
+            logging.info(f"UDP input channel listening on port {self.port}")
+        except Exception as e:
+            logging.error(f"Error starting UDP input channel: {e}")
+            self.stop()
+
+    def stop(self):
+        self.is_running = False
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+        with self.lock:
+            self.sessions.clear()
+            self.owner_sessions.clear()
+
+    def open_session(self, owner):
+        """Issue a new session for a control connection, replacing any previous one"""
+        with self.lock:
+            self._close_session_locked(owner)
+            session_id = secrets.randbits(32)
+            while session_id == 0 or session_id in self.sessions:
+                session_id = secrets.randbits(32)
+            session = UdpSession(session_id, secrets.token_bytes(KEY_SIZE), owner)
+            self.sessions[session_id] = session
+            self.owner_sessions[owner] = session_id
+        logging.info(f"UDP input session {session_id:08x} opened")
+        return session
+
+    def close_session(self, owner):
+        """Revoke the session issued to a control connection (e.g. on disconnect)"""
+        with self.lock:
+            self._close_session_locked(owner)
+
+    def _close_session_locked(self, owner):
+        session_id = self.owner_sessions.pop(owner, None)
+        if session_id is not None:
+            self.sessions.pop(session_id, None)
+            logging.info(f"UDP input session {session_id:08x} closed")
+
+    def handle_datagram(self, data, address):
+        """Verify, sequence-check and dispatch one datagram; returns True if it was applied"""
+        if len(data) < HEADER.size + TAG_SIZE:
+            self.dropped_invalid += 1
+            return False
+
+        session_id, seq = HEADER.unpack_from(data)
+        session = self.sessions.get(session_id)
+        if session is None:
+            self.dropped_unknown += 1
+            return False
+
+        body = data[:-TAG_SIZE]
+        expected = hmac.new(session.key, body, hashlib.sha256).digest()[:TAG_SIZE]
+        if not hmac.compare_digest(expected, data[-TAG_SIZE:]):
+            self.dropped_invalid += 1
+            return False
+
+        events = self._decode_frames(body, HEADER.size)
+        if events is None:
+            self.dropped_invalid += 1
+            return False
+
+        # Only authenticated datagrams may advance the sequence
+        with self.lock:
+            if not session.is_newer(seq):
+                session.dropped_stale += 1
+                return False
+            session.last_seq = seq
+            session.address = address
+            session.accepted += 1
+
+        if self.on_activity:
+            self.on_activity(session.owner)
+        for opcode, values in events:
+            try:
+                self.dispatch(opcode, values)
+            except Exception as e:
+                logging.error(f"UDP {binary_protocol.OPCODE_NAMES[opcode]} error: {e}")
+        return True
+
+    def _decode_frames(self, body, pos):
+        """Decode every frame in body, or return None if any is malformed or not allowed"""
+        events = []
+        end = len(body)
+        while pos < end:
+            if body[pos] != binary_protocol.FRAME_MARKER:
+                return None
+            try:
+                frame = binary_protocol.decode(body, pos)
+            except ValueError:
+                return None
+            if frame is None:
+                return None
+            event, pos = frame
+            if event[0] not in UDP_OPCODES:
+                return None
+            events.append(event)
+        return events
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'accepted': sum(s.accepted for s in self.sessions.values()),
+                'dropped_stale': sum(s.dropped_stale for s in self.sessions.values()),
+                'dropped_unknown': self.dropped_unknown,
+                'dropped_invalid': self.dropped_invalid,
+            }
+
+    def _receive_loop(self):
+        sock = self.sock
+        while self.is_running:
+            try:
+                data, address = sock.recvfrom(MAX_DATAGRAM_SIZE)
+            except ConnectionResetError:
+                # Windows reports ICMP port-unreachable from an earlier send here
+                continue
+            except OSError:
+                if self.is_running:
+                    logging.error("UDP input channel socket error")
+                break
+            self.handle_datagram(data, address)
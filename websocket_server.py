@@ -1,8 +1,13 @@
 import asyncio
 import websockets
 import logging
-import pyautogui
 import json
+import os
+import configparser
+from input_sink import NativeInputSink, combo_events, legacy_key_name
+from timer_wheel import TimerWheel
+from key_sequencer import KeySequencer
+from text_input import TextInput
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,10 +16,24 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class KeyboardWebSocketServer:
-    def __init__(self, host='0.0.0.0', port=8001):
+    def __init__(self, host='0.0.0.0', port=8001, input_sink=None, clipboard=None):
+        """clipboard: object with get_text()/set_text() for pasting long text; defaults to ClipboardService"""
         self.host = host
         self.port = port
-        pyautogui.FAILSAFE = False
+        self.input_sink = input_sink if input_sink is not None else NativeInputSink()
+        self.timer_wheel = TimerWheel()
+        self.key_sequencer = KeySequencer(self.input_sink, self.timer_wheel)
+
+        if clipboard is None:
+            try:
+                from clipboard_service import ClipboardService
+                clipboard = ClipboardService()
+            except ImportError as e:
+                logger.warning(f"Clipboard unavailable, long text will be typed: {e}")
+
+        config = configparser.ConfigParser()
+        config.read(os.path.join(os.path.expanduser('~'), '.anycommand', 'config.ini'))
+        self.text_input = TextInput.from_config(config, self.key_sequencer, self.timer_wheel, clipboard)
 
     async def handle_message(self, websocket):
         logger.info("New client connected")
@@ -28,13 +47,23 @@ class KeyboardWebSocketServer:
                     if msg_type == 'text':
                         text = data.get('text', '')
                         logger.info(f"Typing text: {text}")
-                        pyautogui.write(text)
+                        self.text_input.type_text(text)
                         logger.info(f"Text typed: {text}")
+
+                    elif msg_type == 'type_text':
+                        # Bulk text (pastes, paragraphs): one Unicode batch
+                        text = data.get('text', '')
+                        logger.info(f"Typing {len(text)} characters")
+                        self.text_input.type_text(text)
                             
                     elif msg_type == 'key':
                         key = data.get('key')
+                        if not key:
+                            continue
+                        # Clients send pyautogui key names ('pageup', 'capslock', ...)
+                        key = legacy_key_name(key)
                         logger.info(f"Pressing key: {key}")
-                        pyautogui.press(key)
+                        self.key_sequencer.submit(combo_events([key]))
                         logger.info(f"Key pressed: {key}")
                         
                 except Exception as e:
@@ -44,6 +73,7 @@ class KeyboardWebSocketServer:
             logger.info("Client disconnected")
 
     async def start(self):
+        self.timer_wheel.start()
         server = await websockets.serve(self.handle_message, self.host, self.port)
         logger.info(f"WebSocket keyboard server running on ws://{self.host}:{self.port}")
         await server.wait_closed()
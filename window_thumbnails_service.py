@@ -14,6 +14,18 @@ from PIL import Image, ImageGrab
 import os
 import ctypes
 from ctypes import wintypes, byref
+from log_utils import get_logger
+import metrics
+import profiler
+
+logger = get_logger('windows')
+
+enumerate_seconds = metrics.histogram('anycommand_windows_enumerate_seconds',
+                                      'Window enumeration time, thumbnails and icons included',
+                                      buckets=metrics.DURATION_BUCKETS)
+windows_found = metrics.gauge('anycommand_windows_found', 'Windows in the last enumeration')
+lists_sent = metrics.counter('anycommand_windows_lists_sent_total', 'Window lists sent to clients')
+list_bytes_sent = metrics.counter('anycommand_windows_bytes_sent_total', 'Window list bytes sent to clients')
 
 # Add these constants for icon extraction
 SHGFI_ICON = 0x000000100
@@ -63,12 +75,12 @@ class WindowThumbnailsService:
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind(('0.0.0.0', self.port))
             self.server_socket.listen(5)
-            print(f"Window thumbnails service running on port {self.port}")
+            logger.info(f"Window thumbnails service running on port {self.port}")
             
             while self.is_running:
                 try:
                     client, addr = self.server_socket.accept()
-                    print(f"New window thumbnails client connected: {addr}")
+                    logger.info(f"New window thumbnails client connected: {addr}")
                     client_thread = threading.Thread(
                         target=self._handle_client,
                         args=(client,)
@@ -80,7 +92,7 @@ class WindowThumbnailsService:
                         break
                     time.sleep(0.1)
         except Exception as e:
-            print(f"Error in window thumbnails server: {e}")
+            logger.error(f"Error in window thumbnails server: {e}")
         finally:
             if self.server_socket:
                 self.server_socket.close()
@@ -111,10 +123,10 @@ class WindowThumbnailsService:
                     command = json.loads(data.decode('utf-8'))
                     self._handle_command(command)
                 except Exception as e:
-                    print(f"Error handling client command: {e}")
+                    logger.error(f"Error handling client command: {e}")
                     break
         except Exception as e:
-            print(f"Error in client handler: {e}")
+            logger.error(f"Error in client handler: {e}")
         finally:
             with self.lock:
                 if client in self.clients:
@@ -131,21 +143,28 @@ class WindowThumbnailsService:
                 self._send_window_list(client)
                 time.sleep(self.update_interval)
             except Exception as e:
-                print(f"Error updating thumbnails: {e}")
+                logger.error(f"Error updating thumbnails: {e}")
                 break
     
     def _send_window_list(self, client):
         """Send list of windows with thumbnails to client"""
+        start = time.perf_counter()
         windows = self._get_windows()
+        enumerate_seconds.observe(time.perf_counter() - start)
+        windows_found.set(len(windows))
         try:
-            client.sendall(json.dumps(windows).encode('utf-8') + b'\n')
+            data = json.dumps(windows).encode('utf-8') + b'\n'
+            client.sendall(data)
+            lists_sent.inc()
+            list_bytes_sent.inc(len(data))
         except Exception as e:
-            print(f"Error sending window list: {e}")
+            logger.error(f"Error sending window list: {e}")
     
+    @profiler.timed('get_windows')
     def _get_windows(self):
         """Get all visible windows with thumbnails"""
         windows = []
-        print(f"Fetching window list...")
+        logger.debug("Fetching window list...")
         
         def enum_windows_callback(hwnd, _):
             # Only include windows that are visible and have a title
@@ -153,7 +172,7 @@ class WindowThumbnailsService:
                 try:
                     # Get window info
                     title = win32gui.GetWindowText(hwnd)
-                    print(f"Processing window: {title}")
+                    logger.debug("Processing window: %s", title)
                     
                     # Skip windows with empty titles or that are tool windows
                     if not title or win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE) & win32con.WS_EX_TOOLWINDOW:
@@ -164,7 +183,7 @@ class WindowThumbnailsService:
                     width = rect[2] - rect[0]
                     height = rect[3] - rect[1]
                     if width <= 0 or height <= 0:
-                        print(f"Skipping zero-size window: {title}")
+                        logger.debug("Skipping zero-size window: %s", title)
                         return True
                     
                     # Check if window is minimized
@@ -183,7 +202,7 @@ class WindowThumbnailsService:
                             ctypes.byref(cloaked), ctypes.sizeof(cloaked)
                         )
                         if cloaked.value:
-                            print(f"Skipping cloaked window: {title}")
+                            logger.debug("Skipping cloaked window: %s", title)
                             return True
                     except:
                         pass  # DWM API might not be available
@@ -195,7 +214,7 @@ class WindowThumbnailsService:
                         process_name = process.name()
                         process_path = process.exe()
                     except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                        print(f"Error getting process info: {e}")
+                        logger.error(f"Error getting process info: {e}")
                         process_name = "Unknown"
                         process_path = ""
                     
@@ -218,7 +237,7 @@ class WindowThumbnailsService:
                     
                     # Add window info
                     category = self._categorize_window(process_name, title)
-                    print(f"Added window: {title} ({process_name}) - Category: {category}, Minimized: {is_minimized}")
+                    logger.debug("Added window: %s (%s) - Category: %s, Minimized: %s", title, process_name, category, is_minimized)
                     
                     windows.append({
                         'hwnd': hwnd,
@@ -240,16 +259,16 @@ class WindowThumbnailsService:
                         'is_maximized': 1 if is_maximized else 0,  # Add maximized state
                     })
                 except Exception as e:
-                    print(f"Error processing window {win32gui.GetWindowText(hwnd)}: {e}")
+                    logger.error(f"Error processing window {win32gui.GetWindowText(hwnd)}: {e}")
                 
             return True
         
         try:
             win32gui.EnumWindows(enum_windows_callback, None)
-            print(f"Found {len(windows)} windows")
+            logger.debug("Found %d windows", len(windows))
             return windows
         except Exception as e:
-            print(f"Error enumerating windows: {e}")
+            logger.error(f"Error enumerating windows: {e}")
             return []
     
     def _capture_window_thumbnail(self, hwnd, width, height):
@@ -296,7 +315,7 @@ class WindowThumbnailsService:
             
             return img_str
         except Exception as e:
-            print(f"Error capturing window thumbnail: {e}")
+            logger.error(f"Error capturing window thumbnail: {e}")
             return ""
     
     def _get_app_icon(self, process_path, pid):
@@ -368,7 +387,7 @@ class WindowThumbnailsService:
             
             return icon_str
         except Exception as e:
-            print(f"Error extracting icon: {e}")
+            logger.error(f"Error extracting icon: {e}")
             return ""
     
     def _categorize_window(self, process_name, title):
@@ -445,7 +464,7 @@ class WindowThumbnailsService:
                     # Flash the window to draw attention to it
                     win32gui.FlashWindow(hwnd, True)
                 except Exception as e:
-                    print(f"Error bringing window to front: {e}")
+                    logger.error(f"Error bringing window to front: {e}")
                     # Fallback to simpler methods
                     win32gui.SetActiveWindow(hwnd)
                     win32gui.FlashWindow(hwnd, True)
@@ -475,4 +494,4 @@ class WindowThumbnailsService:
                 # Activate the window without changing z-order
                 win32gui.SetActiveWindow(hwnd)
         except Exception as e:
-            print(f"Error handling command: {e}") 
\ No newline at end of file
+            logger.error(f"Error handling command: {e}")
\ No newline at end of file